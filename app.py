@@ -1,366 +1,674 @@
 # Million-Dollar Flat Dashboard
 
 # Load libraries 
+import os
+import sys
+from datetime import date
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from shinywidgets import output_widget, render_widget
 from shiny import App, ui
-from shiny import render, reactive
+from shiny import render, reactive, req
 from pathlib import Path
 from htmltools import HTML
 
+from bundle import MD_THRESHOLD, load_bundle_frame, prepare_transactions, print_memory_report, read_transactions
+from snapshots import SnapshotManager
+from instrumentation import RenderMetrics
+from query_backend import BundledBackend, open_backend, window_start
+from static_outputs import StaticOutputs, prerendered
+
+# Shinylive (Pyodide) build: answers come from a precomputed bundle
+# (browser_bundle.py) and the pages that need row-level data are left out,
+# so their modules (and scipy) are never imported in the browser
+BROWSER_BUILD = sys.platform == "emscripten" or os.getenv("HDB_BROWSER_BUILD") == "1"
+if not BROWSER_BUILD:
+    from spatial_index import INDEX_COLUMNS, SpatialIndex, cells_geojson, viewport_bounds
+    from comparables import COMPARABLE_COLUMNS, ComparablesIndex
+    from explorer import EXPLORER_COLUMNS, PAGE_SIZE, ExplorerIndex, Filters
+    from price_index import PRICE_INDEX_COLUMNS, maintained_index
+    from range_index import RANGE_COLUMNS, RangeIndex
+
 # Load data
 this_dir = Path(__file__).parent
-data_path = this_dir / "HDB_Resale_Transactions_Merged_20260113.csv.gz"
-df = pd.read_csv(data_path, compression='gzip')
 css_path = this_dir / "styles.css"
 
-# Ensure a proper date column
-df["date"] = pd.to_datetime(
-    df["Year"].astype(str) + "-" +
-    df["Month"].astype(str).str.zfill(2) + "-01"
+def load_transactions(data_path):
+    # Memory-map the precomputed bundle when the pipeline left a matching one
+    # next to the CSV; otherwise parse the CSV (joining the address columns
+    # from its address table) and derive the columns here. Either way the
+    # frame comes in the compact dtypes of bundle.FRAME_SCHEMA
+    df = load_bundle_frame(data_path)
+    if df is None:
+        df = prepare_transactions(read_transactions(data_path))
+    print_memory_report(df)
+    return df
+
+# Indexes behind the row-level pages, with the columns each is built from
+if not BROWSER_BUILD:
+    PAGE_INDEXES = {
+        "spatial_index": (INDEX_COLUMNS, SpatialIndex.from_frame),  # hexagon aggregates (map page)
+        "comparables": (COMPARABLE_COLUMNS, ComparablesIndex),  # block KD-tree and date-sorted rows (Table 10)
+        "explorer": (EXPLORER_COLUMNS, ExplorerIndex),  # inverted indexes and sort orders (Table 11)
+        "price_index": (PRICE_INDEX_COLUMNS, maintained_index),  # repeat-sales index (Chart 7)
+        "range_index": (RANGE_COLUMNS, RangeIndex),  # monthly prefix sums and sparse maxima (Table 12)
+    }
+
+def page_index(snap, key):
+    # Built the first time a session opens the page that needs it, not
+    # before the snapshot goes live; only that index's columns are read
+    columns, make = PAGE_INDEXES[key]
+    return snap.cached(key, lambda: make(snap.data.frame(list(columns))))
+
+def spatial_index(snap):
+    return page_index(snap, "spatial_index")
+
+def comparables_index(snap):
+    return page_index(snap, "comparables")
+
+def explorer_index(snap):
+    return page_index(snap, "explorer")
+
+def price_index(snap):
+    # Only months newer than the saved index are folded in
+    return page_index(snap, "price_index")
+
+def range_index(snap):
+    return page_index(snap, "range_index")
+
+def static_outputs(snap):
+    # Latest Trends payloads exported ahead of time (static_outputs.py), if they match this snapshot
+    return snap.cached("static_outputs", lambda: StaticOutputs.open(snap.path))
+
+def warm_snapshot(snap):
+    # Only the export's manifest is read before a snapshot goes live; each page index waits for its page
+    static_outputs(snap)
+
+# The newest pipeline output in the app folder (or $HDB_DATA_DIR) is served;
+# newer runs dropped in later are picked up in the background and swapped in
+# without a restart. Each snapshot is queried through a backend
+# (query_backend.py): pandas by default, DuckDB with HDB_QUERY_BACKEND=duckdb.
+# The browser build serves the newest HDB_Resale_Transactions_Merged_<date>.browser instead
+data_dir = Path(os.getenv("HDB_DATA_DIR", this_dir))
+if BROWSER_BUILD:
+    snapshots = SnapshotManager(data_dir, BundledBackend, pattern="HDB_Resale_Transactions_Merged_*.browser")
+else:
+    snapshots = SnapshotManager(data_dir, lambda path: open_backend(path, load_transactions), warm=warm_snapshot)
+snapshots.start()
+
+def dataset_towns(db):
+    return db.towns()
+
+def dataset_up_date(db):
+    return db.latest_date().strftime("%b %Y")
+
+# Periods shown per choice of Period1
+N_PERIODS = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}
+
+def period_window(db, period_choice, **anchor):
+    # The last N periods, ending at the latest month of the rows matching `anchor`
+    latest = db.latest_date(**anchor)
+    return dict(period=period_choice, since=window_start(latest, period_choice, N_PERIODS[period_choice]))
+
+def town_medians(db, period_choice):
+    # Million-dollar medians per period and town (Chart 6)
+    return db.aggregate(
+        ["Period_sort", "Period", "Town"],
+        {"Median_PSF": ("PSF", "median"), "Median_Price": ("Resale_Price", "median")},
+        **period_window(db, period_choice), min_price=MD_THRESHOLD,
+    ).reset_index()
+
+def default_towns(medians, metric_choice, n=5):
+    # Chart 6 opens on the n towns with the highest median in the latest period
+    if medians.empty:
+        return []
+    y_col = "Median_PSF" if metric_choice == "PSF" else "Median_Price"
+    latest = medians[medians["Period_sort"] == medians["Period_sort"].max()]
+    return latest.set_index("Town")[y_col].sort_values(ascending=False).head(n).index.tolist()
+
+# Map page: colour metrics and the opening view. The viewport size is a
+# typical full-width card; cells are sent with a margin
+MAP_METRICS = {"MD_Share": "Million-Dollar Share (%)", "Median_PSF": "Median PSF ($)", "Count": "Transactions"}
+MAP_VIEW = {"lon": 103.82, "lat": 1.355, "zoom": 10.4}
+MAP_SIZE_PX = (1200, 650)
+
+def explorer_limits(snap):
+    # Transactions page slider limits: price, storey and dates (a price or
+    # storey at the top of its slider means no upper limit)
+    explorer = explorer_index(snap)
+    price_max = int(-(-explorer.sorted_prices[-1] // 100_000) * 100_000)
+    storey_max = int(explorer.storey_high[~pd.isna(explorer.storey_high)].max())
+    dates = (pd.Timestamp(explorer.dates[0]).date(), pd.Timestamp(explorer.dates[-1]).date())
+    return price_max, storey_max, dates
+
+def range_months(snap):
+    # Table 12 slider: first and last month, and the L12M window it opens on
+    first, last = (m.date() for m in range_index(snap).months)
+    return first, last, (max(first, (pd.Timestamp(last) - pd.DateOffset(months=11)).date()), last)
+
+# The row-level pages' controls start on placeholders; the server sends the
+# real periods and limits once the page is opened and its index is built.
+# Price, storey and dates wider than any data, so the explorer filters nothing
+PLACEHOLDER_LIMITS = (100_000_000, 99, (date(1990, 1, 1), date(2099, 12, 31)))
+
+RANGE_GROUPS = {"Town": "HDB Town", "BUILDING": "Project", "Flat_Type": "Flat Type"}
+
+EXPLORER_SORTS = {"date": "Date", "Resale_Price": "Price", "PSF": "PSF", "Floor_Area_Sqm": "Flat Size"}
+
+# Render timings, rows and payload sizes, served at /metrics
+metrics = RenderMetrics()
+# Inputs echoed by the slow-render log
+LOGGED_INPUTS = (
+    "Period1", "Flattype1", "select_flat_type", "select_PSF", "select_town", "select_PSF_town",
+    "map_period", "map_metric",
+    "index_towns", "index_flat_type",
+    "comp_address", "comp_flat_type", "comp_area", "comp_months", "comp_mode", "comp_k", "comp_radius",
+    "range_dates", "range_by", "range_flat_type",
+    "explore_town", "explore_flat_type", "explore_building", "explore_address", "explore_price",
+    "explore_storey", "explore_dates", "explore_sort", "explore_desc",
 )
 
-# Rename flat types to combine executive and multi-generation flats 
-df["Flat_Type"] = df["Flat_Type"].replace(
-            {"EXECUTIVE": "EXECUTIVE/MG", "MULTI-GENERATION": "EXECUTIVE/MG"}
-        )
-df["PSF"] = df["Resale_Price"] / (df["Floor_Area_Sqm"] * 10.764)
-
-# Define unique list of HDB towns
-hdbtowns = df["Town"].unique()
-
-# Set the Last Updated tracker for the page
-latest_date_dt = df["date"].max()
-up_date = latest_date_dt.strftime("%b %Y")
+# Tables 7-12 send their figures as numbers; a column tagged cell-<format>
+# (see cell_formats) is written out in the browser, so the grid sorts numbers
+# and the payload carries no "$1.23M" strings. Values: the decimals sent,
+# i.e. what the format shows (usd_m goes out in whole dollars)
+CELL_FORMATS = {"usd_m": 0, "usd": 0, "pct": 1, "yrs": 1, "sqm": 0, "metres": 0}
+CELL_FORMAT_JS = """
+(() => {
+  const whole = new Intl.NumberFormat("en-US", {maximumFractionDigits: 0});
+  const formats = {
+    "cell-usd_m": (v) => v > 0 ? "$" + (v / 1e6).toFixed(2) + "M" : "-",
+    "cell-usd": (v) => v > 0 ? "$" + whole.format(v) : "-",
+    "cell-pct": (v) => v.toFixed(1) + "%",
+    "cell-yrs": (v) => v > 0 ? v.toFixed(1) + " Yrs" : "-",
+    "cell-sqm": (v) => v.toFixed(0) + " sqm",
+    "cell-metres": (v) => whole.format(v) + " m",
+  };
+  const format = (td) => {
+    const name = Array.from(td.classList).find((c) => c in formats);
+    const text = td.firstChild;
+    if (!name || !text || text.nodeType !== Node.TEXT_NODE) return;
+    const raw = text.nodeValue.trim();
+    if (raw === "" || isNaN(raw)) return;  // empty, or written out already
+    text.nodeValue = formats[name](Number(raw));
+  };
+  // Cells are (re)drawn as the grid renders, sorts and scrolls
+  new MutationObserver((mutations) => {
+    for (const m of mutations) {
+      const node = m.type === "characterData" ? m.target.parentElement : m.target;
+      if (!node || !node.closest) continue;
+      const td = node.closest("td");
+      if (td) format(td);
+      else if (m.type === "childList") node.querySelectorAll("td[class*='cell-']").forEach(format);
+    }
+  }).observe(document.documentElement, {
+    childList: true, subtree: true, characterData: true, attributes: true, attributeFilter: ["class"],
+  });
+})();
+"""
+
+def server_only_page(title):
+    # Stands in for a row-level page in the browser build
+    return ui.nav_panel(title,
+        ui.card(
+            ui.p(
+                "This page works from the individual resale transactions, so it is only available in the full app. "
+                "The browser version carries the Latest Trends charts and tables only.",
+                style="font-size: 13px; color: #555; margin: 0;",
+            ),
+        ),
+    )
 
 # UI
-app_ui = ui.page_navbar(  
-    ui.nav_panel("LATEST TRENDS", 
-        ui.input_selectize(
-            "Period1", "Select Period:",
-            ["Monthly", "Quarterly", "Yearly"],
-            selected= "Quarterly",
-        ), 
-        # ---- Row 1 ----
-        ui.layout_columns(
-            ui.card(
-                ui.card_header("Chart 1: Number of Million-Dollar Transactions by Flat Type"), 
-                output_widget("Chart_1"),
-                full_screen=True
+def app_ui(request):
+    # Built per page load from the live snapshot's towns, so a session opened
+    # after a swap starts on them. No page index is touched: map periods and
+    # slider limits are sent by the server when their page is first opened
+    hdbtowns = dataset_towns(snapshots.current.data)
+    price_max, storey_max, (first, last) = PLACEHOLDER_LIMITS
+    return ui.page_navbar(
+        ui.nav_panel("LATEST TRENDS", 
+            ui.input_selectize(
+                "Period1", "Select Period:",
+                ["Monthly", "Quarterly", "Yearly"],
+                selected= "Quarterly",
+            ), 
+            # ---- Row 1 ----
+            ui.layout_columns(
+                ui.card(
+                    ui.card_header("Chart 1: Number of Million-Dollar Transactions by Flat Type"), 
+                    output_widget("Chart_1"),
+                    full_screen=True
+                ),
+                ui.card(
+                    ui.card_header("Chart 2: Million-Dollar Flats as Share of Resale Transactions (%)"), 
+                    output_widget("Chart_2"),
+                    full_screen=True
+                ),
             ),
-            ui.card(
-                ui.card_header("Chart 2: Million-Dollar Flats as Share of Resale Transactions (%)"), 
-                output_widget("Chart_2"),
-                full_screen=True
+
+            # ---- Row 2 ----
+            ui.layout_columns(
+                ui.card(
+                    ui.card_header("Chart 3: Proportion of Resale Transactions by Price Category (%)"), 
+                    output_widget("Chart_3"),
+                    full_screen=True
+                ),
+                ui.card(
+                    ui.card_header("Chart 4: Resale PSF Trends of Million Dollar Flats"), 
+                    output_widget("Chart_4"),
+                    full_screen=True
+                ),
             ),
-        ),
 
-        # ---- Row 2 ----
-        ui.layout_columns(
-            ui.card(
-                ui.card_header("Chart 3: Proportion of Resale Transactions by Price Category (%)"), 
-                output_widget("Chart_3"),
-                full_screen=True
+            # ---- Row 3 ----
+            ui.layout_columns(
+                # --- Card for Chart 5 ---
+                ui.card(
+                    ui.card_header("Chart 5: Median Price/PSF of Transactions (By Flat Type)"),
+                    ui.layout_sidebar(
+                        ui.sidebar(
+                            ui.input_selectize(
+                                "select_flat_type",
+                                "Flat Type:",
+                                {"3 ROOM": "3 ROOM", "4 ROOM": "4 ROOM", "5 ROOM": "5 ROOM", "EXECUTIVE/MG" : "EXECUTIVE/MG"},
+                                selected=["4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                                multiple=True,
+                            ),
+                            ui.input_radio_buttons(  
+                                "select_PSF", 
+                                "Select:",  
+                                {"PSF": "PSF", "PRICE": "PRICE"}, 
+                                selected="PSF" 
+                            ),  
+                            bg="#f8f8f8",
+                            width=225, 
+                            open="closed"  
+                        ),
+                        output_widget("Chart_5"),
+                    ),
+                    full_screen=True
+                ),
+
+                # --- Card for Chart 6 ---
+                ui.card(
+                    ui.card_header("Chart 6: Median Price/PSF of Transactions (Top 5 Towns)"),
+                    ui.layout_sidebar(
+                        ui.sidebar(
+                            ui.input_selectize(
+                                "select_town",
+                                "HDB Towns:",
+                                hdbtowns,
+                                multiple=True,
+                                selected=None
+                            ),
+                            ui.input_radio_buttons(
+                                "select_PSF_town", 
+                                "Select:",  
+                                {"PSF": "PSF", "PRICE": "PRICE"}, 
+                                selected="PSF",  
+                            ),  
+                            bg="#f8f8f8",
+                            width=225,
+                            open="closed"
+                        ),
+                        output_widget("Chart_6"),
+                    ),
+                    full_screen=True
+                ),
             ),
+            # ---- Row 4 ----
+            ui.layout_columns(
+                    ui.input_selectize(
+                                    "Flattype1", "Select Flat Type:",
+                                    ["All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                                    selected= "All",
+                                ),
+            ), 
+
+            ui.layout_columns(
+                    ui.navset_card_tab(
+                        ui.nav_panel("Volume", ui.output_data_frame("table_volume")),   
+                        ui.nav_panel("Share", ui.output_data_frame("table_share")),
+                        ui.nav_panel("Max Price", ui.output_data_frame("table_max_price")),
+                        ui.nav_panel("Max PSF", ui.output_data_frame("table_max_psf")),
+                        ui.nav_panel("Median Price", ui.output_data_frame("table_median_price")),
+                        ui.nav_panel("Median PSF", ui.output_data_frame("table_median_psf")),
+                        id="tab",  
+                        title= "Table 7: Transactions by HDB Town" + "\u00A0\u00A0",  
+                    ),
+                    col_widths=[12]
+            ),
+            ui.layout_columns(
+                    ui.navset_card_tab(
+                        ui.nav_panel("Volume", ui.output_data_frame("project_volume")),   
+                        ui.nav_panel("Share", ui.output_data_frame("project_share")),
+                        ui.nav_panel("Max Price", ui.output_data_frame("project_max_price")),
+                        ui.nav_panel("Max PSF", ui.output_data_frame("project_max_psf")),
+                        ui.nav_panel("Median Price", ui.output_data_frame("project_median_price")),
+                        ui.nav_panel("Median PSF", ui.output_data_frame("project_median_psf")),
+                        ui.nav_panel("Median Lease Remaining", ui.output_data_frame("project_median_lease")),
+                        id="tab2",  
+                        title= "Table 8: Transactions by HDB Projects" + "\u00A0\u00A0",  
+                    ),
+                    col_widths=[12]
+            ),
+            ui.layout_columns(
+                    ui.navset_card_tab(
+                        ui.nav_panel("Max Price (Top 3)", ui.output_data_frame("high_max_price")),
+                        ui.nav_panel("Max PSF (Top 3)", ui.output_data_frame("high_max_psf")),
+                        ui.nav_panel("Town-level (Top 3)", ui.output_data_frame("high_town_level")),
+                        id="tab3",
+                        title="Table 9: Historical High Transactions" + "\u00A0\u00A0",
+                    ),
+                    col_widths=[12]
+                ),
+            ui.hr(),  # Horizontal line
+            ui.div(
+                ui.p(ui.tags.b("Source: "), "HDB, data.gov.sg, ", "OneMap.gov.sg", style="font-size: 12.5px; margin-bottom: 1px;"),
+                ui.p(ui.tags.b("Notes: "), style="font-size: 12.5px; margin-bottom: 1px;"),
+                ui.tags.ul(
+                    ui.tags.li("Charts and tables use detailed HDB resale price and transaction data and are based on date of registration of resale transactions."),
+                    ui.tags.li("Addresses and geocharacteristics are obtained from OneMap API."),
+                    ui.tags.li("The transactions exclude resale transactions that may not reflect the full market price such as resale between relatives and resale of part shares."),
+                    ui.tags.li("Remaining lease is the number of years left before the lease ends, and the property is returned to HDB."),
+                    style="font-size: 12px; color: #555; line-height: 1.2;"
+                ),
+                style="padding: 1px; margin-top: 1px;"
+            )
+        ),  
+        server_only_page("GEOGRAPHICAL DISTRIBUTION") if BROWSER_BUILD else ui.nav_panel("GEOGRAPHICAL DISTRIBUTION",
             ui.card(
-                ui.card_header("Chart 4: Resale PSF Trends of Million Dollar Flats"), 
-                output_widget("Chart_4"),
-                full_screen=True
+                ui.card_header("Map 1: Resale Transactions by Location"),
+                ui.layout_sidebar(
+                    ui.sidebar(
+                        ui.input_select("map_period", "Period:", []),
+                        ui.input_radio_buttons("map_metric", "Colour by:", MAP_METRICS, selected="MD_Share"),
+                        ui.div(ui.output_text("map_caption"), style="font-size: 12px; color: #555;"),
+                        bg="#f8f8f8",
+                        width=225,
+                    ),
+                    output_widget("hex_map"),
+                ),
+                full_screen=True,
+                height="700px",
             ),
         ),
-
-        # ---- Row 3 ----
-        ui.layout_columns(
-            # --- Card for Chart 5 ---
+        server_only_page("ANALYSIS") if BROWSER_BUILD else ui.nav_panel("ANALYSIS",
             ui.card(
-                ui.card_header("Chart 5: Median Price/PSF of Transactions (By Flat Type)"),
+                ui.card_header(ui.output_text("Chart_7_title", inline=True)),
                 ui.layout_sidebar(
                     ui.sidebar(
-                        ui.input_selectize(
-                            "select_flat_type",
-                            "Flat Type:",
-                            {"3 ROOM": "3 ROOM", "4 ROOM": "4 ROOM", "5 ROOM": "5 ROOM", "EXECUTIVE/MG" : "EXECUTIVE/MG"},
-                            selected=["4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
-                            multiple=True,
+                        ui.input_selectize("index_towns", "Compare HDB Towns:", hdbtowns, multiple=True),
+                        ui.input_select(
+                            "index_flat_type", "Flat Type:",
+                            ["All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                            selected="All",
                         ),
-                        ui.input_radio_buttons(  
-                            "select_PSF", 
-                            "Select:",  
-                            {"PSF": "PSF", "PRICE": "PRICE"}, 
-                            selected="PSF" 
-                        ),  
                         bg="#f8f8f8",
-                        width=225, 
-                        open="closed"  
+                        width=250,
                     ),
-                    output_widget("Chart_5"),
+                    output_widget("Chart_7"),
                 ),
-                full_screen=True
+                full_screen=True,
             ),
-
-            # --- Card for Chart 6 ---
             ui.card(
-                ui.card_header("Chart 6: Median Price/PSF of Transactions (Top 5 Towns)"),
+                ui.card_header("Table 10: Comparable Transactions Near a Block"),
                 ui.layout_sidebar(
                     ui.sidebar(
-                        ui.input_selectize(
-                            "select_town",
-                            "HDB Towns:",
-                            hdbtowns.tolist(),
-                            multiple=True,
-                            selected=None
+                        ui.input_selectize("comp_address", "Block:", [], options={"placeholder": "Type an address"}),
+                        ui.input_select(
+                            "comp_flat_type", "Flat Type:",
+                            ["All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                            selected="4 ROOM",
+                        ),
+                        ui.input_slider("comp_area", "Flat Size (sqm):", min=30, max=200, value=(80, 110), step=5),
+                        ui.input_select(
+                            "comp_months", "Sold in the Last:",
+                            {"6": "6 months", "12": "12 months", "24": "24 months", "36": "36 months"},
+                            selected="12",
+                        ),
+                        ui.input_radio_buttons("comp_mode", "Show:", {"k": "Nearest", "radius": "Within radius"}, selected="k"),
+                        ui.panel_conditional(
+                            "input.comp_mode === 'k'",
+                            ui.input_numeric("comp_k", "Transactions:", 20, min=1, max=200),
+                        ),
+                        ui.panel_conditional(
+                            "input.comp_mode === 'radius'",
+                            ui.input_numeric("comp_radius", "Radius (m):", 500, min=50, max=5000, step=50),
                         ),
-                        ui.input_radio_buttons(
-                            "select_PSF_town", 
-                            "Select:",  
-                            {"PSF": "PSF", "PRICE": "PRICE"}, 
-                            selected="PSF",  
-                        ),  
                         bg="#f8f8f8",
-                        width=225,
-                        open="closed"
+                        width=250,
                     ),
-                    output_widget("Chart_6"),
+                    ui.div(ui.output_text("comparables_summary"), style="font-size: 13px; color: #555;"),
+                    ui.output_data_frame("comparables_table"),
                 ),
-                full_screen=True
+                full_screen=True,
             ),
-        ),
-        # ---- Row 4 ----
-        ui.layout_columns(
-                ui.input_selectize(
-                                "Flattype1", "Select Flat Type:",
-                                ["All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
-                                selected= "All",
-                            ),
-        ), 
-
-        ui.layout_columns(
-                ui.navset_card_tab(
-                    ui.nav_panel("Volume", ui.output_data_frame("table_volume")),   
-                    ui.nav_panel("Share", ui.output_data_frame("table_share")),
-                    ui.nav_panel("Max Price", ui.output_data_frame("table_max_price")),
-                    ui.nav_panel("Max PSF", ui.output_data_frame("table_max_psf")),
-                    ui.nav_panel("Median Price", ui.output_data_frame("table_median_price")),
-                    ui.nav_panel("Median PSF", ui.output_data_frame("table_median_psf")),
-                    id="tab",  
-                    title= "Table 7: Transactions by HDB Town" + "\u00A0\u00A0",  
+            ui.card(
+                ui.card_header("Table 12: Any Date Range"),
+                ui.layout_sidebar(
+                    ui.sidebar(
+                        ui.input_slider(
+                            "range_dates", "Months:", min=first, max=last,
+                            value=(first, last), time_format="%b %Y",
+                        ),
+                        ui.input_radio_buttons("range_by", "Group By:", RANGE_GROUPS, selected="Town"),
+                        ui.input_select(
+                            "range_flat_type", "Flat Type:",
+                            ["All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                            selected="All",
+                        ),
+                        bg="#f8f8f8",
+                        width=250,
+                    ),
+                    ui.div(ui.output_text("range_summary"), style="font-size: 13px; color: #555;"),
+                    ui.output_data_frame("range_table"),
                 ),
-                col_widths=[12]
+                full_screen=True,
+            ),
         ),
-        ui.layout_columns(
-                ui.navset_card_tab(
-                    ui.nav_panel("Volume", ui.output_data_frame("project_volume")),   
-                    ui.nav_panel("Share", ui.output_data_frame("project_share")),
-                    ui.nav_panel("Max Price", ui.output_data_frame("project_max_price")),
-                    ui.nav_panel("Max PSF", ui.output_data_frame("project_max_psf")),
-                    ui.nav_panel("Median Price", ui.output_data_frame("project_median_price")),
-                    ui.nav_panel("Median PSF", ui.output_data_frame("project_median_psf")),
-                    ui.nav_panel("Median Lease Remaining", ui.output_data_frame("project_median_lease")),
-                    id="tab2",  
-                    title= "Table 8: Transactions by HDB Projects" + "\u00A0\u00A0",  
+        server_only_page("TRANSACTIONS") if BROWSER_BUILD else ui.nav_panel("TRANSACTIONS",
+            ui.layout_sidebar(
+                ui.sidebar(
+                    ui.input_selectize("explore_town", "HDB Towns:", hdbtowns, multiple=True),
+                    ui.input_selectize(
+                        "explore_flat_type", "Flat Type:",
+                        ["3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG"],
+                        multiple=True,
+                    ),
+                    ui.input_selectize(
+                        "explore_building", "Project Name:", [], multiple=True, options={"placeholder": "Type a project"}
+                    ),
+                    ui.input_text("explore_address", "Address Starts With:", placeholder="e.g. 273B PUNGGOL"),
+                    ui.input_slider(
+                        "explore_price", "Price ($):", min=0, max=price_max,
+                        value=(0, price_max), step=10_000,
+                    ),
+                    ui.input_slider("explore_storey", "Storey:", min=1, max=storey_max, value=(1, storey_max)),
+                    ui.input_date_range(
+                        "explore_dates", "Date:", start=first, end=last,
+                        min=first, max=last, startview="year",
+                    ),
+                    ui.input_select("explore_sort", "Sort By:", EXPLORER_SORTS, selected="date"),
+                    ui.input_checkbox("explore_desc", "Highest / latest first", value=True),
+                    bg="#f8f8f8",
+                    width=260,
                 ),
-                col_widths=[12]
-        ),
-        ui.layout_columns(
-                ui.navset_card_tab(
-                    ui.nav_panel("Max Price (Top 3)", ui.output_data_frame("high_max_price")),
-                    ui.nav_panel("Max PSF (Top 3)", ui.output_data_frame("high_max_psf")),
-                    ui.nav_panel("Town-level (Top 3)", ui.output_data_frame("high_town_level")),
-                    id="tab3",
-                    title="Table 9: Historical High Transactions" + "\u00A0\u00A0",
+                ui.card(
+                    ui.card_header("Table 11: All Resale Transactions"),
+                    ui.div(ui.output_text("explore_status"), style="font-size: 13px; color: #555;"),
+                    ui.output_data_frame("explore_table"),
+                    ui.div(
+                        ui.input_action_button("explore_prev", "‹ Previous", class_="btn-sm btn-outline-secondary"),
+                        ui.input_action_button("explore_next", "Next ›", class_="btn-sm btn-outline-secondary"),
+                        style="display: flex; gap: 8px; justify-content: flex-end;",
+                    ),
+                    full_screen=True,
                 ),
-                col_widths=[12]
             ),
-        ui.hr(),  # Horizontal line
-        ui.div(
-            ui.p(ui.tags.b("Source: "), "HDB, data.gov.sg, ", "OneMap.gov.sg", style="font-size: 12.5px; margin-bottom: 1px;"),
-            ui.p(ui.tags.b("Notes: "), style="font-size: 12.5px; margin-bottom: 1px;"),
-            ui.tags.ul(
-                ui.tags.li("Charts and tables use detailed HDB resale price and transaction data and are based on date of registration of resale transactions."),
-                ui.tags.li("Addresses and geocharacteristics are obtained from OneMap API."),
-                ui.tags.li("The transactions exclude resale transactions that may not reflect the full market price such as resale between relatives and resale of part shares."),
-                ui.tags.li("Remaining lease is the number of years left before the lease ends, and the property is returned to HDB."),
-                style="font-size: 12px; color: #555; line-height: 1.2;"
-            ),
-            style="padding: 1px; margin-top: 1px;"
-        )
-    ),  
-    ui.nav_panel("GEOGRAPHICAL DISTRIBUTION", "Page B content"),  
-    ui.nav_panel("ANALYSIS", "Page C content"),  
-    ui.nav_panel("TRANSACTIONS", "Page C content"),
-    ui.nav_spacer(),
-    ui.nav_control(
-        ui.div(
-            f"Last updated: {up_date}",
-            style="font-size: 13px; color: #666; padding-top: 12px; margin-right: 15px;", 
-            class_="last-updated"
-        )
-    ),
-    ui.nav_control(
-        ui.tags.a(
-            ui.tags.i(class_="fa-brands fa-github fa-lg"),
-            href="https://github.com/benjamintee/HDB-Million-Dollar.git",
-            target="_blank",
-            title="View source on GitHub",
-            class_="github-link"
-        )
-    ),
-    header=ui.tags.head(
-        ui.HTML('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">'),
-    
-        # Import font for the page and set it for the body of the page 
-        ui.tags.style("""
-            @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&display=swap');
-
-            /* 1. Global Font and Background */
-            html, body {
-                font-family: 'Inter', sans-serif !important;
-                background-color: #f8fafc; 
-            }
-
-            /* 2. Header / Navbar Customization */
-            .navbar {
-                background-color: #064e3b !important; /* Heritage Emerald */
-                border-bottom: 3px solid #059669;    /* Subtle lighter green accent line */
-            }
-
-            /* 3. Specific Navbar Text and Links (Restricted to .navbar) */
-            .navbar .navbar-brand {
-                color: #ffffff !important;
-                font-weight: 550;
-            }
-
-            .navbar .nav-link {
-                color: rgba(255, 255, 255, 0.85) !important;
-                font-weight: 500;
-                transition: all 0.2s ease-in-out;
-            }
-
-            .navbar .nav-link:hover {
-                color: #ffffff !important;
-            }
-
-            .navbar .nav-link.active {
-                color: #ffffff !important;
-                font-weight: 600;
-            }
-
-            /* 4. Navbar Metadata and Icons */
-            .navbar-text, .navbar .last-updated {
-                color: rgba(255, 255, 255, 0.85) !important;
-                font-size: 0.85rem;
-                font-weight: 400;
-            }
-
-            .navbar .github-link, .navbar .nav-link i.fa-github {
-                color: rgba(255, 255, 255, 0.85) !important;
-                transition: transform 0.2s ease;
-            }
-
-            .navbar .nav-link:hover i.fa-github {
-                color: #ffffff !important;
-                transform: scale(1.1);
-            }
-
-            /* 5. Ensure Table Content stays readable */
-            /* Styling the table header */
-            table thead th, 
-            .shiny-data-frame thead th,
-            .dataTables_wrapper table thead th {
-                font-size: 13px !important;
-                font-weight: 600 !important; /* Semi-bold for better readability */
-                vertical-align: middle !important;
-            }
-            .shiny-data-frame {
-                font-family: 'Inter', sans-serif !important;
-                color: #2d3436;
-            }
-            /* 6. Color the text in the table tabs in grey */
-            .card .nav-link {
-                color: #94a3b8 !important; /* Soft grey */
-                font-weight: 500;
-                border-bottom: 2px solid transparent;
-                transition: color 0.2s ease-in-out;
-            }
-
-            .card .nav-link:hover {
-                color: #475569 !important; /* Medium charcoal on hover */
-                background-color: transparent !important;
-            }
-
-            .card .nav-link.active {
-                color: #070708 !important; 
-                font-weight: 550;
-                background-color: transparent !important;
-            }
-
-            div.main.bslib-gap-spacing.html-fill-container {
-                padding-right: 5px !important;
-                padding-left: 8px !important;
-                padding-top: 5px !important;
-                padding-bottom: 8px !important;
-            }
-
-            /* EDITING THE UI INPUT SELECTORS */
-            /* 1. Reduce the size of the Label (e.g., "Flat Type:") */
-            .control-label {
-                font-size: 0.85rem !important;
-                font-weight: 600;
-                margin-bottom: 4px;
-            }
-
-            /* 2. Reduce the size of the selected items (the "pills") and the input text */
-            .selectize-input, .selectize-input input {
-                font-size: 0.85rem !important;
-                min-height: 32px !important;
-                line-height: 1.2 !important;
-            }
-
-            /* 3. Reduce the size of the options in the dropdown menu */
-            .selectize-dropdown {
-                font-size: 0.85rem !important;
-                line-height: 1.2 !important;
-            }
-
-            /* 4. Specifically for 'multiple=True', shrink the item badges */
-            .selectize-control.multi .selectize-input > div {
-                font-size: 0.8rem !important;
-                padding: 1px 5px !important;
-                margin: 2px !important;
-            }
-
-            hr {
-                margin-top: 0.5rem !important;
-                margin-bottom: 0.5rem !important;
-            }
-        """)
-    ),
-    title="MILLION DOLLAR HDB FLATS IN SINGAPORE",  
-    id="page",  
-)  
-
-# Helper function to filter data
-def filter_period(df, period, n=10):
-    latest_date = df["date"].max()
-    
-    if period == "Monthly":
-        start_date = latest_date - pd.DateOffset(months=n-1)
-        df_filtered = df[df["date"] >= start_date].copy()
-        df_filtered["Period"] = df_filtered["date"].dt.strftime("%b%y")  # e.g., Jan25
-        df_filtered["Period_sort"] = df_filtered["date"]
-    elif period == "Quarterly":
-        start_date = latest_date - pd.DateOffset(months=3*(n-1))
-        df_filtered = df[df["date"] >= start_date].copy()
-        df_filtered["Period_sort"] = df_filtered["date"].dt.to_period("Q").dt.start_time
-        df_filtered["Period"] = df_filtered["Period_sort"].dt.to_period("Q").apply(lambda x: f"{x.quarter}Q{x.year%100}")
-    else:  # Yearly
-        start_date = latest_date - pd.DateOffset(years=n-1)
-        df_filtered = df[df["date"] >= start_date].copy()
-        df_filtered["Period_sort"] = df_filtered["date"].dt.to_period("Y").dt.start_time
-        df_filtered["Period"] = df_filtered["Period_sort"].dt.year.astype(str)
+        ),
+        ui.nav_spacer(),
+        ui.nav_control(
+            ui.div(
+                ui.output_text("last_updated", inline=True),
+                style="font-size: 13px; color: #666; padding-top: 12px; margin-right: 15px;", 
+                class_="last-updated"
+            )
+        ),
+        ui.nav_control(
+            ui.tags.a(
+                ui.tags.i(class_="fa-brands fa-github fa-lg"),
+                href="https://github.com/benjamintee/HDB-Million-Dollar.git",
+                target="_blank",
+                title="View source on GitHub",
+                class_="github-link"
+            )
+        ),
+        header=ui.tags.head(
+            ui.HTML('<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.2/css/all.min.css">'),
     
-    return df_filtered
+            # Import font for the page and set it for the body of the page 
+            ui.tags.style("""
+                @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&display=swap');
+
+                /* 1. Global Font and Background */
+                html, body {
+                    font-family: 'Inter', sans-serif !important;
+                    background-color: #f8fafc; 
+                }
+
+                /* 2. Header / Navbar Customization */
+                .navbar {
+                    background-color: #064e3b !important; /* Heritage Emerald */
+                    border-bottom: 3px solid #059669;    /* Subtle lighter green accent line */
+                }
+
+                /* 3. Specific Navbar Text and Links (Restricted to .navbar) */
+                .navbar .navbar-brand {
+                    color: #ffffff !important;
+                    font-weight: 550;
+                }
+
+                .navbar .nav-link {
+                    color: rgba(255, 255, 255, 0.85) !important;
+                    font-weight: 500;
+                    transition: all 0.2s ease-in-out;
+                }
+
+                .navbar .nav-link:hover {
+                    color: #ffffff !important;
+                }
+
+                .navbar .nav-link.active {
+                    color: #ffffff !important;
+                    font-weight: 600;
+                }
+
+                /* 4. Navbar Metadata and Icons */
+                .navbar-text, .navbar .last-updated {
+                    color: rgba(255, 255, 255, 0.85) !important;
+                    font-size: 0.85rem;
+                    font-weight: 400;
+                }
+
+                .navbar .github-link, .navbar .nav-link i.fa-github {
+                    color: rgba(255, 255, 255, 0.85) !important;
+                    transition: transform 0.2s ease;
+                }
+
+                .navbar .nav-link:hover i.fa-github {
+                    color: #ffffff !important;
+                    transform: scale(1.1);
+                }
+
+                /* 5. Ensure Table Content stays readable */
+                /* Styling the table header */
+                table thead th, 
+                .shiny-data-frame thead th,
+                .dataTables_wrapper table thead th {
+                    font-size: 13px !important;
+                    font-weight: 600 !important; /* Semi-bold for better readability */
+                    vertical-align: middle !important;
+                }
+                .shiny-data-frame {
+                    font-family: 'Inter', sans-serif !important;
+                    color: #2d3436;
+                }
+                /* 6. Color the text in the table tabs in grey */
+                .card .nav-link {
+                    color: #94a3b8 !important; /* Soft grey */
+                    font-weight: 500;
+                    border-bottom: 2px solid transparent;
+                    transition: color 0.2s ease-in-out;
+                }
+
+                .card .nav-link:hover {
+                    color: #475569 !important; /* Medium charcoal on hover */
+                    background-color: transparent !important;
+                }
+
+                .card .nav-link.active {
+                    color: #070708 !important; 
+                    font-weight: 550;
+                    background-color: transparent !important;
+                }
+
+                div.main.bslib-gap-spacing.html-fill-container {
+                    padding-right: 5px !important;
+                    padding-left: 8px !important;
+                    padding-top: 5px !important;
+                    padding-bottom: 8px !important;
+                }
+
+                /* EDITING THE UI INPUT SELECTORS */
+                /* 1. Reduce the size of the Label (e.g., "Flat Type:") */
+                .control-label {
+                    font-size: 0.85rem !important;
+                    font-weight: 600;
+                    margin-bottom: 4px;
+                }
+
+                /* 2. Reduce the size of the selected items (the "pills") and the input text */
+                .selectize-input, .selectize-input input {
+                    font-size: 0.85rem !important;
+                    min-height: 32px !important;
+                    line-height: 1.2 !important;
+                }
+
+                /* 3. Reduce the size of the options in the dropdown menu */
+                .selectize-dropdown {
+                    font-size: 0.85rem !important;
+                    line-height: 1.2 !important;
+                }
+
+                /* 4. Specifically for 'multiple=True', shrink the item badges */
+                .selectize-control.multi .selectize-input > div {
+                    font-size: 0.8rem !important;
+                    padding: 1px 5px !important;
+                    margin: 2px !important;
+                }
+
+                hr {
+                    margin-top: 0.5rem !important;
+                    margin-bottom: 0.5rem !important;
+                }
+            """),
+            ui.tags.script(ui.HTML(CELL_FORMAT_JS)),
+        ),
+        title="MILLION DOLLAR HDB FLATS IN SINGAPORE",  
+        id="page",  
+    )
+
+# Helper function to lay out per-period aggregates as a table
+def pivot_periods(agg, index, value):
+    # `agg` comes from backend.aggregate([index, "Period_sort", "Period"], ...);
+    # columns follow the periods chronologically
+    long = agg.reset_index()
+    pivot = long.pivot(index=index, columns="Period", values=value).fillna(0)
+    pivot.columns.name = "Period"
+    return pivot[long.sort_values("Period_sort")["Period"].unique()]
 
 # Set custom styles for the charts on Page 1. 
 def apply_custom_theme(fig):
@@ -402,34 +710,156 @@ def apply_custom_theme(fig):
     
     return fig
 
+# Heatmap styling for the Table 7/8 period columns
+def apply_heatmap_style(df, target_cols_indices):
+    if df.empty or not target_cols_indices:
+        return []
+
+    # 1. Extract and convert to numeric for math
+    # We use the full df here to keep indices aligned
+    numeric_df = df.apply(pd.to_numeric, errors='coerce')
+    data_subset = numeric_df.iloc[:, target_cols_indices]
+    
+    v_max = data_subset.max().max()
+    v_min = data_subset[data_subset > 0].min().min()
+    if pd.isna(v_min): v_min = 0
+    v_range = v_max - v_min if v_max > v_min else 1
+
+    styles = []
+    
+    # 2. Iterate using the indices relative to the FULL dataframe
+    for col_idx in target_cols_indices:
+        for row_idx in range(len(df)):
+            # Pull from numeric_df using the actual column index from the original table
+            val = numeric_df.iloc[row_idx, col_idx]
+            
+            # Handle Zero or NaN
+            if pd.isna(val) or val == 0:
+                styles.append({
+                    "rows": [row_idx],
+                    "cols": [col_idx],
+                    "style": {
+                        "background-color": "#f1f5f9",
+                    }
+                })
+                continue
+
+            # 3. Apply Power Scale
+            norm = (val - v_min) / v_range
+            norm_adj = norm ** 2 
+            alpha = 0.05 + (norm_adj * 0.45)
+            
+            styles.append({
+                "rows": [row_idx],
+                "cols": [col_idx],
+                "style": {
+                    "background-color": f"rgba(6, 78, 59, {alpha:.2f})",
+                    "color": "#070708",
+                    "font-weight": "600" if norm > 0.75 else "normal"
+                }
+            })
+    return styles
+
+# Number formats for table columns, written out in the browser (CELL_FORMAT_JS)
+def cell_formats(df, formats):
+    # formats: {"usd_m": [columns], ...}. The columns are rounded in place to
+    # what the format shows; the returned styles tag their cells
+    styles = []
+    for fmt, cols in formats.items():
+        digits = CELL_FORMATS[fmt]
+        for col in cols:
+            values = pd.to_numeric(df[col], errors="coerce").round(digits)
+            df[col] = values.astype("int64") if digits <= 0 and values.notna().all() else values
+        styles.append({"cols": [df.columns.get_loc(c) for c in cols], "class": f"cell-{fmt}"})
+    return styles
+
 # Server
 def server(input, output, session):
+    timed = metrics.decorator(input, LOGGED_INPUTS)
+    # Latest Trends outputs are served from the snapshot's export when the inputs match one
+    static = prerendered(lambda: static_outputs(snapshot()), input)
+
+    # ---- Dataset snapshot ----
+    # Re-reads the live snapshot whenever the manager swaps in a new version,
+    # so every output below re-renders on the session's next flush
+    @reactive.poll(lambda: snapshots.version, 5)
+    def snapshot():
+        return snapshots.current
+
+    def backend():
+        return snapshot().data
+
+    def window(period_choice, **anchor):
+        return period_window(backend(), period_choice, **anchor)
+
+    # ---- Row-level pages ----
+    # A page's controls are filled from its index when the page is shown and
+    # were last filled from an older snapshot (or never), so opening LATEST
+    # TRENDS builds no page index. Snapshot version each control was filled from
+    filled = {}
+
+    def page_snapshot(title, control):
+        req(not BROWSER_BUILD and input.page() == title)  # pages left out of the browser build
+        snap = snapshot()
+        req(filled.get(control) != snap.version)
+        filled[control] = snap.version
+        return snap
+
+    @render.text
+    @timed
+    def last_updated():
+        return f"Last updated: {dataset_up_date(backend())}"
+
+    @reactive.Effect
+    @reactive.event(snapshot)
+    def _refresh_town_choices():
+        # Also on init: a session can start on a page built before a swap
+        towns = dataset_towns(backend())
+        selected = [t for t in input.select_town() if t in towns]
+        ui.update_selectize("select_town", choices=towns, selected=selected)
+        selected = [t for t in input.explore_town() if t in towns]
+        ui.update_selectize("explore_town", choices=towns, selected=selected)
+        selected = [t for t in input.index_towns() if t in towns]
+        ui.update_selectize("index_towns", choices=towns, selected=selected)
+
+    @reactive.Effect
+    @reactive.event(snapshot, input.page)
+    def _refresh_map_periods():
+        periods = spatial_index(page_snapshot("GEOGRAPHICAL DISTRIBUTION", "map_period")).periods
+        with reactive.isolate():
+            current = input.map_period()
+        ui.update_select("map_period", choices=periods, selected=current if current in periods else periods[0])
 
     # ---- Chart 1: Number of Million-Dollar Flats by Flat Type ----
     @render_widget
+    @timed
+    @static
     def Chart_1():
 
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
+        md = dict(min_price=MD_THRESHOLD)
 
-        df_md = filter_period(df[df["Resale_Price"] >= 1_000_000], period_choice, n=n_periods)
+        counts = backend().aggregate(
+            ["Period_sort", "Period", "Flat_Type"], {"Number": ("Resale_Price", "size")},
+            **window(period_choice, **md), **md,
+        ).reset_index()
 
         # Recode flat types
         flat_order = ["EXECUTIVE/MG", "5 ROOM", "4 ROOM", "3 ROOM"]
-        df_md["Flat_Type"] = pd.Categorical(df_md["Flat_Type"], categories=flat_order, ordered=True)
+        counts["Flat_Type"] = pd.Categorical(counts["Flat_Type"], categories=flat_order, ordered=True)
 
         # Summary grouped by period_sort and flat type
         summary = (
-            df_md.groupby(["Period_sort", "Flat_Type"], observed=True)
-            .size()
-            .reset_index(name="Number")
+            counts.dropna(subset=["Flat_Type"])
+            .sort_values(["Period_sort", "Flat_Type"])[["Period_sort", "Flat_Type", "Number"]]
+            .reset_index(drop=True)
             .sort_values("Period_sort")
         )
 
         # Totals per period
         totals = (
-            df_md.groupby("Period_sort")
-            .size()
+            counts.groupby("Period_sort")["Number"]
+            .sum()
             .reset_index(name="Total")
             .sort_values("Period_sort")
         )
@@ -455,7 +885,7 @@ def server(input, output, session):
         )
 
         # Replace x-axis with formatted labels, keeping order
-        period_labels = df_md[["Period_sort", "Period"]].drop_duplicates().sort_values("Period_sort")
+        period_labels = counts[["Period_sort", "Period"]].drop_duplicates().sort_values("Period_sort")
         fig.update_layout(
             xaxis=dict(
                 tickvals=period_labels["Period_sort"],
@@ -482,16 +912,20 @@ def server(input, output, session):
 
     # ---- Chart 2: Million-Dollar Flats as Share of Resale Transactions ----
     @render_widget
+    @timed
+    @static
     def Chart_2():
+        db = backend()
 
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-
-        df_filtered = filter_period(df, period_choice, n=n_periods)
+        period = window(period_choice)
 
         # Totals and million-dollar counts per period
-        total_by_period = df_filtered.groupby(["Period_sort", "Period"]).size().reset_index(name="Total_Transactions")
-        md_by_period = df_filtered[df_filtered["Resale_Price"] >= 1_000_000].groupby(["Period_sort", "Period"]).size().reset_index(name="MD_Transactions")
+        keys = ["Period_sort", "Period"]
+        total_by_period = db.aggregate(keys, {"Total_Transactions": ("Resale_Price", "size")}, **period).reset_index()
+        md_by_period = db.aggregate(
+            keys, {"MD_Transactions": ("Resale_Price", "size")}, **period, min_price=MD_THRESHOLD
+        ).reset_index()
 
         share = total_by_period.merge(md_by_period, on=["Period_sort", "Period"], how="left").fillna(0)
         share["MD_Share_Percent"] = (share["MD_Transactions"] / share["Total_Transactions"] * 100).round(1)
@@ -533,12 +967,16 @@ def server(input, output, session):
 
     # ---- Chart 3: Distribution of resale prices ----
     @render_widget
+    @timed
+    @static
     def Chart_3():
-
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
 
-        df_filtered = filter_period(df, period_choice, n=n_periods)
+        # Transactions per distinct price: a few thousand rows instead of every sale
+        df_filtered = backend().aggregate(
+            ["Period_sort", "Period", "Resale_Price"], {"Count": ("Resale_Price", "size")},
+            **window(period_choice),
+        ).reset_index()
 
         # ---- Define price bands ----
         bins = [0, 400_000, 600_000, 800_000, 1_000_000, 1_200_000, 1_400_000, 1_600_000, float("inf")]
@@ -560,15 +998,15 @@ def server(input, output, session):
         # ---- Aggregate counts ----
         counts = (
             df_filtered
-            .groupby(["Period_sort", "Period", "Price_Band"], observed=True)
-            .size()
-            .reset_index(name="Count")
+            .groupby(["Period_sort", "Period", "Price_Band"], observed=True)["Count"]
+            .sum()
+            .reset_index()
         )
 
         totals = (
             df_filtered
-            .groupby(["Period_sort", "Period"], observed=True)
-            .size()
+            .groupby(["Period_sort", "Period"], observed=True)["Count"]
+            .sum()
             .reset_index(name="Total")
         )
 
@@ -641,52 +1079,29 @@ def server(input, output, session):
 
     # ---- Chart 4: Resale PSF Trends ----
     @render_widget
+    @timed
+    @static
     def Chart_4():
+        db = backend()
 
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-
-        df_filtered = filter_period(df, period_choice, n=n_periods).copy()
-
-        # Compute PSF
-        df_filtered["PSF"] = (
-            df_filtered["Resale_Price"]
-            / df_filtered["Floor_Area_Sqm"]
-            / 10.764
-        )
+        period = window(period_choice)
 
-        # Million-dollar subset
-        df_md = df_filtered[df_filtered["Resale_Price"] >= 1_000_000]
-
-        # Aggregate
+        # Aggregate all resale and the million-dollar subset
+        keys = ["Period_sort", "Period"]
         psf = (
-            df_filtered
-            .groupby("Period_sort", observed=False)
-            .agg(
-                Median_PSF_All=("PSF", "median")
-            )
+            db.aggregate(keys, {"Median_PSF_All": ("PSF", "median")}, **period)
             .reset_index()
             .merge(
-                df_md
-                .groupby("Period_sort", observed=False)
-                .agg(
-                    Max_PSF=("PSF", "max"),
-                    Median_PSF=("PSF", "median")
-                )
-                .reset_index(),
-                on="Period_sort",
+                db.aggregate(
+                    keys, {"Max_PSF": ("PSF", "max"), "Median_PSF": ("PSF", "median")},
+                    **period, min_price=MD_THRESHOLD,
+                ).reset_index(),
+                on=keys,
                 how="left"
             )
         )
 
-        # Add readable period labels
-        period_labels = (
-            df_filtered[["Period_sort", "Period"]]
-            .drop_duplicates()
-            .sort_values("Period_sort")
-        )
-        psf = psf.merge(period_labels, on="Period_sort", how="left")
-
         psf["Period_sort"] = psf["Period_sort"].astype(str)
 
         # ---- Plot ----
@@ -768,25 +1183,21 @@ def server(input, output, session):
 
     # ---- Chart 5: Median PSF/Price by Flat Type ----
     @render_widget
+    @timed
+    @static
     def Chart_5():
         # 1. Period Filtering
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        df_filtered = filter_period(df, period_choice, n=n_periods).copy()
 
-        # 2. Price Filtering
-        df_md = df_filtered[df_filtered["Resale_Price"] >= 1_000_000].copy()
-        if df_md.empty:
+        # 2-3. Million-dollar medians per period and flat type
+        agg_df = backend().aggregate(
+            ["Period_sort", "Period", "Flat_Type"],
+            {"Median_PSF": ("PSF", "median"), "Median_Price": ("Resale_Price", "median")},
+            **window(period_choice), min_price=MD_THRESHOLD,
+        ).reset_index()
+        if agg_df.empty:
             return px.scatter(title="No million-dollar transactions in this period.")
 
-        # 3. Aggregation
-        df_md["PSF"] = df_md["Resale_Price"] / df_md["Floor_Area_Sqm"] / 10.764
-        agg_df = (
-            df_md.groupby(["Period_sort", "Period", "Flat_Type"], observed=False)
-            .agg(Median_PSF=("PSF", "median"), Median_Price=("Resale_Price", "median"))
-            .reset_index()
-        )
-
         # Identify the absolute latest period in the aggregate data
         latest_period_val = agg_df["Period_sort"].max()
 
@@ -880,64 +1291,39 @@ def server(input, output, session):
         fig = apply_custom_theme(fig)
         return fig       
 
+    # ---- Chart 6: Million-dollar medians per period and town ----
+    # Shared by the chart and the "Top 5" selection below, so both read one query
+    @reactive.calc
+    @timed
+    def chart6_medians():
+        return town_medians(backend(), input.Period1())
+
     # ---- Chart 6: Additional Logic to update UI based on reactive function --- 
     @reactive.Effect
-    @reactive.event(input.Period1, input.select_PSF_town)
+    @reactive.event(input.Period1, input.select_PSF_town, snapshot)
     def _update_town_selection():
-        # 1. Get the current filtered data
-        period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        df_filtered = filter_period(df, period_choice, n=n_periods).copy()
-        
-        # Filter for Million-Dollar transactions
-        df_md = df_filtered[df_filtered["Resale_Price"] >= 1_000_000].copy()
-        
-        if not df_md.empty:
-            # 2. Calculate Metric
-            df_md["PSF"] = df_md["Resale_Price"] / df_md["Floor_Area_Sqm"] / 10.764
-            metric_choice = input.select_PSF_town()
-            y_col = "PSF" if metric_choice == "PSF" else "Resale_Price"
-            
-            # 3. Identify the Latest Period to find the "Top 5"
-            # We use the raw sort value to find the most recent time slot
-            latest_period_val = df_md["Period_sort"].max()
-            latest_towns_df = df_md[df_md["Period_sort"] == latest_period_val]
-            
-            # 4. Group by Town and find the Top 5
-            top_5_towns = (
-                latest_towns_df.groupby("Town")[y_col]
-                .median()
-                .sort_values(ascending=False)
-                .head(5)
-                .index.tolist()
-            )
-            
-            # 5. Push these selections to the UI
+        # Select the Top 5 towns of the latest period for the chosen metric
+        top_5_towns = default_towns(chart6_medians(), input.select_PSF_town())
+        if top_5_towns:
             ui.update_selectize("select_town", selected=top_5_towns)
 
     # ---- Chart 6: Top 5 Towns by Metric ----
     @render_widget
+    @timed
+    @static
     def Chart_6():
-        # 1. Initial Filtering
+        # 1. Million-dollar medians per period and town
         period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        df_filtered = filter_period(df, period_choice, n=n_periods).copy()
-        df_md = df_filtered[df_filtered["Resale_Price"] >= 1_000_000].copy()
+        agg_df = chart6_medians()
 
-        if df_md.empty:
+        if agg_df.empty:
             return px.scatter(title="No million-dollar transactions found.")
 
-        # 2. Metric Calculation
-        df_md["PSF"] = df_md["Resale_Price"] / df_md["Floor_Area_Sqm"] / 10.764
+        # 2. Metric Choice
         metric_choice = input.select_PSF_town()
         y_col = "Median_PSF" if metric_choice == "PSF" else "Median_Price"
         y_label = "Median PSF ($)" if metric_choice == "PSF" else "Median Price ($)"
         
-        agg_df = (
-            df_md.groupby(["Period_sort", "Period", "Town"], observed=False)
-            .agg(Median_PSF=("PSF", "median"), Median_Price=("Resale_Price", "median"))
-            .reset_index()
-        )
         latest_period_val = agg_df["Period_sort"].max()
 
         # 3. Dynamic "Top 5" Logic + Freshness Filter
@@ -1037,118 +1423,39 @@ def server(input, output, session):
 
     # ---- Chart 7: Filtering Data to Show Trends by Town ----
     @reactive.Calc
-    def table_data_base():
-        # 1. Initial Filtering for Million Dollar Flats
-        df_md = df[df["Resale_Price"] >= 1_000_000].copy()
-        
-        # 2. Apply Flat Type Filter
+    @timed
+    def table_filters():
+        # 1. Million-dollar flats of the chosen flat type
         ft_choice = input.Flattype1()
-        if ft_choice != "All":
-            df_md = df_md[df_md["Flat_Type"] == ft_choice]
-        
-        # 3. Use your existing helper to create Period/Period_sort
-        period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        df_filtered = filter_period(df_md, period_choice, n=n_periods)
-        
-        return df_filtered, period_choice
-
-    @reactive.Calc
-    def prepared_table_df():
-        df_filtered, period_choice = table_data_base()
-        
-        if df_filtered.empty:
-            return pd.DataFrame(), [], pd.DataFrame(), input.Flattype1()
-        
-        # Identify unique periods to show as columns 
-        recent_periods = sorted(df_filtered["Period_sort"].unique())
-        
-        # Calculate Last 12 Months separately
-        # We filter the million-dollar records from the last 365 days
-        latest_date = df["date"].max()
-        twelve_months_ago = latest_date - pd.DateOffset(months=12)
-        
-        # Filter base df_md for the 12-month stat
-        df_md_all = df[df["Resale_Price"] >= 1_000_000].copy()
-        ft_choice = input.Flattype1()
-        if ft_choice != "All":
-            df_md_all = df_md_all[df_md_all["Flat_Type"] == ft_choice]
-            
-        last_12m_df = df_md_all[df_md_all["date"] > twelve_months_ago]
-        
-        return df_filtered, recent_periods, last_12m_df, ft_choice
-
-    def apply_heatmap_style(df, target_cols_indices):
-        if df.empty or not target_cols_indices:
-            return []
+        md = dict(min_price=MD_THRESHOLD, flat_type=ft_choice)
 
-        # 1. Extract and convert to numeric for math
-        # We use the full df here to keep indices aligned
-        numeric_df = df.apply(pd.to_numeric, errors='coerce')
-        data_subset = numeric_df.iloc[:, target_cols_indices]
-        
-        v_max = data_subset.max().max()
-        v_min = data_subset[data_subset > 0].min().min()
-        if pd.isna(v_min): v_min = 0
-        v_range = v_max - v_min if v_max > v_min else 1
+        # 2. Period window ending at their latest month
+        period = window(input.Period1(), **md)
 
-        styles = []
-        
-        # 2. Iterate using the indices relative to the FULL dataframe
-        for col_idx in target_cols_indices:
-            for row_idx in range(len(df)):
-                # Pull from numeric_df using the actual column index from the original table
-                val = numeric_df.iloc[row_idx, col_idx]
-                
-                # Handle Zero or NaN
-                if pd.isna(val) or val == 0:
-                    styles.append({
-                        "rows": [row_idx],
-                        "cols": [col_idx],
-                        "style": {
-                            "background-color": "#f1f5f9",
-                        }
-                    })
-                    continue
+        # 3. Last 12 Months start, from the latest month of all resale
+        l12m_start = backend().latest_date() - pd.DateOffset(months=12)
 
-                # 3. Apply Power Scale
-                norm = (val - v_min) / v_range
-                norm_adj = norm ** 2 
-                alpha = 0.05 + (norm_adj * 0.45)
-                
-                styles.append({
-                    "rows": [row_idx],
-                    "cols": [col_idx],
-                    "style": {
-                        "background-color": f"rgba(6, 78, 59, {alpha:.2f})",
-                        "color": "#070708",
-                        "font-weight": "600" if norm > 0.75 else "normal"
-                    }
-                })
-        return styles
+        return md, period, l12m_start, ft_choice
 
     # ---- Chart 7: Filtering Data to Show Trends by Town ----
     # 7A: Volume Trends
     @render.data_frame
+    @timed
+    @static
     def table_volume():
-        df_filtered, recent_periods, last_12m_df, ft_choice = prepared_table_df()
-        
-        if df_filtered.empty:
+        md, period, l12m_start, ft_choice = table_filters()
+        db = backend()
+        counts = db.aggregate(["Town", "Period_sort", "Period"], {"Count": ("Resale_Price", "size")}, **period, **md)
+
+        if counts.empty:
             return pd.DataFrame({"Result": ["No data for selection"]})
 
         # 1. Pivot and Sort
-        pivot = df_filtered.pivot_table(
-            index="Town", columns="Period", values="Resale_Price", aggfunc="count"
-        ).fillna(0)
-        trend_cols = df_filtered.sort_values("Period_sort")["Period"].unique()
-        pivot = pivot[trend_cols]
+        pivot = pivot_periods(counts, "Town", "Count")
 
         # 2. Summary Columns
-        l12m = last_12m_df.groupby("Town").size().rename("Last 12 Months")
-        df_md_total = df[df["Resale_Price"] >= 1_000_000].copy()
-        if ft_choice != "All":
-            df_md_total = df_md_total[df_md_total["Flat_Type"] == ft_choice]
-        cumulative = df_md_total.groupby("Town").size().rename("Historical All")
+        l12m = db.aggregate(["Town"], {"Last 12 Months": ("Resale_Price", "size")}, after=l12m_start, **md)["Last 12 Months"]
+        cumulative = db.aggregate(["Town"], {"Historical All": ("Resale_Price", "size")}, **md)["Historical All"]
         
         # 3. Combine and Reset Index
         result = pivot.join(l12m, how="left").join(cumulative, how="left").fillna(0).astype(int)
@@ -1182,49 +1489,43 @@ def server(input, output, session):
         )
     # Chart 7B: Share of transactions by Town 
     @render.data_frame
+    @timed
+    @static
     def table_share():
-        # 1. Get filtered Million-Dollar data and L12M slice from reactive calc
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
+        db = backend()
+        # 1. Million-Dollar counts for the selected periods
+        md, period, l12m_start, ft_choice = table_filters()
+        keys = ["Town", "Period_sort", "Period"]
+        md_counts = db.aggregate(keys, {"Count": ("Resale_Price", "size")}, **period, **md)
         
-        if df_md_filtered.empty:
+        if md_counts.empty:
             return render.DataTable(pd.DataFrame({"Message": ["No data available"]}))
 
-        # 2. Get Total Market data (All HDB flats) for the same periods
-        period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        
-        # Filter the global 'df' (entire market) to match chosen timeframe
-        df_all_market = filter_period(df, period_choice, n=n_periods)
+        # 2. Get Total Market counts (All HDB flats) for the same periods
+        all_counts = db.aggregate(keys, {"Count": ("Resale_Price", "size")}, **window(input.Period1()))
 
         # 3. Create Pivot for Numerator (MD Counts)
-        md_pivot = df_md_filtered.pivot_table(
-            index="Town", columns="Period", values="Resale_Price", aggfunc="count"
-        ).fillna(0)
+        md_pivot = pivot_periods(md_counts, "Town", "Count")
 
         # 4. Create Pivot for Denominator (Total Market Counts)
-        total_pivot = df_all_market.pivot_table(
-            index="Town", columns="Period", values="Resale_Price", aggfunc="count"
-        ).fillna(0)
+        total_pivot = pivot_periods(all_counts, "Town", "Count")
 
         # 5. Calculate Share Percentage
         # Use .reindex_like to ensure denominators align with numerators
         share_result = (md_pivot / total_pivot.reindex_like(md_pivot) * 100).fillna(0)
 
         # 6. Reorder columns chronologically
-        # Use df_all_market for the sort to ensure all time slots are captured
-        chronological_cols = df_all_market.sort_values("Period_sort")["Period"].unique()
+        # Use the total market for the sort to ensure all time slots are captured
+        chronological_cols = total_pivot.columns
         # Filter to only include columns that actually exist in the share_result
         existing_cols = [c for c in chronological_cols if c in share_result.columns]
         share_result = share_result[existing_cols]
 
         # 7. Calculate Last 12 Months Share (%)
-        latest_date = df["date"].max()
-        l12m_start = latest_date - pd.DateOffset(months=12)
-        
         # Total Market (All Sales) in last 12 months
-        all_12m = df[df["date"] > l12m_start].groupby("Town").size()
+        all_12m = db.aggregate(["Town"], {"Count": ("Resale_Price", "size")}, after=l12m_start)["Count"]
         # Million Dollar Market in last 12 months
-        md_12m = last_12m_md.groupby("Town").size()
+        md_12m = db.aggregate(["Town"], {"Count": ("Resale_Price", "size")}, after=l12m_start, **md)["Count"]
         
         l12m_share = (md_12m / all_12m * 100).fillna(0).rename("Last 12 Months (%)")
 
@@ -1233,10 +1534,8 @@ def server(input, output, session):
         result.insert(1, "Flat Type", ft_choice)
         result = result.sort_values(by="Last 12 Months (%)", ascending=False)
 
-        # 9. Formatting: Convert to string with 1 decimal place and % sign
-        cols_to_format = [c for c in result.columns if c not in ["Town", "Flat Type"]]
-        for col in cols_to_format:
-            result[col] = result[col].map("{:.1f}%".format)
+        # 9. Formatting: 1 decimal place and % sign, written out in the browser
+        formats = cell_formats(result, {"pct": [c for c in result.columns if c not in ["Town", "Flat Type"]]})
 
         # 10. Render with Compact Styling
         return render.DataTable(
@@ -1244,45 +1543,33 @@ def server(input, output, session):
             styles=[
                 {"style": {"padding": "4px 8px", "font-size": "13px", "line-height": "1.1","white-space": "nowrap"}},
                 {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
-                {"cols": [len(result.columns)-1, len(result.columns)-2], "style": {"background-color": "#f8fafc", "font-weight": "600"}}
+                {"cols": [len(result.columns)-1, len(result.columns)-2], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
+                *formats
             ],
             height="auto",
             width="100%"
         )
     # Table 7C: Max Price for each town 
     @render.data_frame
+    @timed
+    @static
     def table_max_price():
-        # 1. Get filtered Million-Dollar data from reactive calc
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
+        # 1. Get Million-Dollar filters from reactive calc
+        md, period, l12m_start, ft_choice = table_filters()
+        db = backend()
+        max_prices = db.aggregate(["Town", "Period_sort", "Period"], {"Max": ("Resale_Price", "max")}, **period, **md)
         
-        if df_md_filtered.empty:
+        if max_prices.empty:
             return render.DataTable(pd.DataFrame({"Message": ["No data available"]}))
 
-        # 2. Pivot for the selected periods (Max Price per Town/Period)
-        max_pivot = df_md_filtered.pivot_table(
-            index="Town", 
-            columns="Period", 
-            values="Resale_Price", 
-            aggfunc="max"
-        ).fillna(0)
+        # 2-3. Pivot for the selected periods (Max Price per Town/Period), chronologically
+        max_pivot = pivot_periods(max_prices, "Town", "Max")
 
-        # 3. Reorder columns chronologically using your preferred syntax
-        max_pivot = max_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
-
-        # 4. Calculate Historical Max (All-time MD record for each town)
-        selected_flat_type = input.Flattype1()
-        
-        # Start with all Million-Dollar sales
-        df_hist = df[df["Resale_Price"] >= 1_000_000].copy()
-        
-        # Apply the same Flat Type filter used in the rest of the app
-        if selected_flat_type != "All":
-            df_hist = df_hist[df_hist["Flat_Type"] == selected_flat_type]
-            
-        historical_max = df_hist.groupby("Town")["Resale_Price"].max().rename("ATH Max")
+        # 4. Calculate Historical Max (All-time MD record for each town, same Flat Type filter)
+        historical_max = db.aggregate(["Town"], {"ATH Max": ("Resale_Price", "max")}, **md)["ATH Max"]
         
         # 5. Calculate Last 12 Months Max
-        l12m_max = last_12m_md.groupby("Town")["Resale_Price"].max().rename("L12M Max")
+        l12m_max = db.aggregate(["Town"], {"L12M Max": ("Resale_Price", "max")}, after=l12m_start, **md)["L12M Max"]
 
         # 6. Final Join and Sort
         result = max_pivot.join([l12m_max, historical_max], how="left").fillna(0).reset_index()
@@ -1294,12 +1581,8 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 2)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        # 8. Formatting: Convert to "$X.XXM" strings
-        cols_to_format = [c for c in result.columns if c not in ["Town", "Flat Type"]]
-        for col in cols_to_format:
-            result[col] = result[col].apply(
-                lambda x: f"${x/1_000_000:.2f}M" if x > 0 else "-"
-            )
+        # 8. Formatting: "$X.XXM", written out in the browser
+        formats = cell_formats(result, {"usd_m": [c for c in result.columns if c not in ["Town", "Flat Type"]]})
 
         # 9. Render with same compact styling
         return render.DataTable(
@@ -1308,47 +1591,33 @@ def server(input, output, session):
                 {"style": {"padding": "4px 8px", "font-size": "13px", "line-height": "1.1", "white-space": "nowrap"}},
                 {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
                 {"cols": [len(result.columns)-1, len(result.columns)-2], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-                *heatmap_styles
+                *heatmap_styles,
+                *formats
             ],
             height="auto",
             width="100%"
         )
     # Chart 7D: Max PSF for each town
     @render.data_frame
+    @timed
+    @static
     def table_max_psf():
-        # 1. Get filtered Million-Dollar data from reactive calc
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
+        # 1. Get Million-Dollar filters from reactive calc
+        md, period, l12m_start, ft_choice = table_filters()
+        db = backend()
+        max_psf = db.aggregate(["Town", "Period_sort", "Period"], {"Max": ("PSF", "max")}, **period, **md)
         
-        if df_md_filtered.empty:
+        if max_psf.empty:
             return render.DataTable(pd.DataFrame({"Message": ["No data available"]}))
 
-        # 2. Pivot for the selected periods (Max PSF per Town/Period)
-        psf_pivot = df_md_filtered.pivot_table(
-            index="Town", 
-            columns="Period", 
-            values="PSF", 
-            aggfunc="max"
-        ).fillna(0)
-
-        # 3. Reorder columns chronologically
-        psf_pivot = psf_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
+        # 2-3. Pivot for the selected periods (Max PSF per Town/Period), chronologically
+        psf_pivot = pivot_periods(max_psf, "Town", "Max")
 
         # 4. Calculate All-Time High (ATH) PSF BASED ON FLAT TYPE
-        selected_flat_type = input.Flattype1()
-        
-        # Start with global data where price >= 1M
-        df_hist = df[df["Resale_Price"] >= 1_000_000].copy()
-        
-        # Calculate PSF for the historical dataset
-        df_hist["PSF"] = df_hist["Resale_Price"] / (df_hist["Floor_Area_Sqm"] * 10.764)
-        
-        if selected_flat_type != "All":
-            df_hist = df_hist[df_hist["Flat_Type"] == selected_flat_type]
-            
-        historical_psf = df_hist.groupby("Town")["PSF"].max().rename("ATH Max PSF")
+        historical_psf = db.aggregate(["Town"], {"ATH Max PSF": ("PSF", "max")}, **md)["ATH Max PSF"]
         
         # 5. Calculate Last 12 Months Max PSF
-        l12m_psf = last_12m_md.groupby("Town")["PSF"].max().rename("L12M Max PSF")
+        l12m_psf = db.aggregate(["Town"], {"L12M Max PSF": ("PSF", "max")}, after=l12m_start, **md)["L12M Max PSF"]
 
         # 6. Final Join and Sort
         result = psf_pivot.join([l12m_psf, historical_psf], how="left").fillna(0).reset_index()
@@ -1360,12 +1629,8 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 2)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        # 8. Formatting: Convert to "$X,XXX" strings
-        cols_to_format = [c for c in result.columns if c not in ["Town", "Flat Type"]]
-        for col in cols_to_format:
-            result[col] = result[col].apply(
-                lambda x: f"${x:,.0f}" if x > 0 else "-"
-            )
+        # 8. Formatting: "$X,XXX", written out in the browser
+        formats = cell_formats(result, {"usd": [c for c in result.columns if c not in ["Town", "Flat Type"]]})
 
         # 9. Render with compact styling
         return render.DataTable(
@@ -1374,43 +1639,33 @@ def server(input, output, session):
                 {"style": {"padding": "4px 8px", "font-size": "13px", "line-height": "1.1", "white-space": "nowrap"}},
                 {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
                 {"cols": [len(result.columns)-1, len(result.columns)-2], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-                *heatmap_styles
+                *heatmap_styles,
+                *formats
             ],
             height="auto",
             width="100%"
         )
     # Table 7D/7E: Median Price and Median PSF 
     def render_median_table(column_name, is_price=True):
-        # 1. Get filtered Million-Dollar data
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
+        db = backend()
+        # 1. Get Million-Dollar filters
+        md, period, l12m_start, ft_choice = table_filters()
+        medians = db.aggregate(["Town", "Period_sort", "Period"], {"Median": (column_name, "median")}, **period, **md)
         
-        if df_md_filtered.empty:
+        if medians.empty:
             return render.DataTable(pd.DataFrame({"Message": ["No data available"]}))
 
-        # 2. Pivot for Million-Dollar Medians
-        md_pivot = df_md_filtered.pivot_table(
-            index="Town", columns="Period", values=column_name, aggfunc="median"
-        ).fillna(0)
-        
-        # Ensure correct chronological order
-        correct_order = df_md_filtered.sort_values("Period_sort")["Period"].unique()
-        md_pivot = md_pivot[correct_order]
-
-        # 3. Calculate "All Resale" Benchmark (Global Data)
-        selected_flat_type = input.Flattype1()
-        
-        # Filter global df for the last 12 months
-        latest_date = df["date"].max()
-        l12m_start = latest_date - pd.DateOffset(months=12)
-        df_all_12m = df[df["date"] > l12m_start].copy()
-        
-        # Apply Flat Type filter to benchmark
-        if selected_flat_type != "All":
-            df_all_12m = df_all_12m[df_all_12m["Flat_Type"] == selected_flat_type]
+        # 2. Pivot for Million-Dollar Medians, in chronological order
+        md_pivot = pivot_periods(medians, "Town", "Median")
 
-        # Calculate Medians
-        l12m_md_median = last_12m_md.groupby("Town")[column_name].median().rename("L12M MD Median")
-        all_resale_median = df_all_12m.groupby("Town")[column_name].median().rename("L12M Resale All")
+        # 3. Calculate Medians, incl. the "All Resale" benchmark: all flats of
+        # the selected Flat Type in the last 12 months
+        l12m_md_median = db.aggregate(
+            ["Town"], {"L12M MD Median": (column_name, "median")}, after=l12m_start, **md
+        )["L12M MD Median"]
+        all_resale_median = db.aggregate(
+            ["Town"], {"L12M Resale All": (column_name, "median")}, after=l12m_start, flat_type=md["flat_type"]
+        )["L12M Resale All"]
 
         # 4. Join and Sort
         # The order will be: Town, [Months...], L12M MD Median, All Resale
@@ -1423,13 +1678,9 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 2)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        # 6. Formatting Logic
+        # 6. Formatting: "$X.XXM" or "$X,XXX", written out in the browser
         cols_to_format = [c for c in result.columns if c not in ["Town", "Flat Type"]]
-        for col in cols_to_format:
-            if is_price:
-                result[col] = result[col].apply(lambda x: f"${x/1e6:.2f}M" if x > 0 else "-")
-            else:
-                result[col] = result[col].apply(lambda x: f"${x:,.0f}" if x > 0 else "-")
+        formats = cell_formats(result, {"usd_m" if is_price else "usd": cols_to_format})
 
         return render.DataTable(
             result,
@@ -1437,47 +1688,46 @@ def server(input, output, session):
                 {"style": {"padding": "4px 8px", "font-size": "13px", "line-height": "1.1", "white-space": "nowrap"}},
                 {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}},
                 {"cols": [len(result.columns)-1, len(result.columns)-2], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-                *heatmap_styles
+                *heatmap_styles,
+                *formats
             ],
             height="auto",
             width="100%"
         )
 
     @render.data_frame
+    @timed
+    @static
     def table_median_price():
         return render_median_table("Resale_Price", is_price=True)
 
     @render.data_frame
+    @timed
+    @static
     def table_median_psf():
         return render_median_table("PSF", is_price=False)
 
     # ---- Table 8A: Project Volume ----
     @render.data_frame
+    @timed
+    @static
     def project_volume():
-        df_filtered, recent_periods, last_12m_df, ft_choice = prepared_table_df()
-        df_filtered = df_filtered[df_filtered["BUILDING"] != "NIL"]
-        if df_filtered.empty:
+        md, period, l12m_start, ft_choice = table_filters()
+        db = backend()
+        projects = dict(**md, named_only=True)
+        counts = db.aggregate(["BUILDING", "Period_sort", "Period"], {"Count": ("Resale_Price", "size")}, **period, **projects)
+        if counts.empty:
             return pd.DataFrame({"Result": ["No data"]})
 
-        # Pivot by Project (BUILDING)
-        pivot = df_filtered.pivot_table(
-            index="BUILDING", columns="Period", values="Resale_Price", aggfunc="count"
-        ).fillna(0)
-
-        # Sort columns chronologically
-        pivot = pivot[df_filtered.sort_values("Period_sort")["Period"].unique()]
+        # Pivot by Project (BUILDING), columns chronologically
+        pivot = pivot_periods(counts, "BUILDING", "Count")
         
         # Metadata: Get the Town for each Project (first occurrence)
-        project_towns = df_filtered.groupby("BUILDING")["Town"].first()
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
         
-        # Stats: L12M and Historical All
-        l12m = last_12m_df.groupby("BUILDING").size().rename("Last 12 Months")
-        
-        # "Historical All" based on selected Flat Type
-        df_md_all = df[df["Resale_Price"] >= 1_000_000]
-        if ft_choice != "All":
-            df_md_all = df_md_all[df_md_all["Flat_Type"] == ft_choice]
-        hist_all = df_md_all.groupby("BUILDING").size().rename("Historical All")
+        # Stats: L12M and Historical All (based on selected Flat Type)
+        l12m = db.aggregate(["BUILDING"], {"Last 12 Months": ("Resale_Price", "size")}, after=l12m_start, **projects)["Last 12 Months"]
+        hist_all = db.aggregate(["BUILDING"], {"Historical All": ("Resale_Price", "size")}, **projects)["Historical All"]
         
         # Combine
         result = pivot.join([project_towns, l12m, hist_all], how="left").fillna(0)
@@ -1507,59 +1757,63 @@ def server(input, output, session):
 
     # ---- Table 8B: Project Share ----
     @render.data_frame
+    @timed
+    @static
     def project_share():
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
-        df_md_filtered = df_md_filtered[df_md_filtered["BUILDING"] != "NIL"]
-        if df_md_filtered.empty:
+        db = backend()
+        md, period, l12m_start, ft_choice = table_filters()
+        projects = dict(**md, named_only=True)
+        keys = ["BUILDING", "Period_sort", "Period"]
+        md_counts = db.aggregate(keys, {"Count": ("Resale_Price", "size")}, **period, **projects)
+        if md_counts.empty:
             return pd.DataFrame({"Message": ["No data"]})
 
-        period_choice = input.Period1()
-        n_periods = {"Monthly": 10, "Quarterly": 8, "Yearly": 8}[period_choice]
-        df_all_market = filter_period(df, period_choice, n=n_periods)
+        all_counts = db.aggregate(keys, {"Count": ("Resale_Price", "size")}, **window(input.Period1()), named_only=True)
 
-        md_pivot = df_md_filtered.pivot_table(index="BUILDING", columns="Period", values="Resale_Price", aggfunc="count").fillna(0)
-        total_pivot = df_all_market.pivot_table(index="BUILDING", columns="Period", values="Resale_Price", aggfunc="count").fillna(0)
+        md_pivot = pivot_periods(md_counts, "BUILDING", "Count")
+        total_pivot = pivot_periods(all_counts, "BUILDING", "Count")
 
         share_result = (md_pivot / total_pivot.reindex_like(md_pivot) * 100).fillna(0)
-        chrono_cols = [c for c in df_all_market.sort_values("Period_sort")["Period"].unique() if c in share_result.columns]
+        chrono_cols = [c for c in total_pivot.columns if c in share_result.columns]
         share_result = share_result[chrono_cols]
 
         # Metadata
-        project_towns = df_md_filtered.groupby("BUILDING")["Town"].first()
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
         
         # L12M Share
-        l12m_start = df["date"].max() - pd.DateOffset(months=12)
-        all_12m = df[df["date"] > l12m_start].groupby("BUILDING").size()
-        md_12m = last_12m_md.groupby("BUILDING").size()
+        all_12m = db.aggregate(["BUILDING"], {"Count": ("Resale_Price", "size")}, after=l12m_start, named_only=True)["Count"]
+        md_12m = db.aggregate(["BUILDING"], {"Count": ("Resale_Price", "size")}, after=l12m_start, **projects)["Count"]
         l12m_share = (md_12m / all_12m * 100).fillna(0).rename("Last 12 Months (%)")
 
         result = share_result.join([project_towns, l12m_share], how="left").fillna(0).reset_index().rename(columns={"BUILDING": "Project Name"})
         result.insert(1, "Town", result.pop("Town"))
         result = result.sort_values(by="Last 12 Months (%)", ascending=False)
 
-        cols_to_format = [c for c in result.columns if c not in ["Project Name", "Town"]]
-        for col in cols_to_format:
-            result[col] = result[col].map("{:.1f}%".format)
+        formats = cell_formats(result, {"pct": [c for c in result.columns if c not in ["Project Name", "Town"]]})
 
         return render.DataTable(result, styles=[
             {"style": {"padding": "4px 8px", "line-height": "1.1", "font-size": "13px"}}, 
             {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
-            {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}}
+            {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
+            *formats
         ])
 
     # ---- Table 8C: Project Max Price ----
     @render.data_frame
+    @timed
+    @static
     def project_max_price():
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
-        df_md_filtered = df_md_filtered[df_md_filtered["BUILDING"] != "NIL"]
-        if df_md_filtered.empty:
+        db = backend()
+        md, period, l12m_start, ft_choice = table_filters()
+        projects = dict(**md, named_only=True)
+        max_prices = db.aggregate(["BUILDING", "Period_sort", "Period"], {"Max": ("Resale_Price", "max")}, **period, **projects)
+        if max_prices.empty:
             return pd.DataFrame({"Message": ["No data"]})
 
-        max_pivot = df_md_filtered.pivot_table(index="BUILDING", columns="Period", values="Resale_Price", aggfunc="max").fillna(0)
-        max_pivot = max_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
+        max_pivot = pivot_periods(max_prices, "BUILDING", "Max")
         
-        project_towns = df_md_filtered.groupby("BUILDING")["Town"].first()
-        l12m_max = last_12m_md.groupby("BUILDING")["Resale_Price"].max().rename("L12M Max")
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
+        l12m_max = db.aggregate(["BUILDING"], {"L12M Max": ("Resale_Price", "max")}, after=l12m_start, **projects)["L12M Max"]
 
         result = max_pivot.join([project_towns, l12m_max], how="left").fillna(0).reset_index().rename(columns={"BUILDING": "Project Name"})
         result.insert(1, "Town", result.pop("Town"))
@@ -1569,30 +1823,32 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 1)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        cols_to_format = [c for c in result.columns if c not in ["Project Name", "Town"]]
-        for col in cols_to_format:
-            result[col] = result[col].map(lambda x: f"${x/1e6:.2f}M" if x > 0 else "-")
+        formats = cell_formats(result, {"usd_m": [c for c in result.columns if c not in ["Project Name", "Town"]]})
 
         return render.DataTable(result, styles=[
             {"style": {"padding": "4px 8px", "line-height": "1.1", "font-size": "13px"}}, 
             {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
             {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-            *heatmap_styles
+            *heatmap_styles,
+            *formats
         ])
 
     # ---- Table 8D: Project Max PSF ----
     @render.data_frame
+    @timed
+    @static
     def project_max_psf():
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
-        df_md_filtered = df_md_filtered[df_md_filtered["BUILDING"] != "NIL"]
-        if df_md_filtered.empty:
+        db = backend()
+        md, period, l12m_start, ft_choice = table_filters()
+        projects = dict(**md, named_only=True)
+        max_psf = db.aggregate(["BUILDING", "Period_sort", "Period"], {"Max": ("PSF", "max")}, **period, **projects)
+        if max_psf.empty:
             return pd.DataFrame({"Message": ["No data"]})
 
-        psf_pivot = df_md_filtered.pivot_table(index="BUILDING", columns="Period", values="PSF", aggfunc="max").fillna(0)
-        psf_pivot = psf_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
+        psf_pivot = pivot_periods(max_psf, "BUILDING", "Max")
         
-        project_towns = df_md_filtered.groupby("BUILDING")["Town"].first()
-        l12m_psf = last_12m_md.groupby("BUILDING")["PSF"].max().rename("L12M Max PSF")
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
+        l12m_psf = db.aggregate(["BUILDING"], {"L12M Max PSF": ("PSF", "max")}, after=l12m_start, **projects)["L12M Max PSF"]
 
         result = psf_pivot.join([project_towns, l12m_psf], how="left").fillna(0).reset_index().rename(columns={"BUILDING": "Project Name"})
         result.insert(1, "Town", result.pop("Town"))
@@ -1602,29 +1858,29 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 1)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        cols_to_format = [c for c in result.columns if c not in ["Project Name", "Town"]]
-        for col in cols_to_format:
-            result[col] = result[col].map(lambda x: f"${x:,.0f}" if x > 0 else "-")
+        formats = cell_formats(result, {"usd": [c for c in result.columns if c not in ["Project Name", "Town"]]})
 
         return render.DataTable(result, styles=[
             {"style": {"padding": "4px 8px", "line-height": "1.1", "font-size": "13px"}}, 
             {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
             {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-            *heatmap_styles
+            *heatmap_styles,
+            *formats
         ])
 
     # ---- Table 8E/F: Project Median Helper ----
     def render_project_median(column_name, is_price=True):
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
-        df_md_filtered = df_md_filtered[df_md_filtered["BUILDING"] != "NIL"]
-        if df_md_filtered.empty:
+        db = backend()
+        md, period, l12m_start, ft_choice = table_filters()
+        projects = dict(**md, named_only=True)
+        medians = db.aggregate(["BUILDING", "Period_sort", "Period"], {"Median": (column_name, "median")}, **period, **projects)
+        if medians.empty:
             return pd.DataFrame({"Message": ["No data"]})
 
-        md_pivot = df_md_filtered.pivot_table(index="BUILDING", columns="Period", values=column_name, aggfunc="median").fillna(0)
-        md_pivot = md_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
+        md_pivot = pivot_periods(medians, "BUILDING", "Median")
 
-        project_towns = df_md_filtered.groupby("BUILDING")["Town"].first()
-        l12m_md_median = last_12m_md.groupby("BUILDING")[column_name].median().rename("L12M Median")
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
+        l12m_md_median = db.aggregate(["BUILDING"], {"L12M Median": (column_name, "median")}, after=l12m_start, **projects)["L12M Median"]
 
         result = md_pivot.join([project_towns, l12m_md_median], how="left").fillna(0).reset_index().rename(columns={"BUILDING": "Project Name"})
         result.insert(1, "Town", result.pop("Town"))
@@ -1635,57 +1891,51 @@ def server(input, output, session):
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
         cols_to_format = [c for c in result.columns if c not in ["Project Name", "Town"]]
-        for col in cols_to_format:
-            if is_price:
-                result[col] = result[col].map(lambda x: f"${x/1e6:.2f}M" if x > 0 else "-")
-            else:
-                result[col] = result[col].map(lambda x: f"${x:,.0f}" if x > 0 else "-")
+        formats = cell_formats(result, {"usd_m" if is_price else "usd": cols_to_format})
 
         return render.DataTable(result, styles=[
             {"style": {"padding": "4px 8px", "line-height": "1.1", "font-size": "13px"}}, 
             {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
             {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-            *heatmap_styles
+            *heatmap_styles,
+            *formats
         ])
 
     @render.data_frame
+    @timed
+    @static
     def project_median_price():
         return render_project_median("Resale_Price", is_price=True)
 
     @render.data_frame
+    @timed
+    @static
     def project_median_psf():
         return render_project_median("PSF", is_price=False)
 
     # ---- Table 8G: Project Median Lease Remaining ----
     @render.data_frame
+    @timed
+    @static
     def project_median_lease():
-        # 1. Get filtered Million-Dollar data
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
-        
-        # 2. Filter out "NIL" Buildings
-        df_md_filtered = df_md_filtered[df_md_filtered["BUILDING"] != "NIL"]
+        db = backend()
+        # 1-2. Million-Dollar filters, without "NIL" Buildings
+        md, period, l12m_start, ft_choice = table_filters()
+        projects = dict(**md, named_only=True)
+        medians = db.aggregate(["BUILDING", "Period_sort", "Period"], {"Median": ("Lease_Remain_Months", "median")}, **period, **projects)
         
-        if df_md_filtered.empty:
+        if medians.empty:
             return pd.DataFrame({"Message": ["No data"]})
+        medians["Median"] /= 12  # years, with the months as a fraction
 
-        # 3. Pivot for Median Lease Remaining
-        # Group by Project (BUILDING) and Period
-        lease_pivot = df_md_filtered.pivot_table(
-            index="BUILDING", 
-            columns="Period", 
-            values="Lease.Remain", 
-            aggfunc="median"
-        ).fillna(0)
-
-        # 4. Ensure Chronological Column Order
-        lease_pivot = lease_pivot[df_md_filtered.sort_values("Period_sort")["Period"].unique()]
+        # 3-4. Pivot for Median Lease Remaining by Project (BUILDING) and Period, chronologically
+        lease_pivot = pivot_periods(medians, "BUILDING", "Median")
 
         # 5. Metadata and L12M Benchmarks
-        project_towns = df_md_filtered.groupby("BUILDING")["Town"].first()
-        
-        # Filter NIL from L12M slice before grouping
-        l12m_clean = last_12m_md[last_12m_md["BUILDING"] != "NIL"]
-        l12m_lease_median = l12m_clean.groupby("BUILDING")["Lease.Remain"].median().rename("L12M Median Lease")
+        project_towns = db.aggregate(["BUILDING"], {"Town": ("Town", "first")}, **period, **projects)["Town"]
+        l12m_lease_median = db.aggregate(
+            ["BUILDING"], {"L12M Median Lease": ("Lease_Remain_Months", "median")}, after=l12m_start, **projects
+        )["L12M Median Lease"] / 12
 
         # 6. Combine everything
         result = lease_pivot.join([project_towns, l12m_lease_median], how="left").fillna(0).reset_index()
@@ -1701,34 +1951,36 @@ def server(input, output, session):
         period_indices = list(range(2, n_cols - 2)) 
         heatmap_styles = apply_heatmap_style(result, period_indices)
 
-        # 7. Formatting: Apply " Yrs" suffix to all numeric columns
-        cols_to_format = [c for c in result.columns if c not in ["Project Name", "Town"]]
-        for col in cols_to_format:
-            # We use 1 decimal place to show half-years in medians
-            result[col] = result[col].map(lambda x: f"{x:.0f} Yrs" if x > 0 else "-")
+        # 7. Formatting: " Yrs" suffix on all numeric columns, written out in the browser
+        formats = cell_formats(result, {"yrs": [c for c in result.columns if c not in ["Project Name", "Town"]]})
 
         # 8. Render with standard Table 8 styling
         return render.DataTable(result, styles=[
             {"style": {"padding": "4px 8px", "line-height": "1.1", "font-size": "13px", "white-space": "nowrap"}}, 
             {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}}, 
             {"cols": [len(result.columns)-1], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
-            *heatmap_styles
+            *heatmap_styles,
+            *formats
         ])
 
     # ---- Table 9 Helper: Ranking Transactions with Highlighting ----
     def get_top_transactions(group_cols, sort_col):
-        df_md_filtered, recent_periods, last_12m_md, ft_choice = prepared_table_df()
+        md, period, l12m_start, ft_choice = table_filters()
+
+        # 1. Top 3 per group, highest first
+        result = backend().top_k(
+            group_cols, {"Price": "Resale_Price", "PSF": "PSF"}[sort_col], 3,
+            [
+                "Flat_Type", "date", "Town", "BUILDING", "ADDRESS", 
+                "Flat_Model", "Floor_Area_Sqm", "Storey_Range", "Lease_Remain_Months", 
+                "Resale_Price", "PSF"
+            ],
+            **period, **md,
+        )
         
-        if df_md_filtered.empty:
+        if result.empty:
             return pd.DataFrame({"Message": ["No data available"]})
 
-        # 1. Select and initial copy
-        result = df_md_filtered[[
-            "Flat_Type", "date", "Town", "BUILDING", "ADDRESS", 
-            "Flat_Model", "Floor_Area_Sqm", "Storey_Range", "Lease.Remain", 
-            "Resale_Price", "PSF"
-        ]].copy()
-
         # 2. Format the Date column (MMM YYYY)
         result["Date"] = result["date"].dt.strftime("%b %Y").str.upper()
         
@@ -1740,18 +1992,10 @@ def server(input, output, session):
             "Flat_Model": "Flat Model",
             "Floor_Area_Sqm": "Flat Size",
             "Storey_Range": "Storey Range",
-            "Lease.Remain": "Lease Remaining",
+            "Lease_Remain_Months": "Lease Remaining",
             "Resale_Price": "Price"
         })
 
-        mapped_groups = [c.replace("_", " ") if c == "Flat_Type" else c for c in group_cols]
-
-        # 4. Rank and Filter for Top 3
-        # We sort first, then assign a rank within each group
-        result = result.sort_values(by=mapped_groups + [sort_col], ascending=[True] * len(mapped_groups) + [False])
-        result["Rank"] = result.groupby(mapped_groups).cumcount() + 1
-        result = result[result["Rank"] <= 3]
-
         # 5. Final column selection
         final_cols = [
             "Rank", "Flat Type", "Date", "Town", "Project Name", "Address", 
@@ -1760,11 +2004,11 @@ def server(input, output, session):
         ]
         result = result[final_cols]
 
-        # 6. Formatting Numerics
-        result["Price"] = result["Price"].map(lambda x: f"${x/1e6:.2f}M" if isinstance(x, (int, float)) else x)
-        result["PSF"] = result["PSF"].map(lambda x: f"${x:,.0f}" if isinstance(x, (int, float)) else x)
-        result["Flat Size"] = result["Flat Size"].map(lambda x: f"{x:.0f} sqm" if isinstance(x, (int, float)) else x)
-        result["Lease Remaining"] = result["Lease Remaining"].map(lambda x: f"{x:.0f} Yrs" if isinstance(x, (int, float)) else x)
+        # 6. Formatting Numerics (lease in years), written out in the browser
+        result["Lease Remaining"] = result["Lease Remaining"] / 12
+        formats = cell_formats(result, {
+            "usd_m": ["Price"], "usd": ["PSF"], "sqm": ["Flat Size"], "yrs": ["Lease Remaining"],
+        })
 
         # 7. Render with Conditional Styling for Rank 1
         return render.DataTable(
@@ -1792,25 +2036,453 @@ def server(input, output, session):
                 {
                     "rows": [i for i, r in enumerate(result["Rank"]) if r == 1],
                     "style": {"background-color": "#f8f9fa"}
-                }
+                },
+                *formats
             ],
             height="auto",
             width="100%"
         )
     @render.data_frame
+    @timed
+    @static
     def high_max_price():
         return get_top_transactions(["Flat_Type"], "Price")
 
     @render.data_frame
+    @timed
+    @static
     def high_max_psf():
         return get_top_transactions(["Flat_Type"], "PSF")
 
     @render.data_frame
+    @timed
+    @static
     def high_town_level():
         return get_top_transactions(["Town", "Flat_Type"], "Price")
 
+    # ---- Chart 7: Repeat-Sales Price Index ----
+    # Every view is scaled to the index's base quarter, named in the title and axis
+    @render.text
+    def Chart_7_title():
+        base = price_index(snapshot()).base_label
+        return f"Chart 7: Repeat-Sales Price Index ({base} = 100)" if base else "Chart 7: Repeat-Sales Price Index"
+
+    @render_widget
+    @timed
+    def Chart_7():
+        # 1. All towns, then each selected town, for the chosen flat type
+        index = price_index(snapshot())
+        flat_type = input.index_flat_type()
+        views = [("All Towns", None)] + [(town, town) for town in input.index_towns()]
+        series = pd.concat(
+            [index.series(town, flat_type).assign(View=name) for name, town in views], ignore_index=True
+        )
+        if series.empty:
+            return px.line(title="No repeat sales found.")
+
+        fig = px.line(
+            series,
+            x="Period_sort",
+            y="Index",
+            color="View",
+            custom_data=["Period", "Pairs"],
+        )
+        fig.update_traces(
+            line=dict(width=2.5),
+            hovertemplate="%{customdata[0]}: %{y:.1f}<br>Repeat sales: %{customdata[1]:,}<extra>%{fullData.name}</extra>",
+        )
+        fig.add_hline(y=100, line=dict(color="#94a3b8", width=1, dash="dot"))
+        fig.update_layout(
+            xaxis_title="Quarter",
+            yaxis_title=f"Index ({index.base_label} = 100)",
+            legend=dict(orientation="h", yanchor="bottom", y=1.00, xanchor="center", x=0.5),
+            legend_title_text=None,
+        )
+
+        fig = apply_custom_theme(fig)
+        return fig
+
+    # ---- Table 10: Comparable Transactions ----
+    @reactive.Effect
+    @reactive.event(snapshot, input.page)
+    def _refresh_comparable_blocks():
+        # Thousands of blocks: the browser fetches matches as the user types
+        addresses = comparables_index(page_snapshot("ANALYSIS", "comp_address")).addresses.tolist()
+        with reactive.isolate():
+            current = input.comp_address()
+        ui.update_selectize(
+            "comp_address", choices=addresses, selected=current if current in addresses else None, server=True
+        )
+
+    @reactive.calc
+    @timed
+    def comparables():
+        address = input.comp_address()
+        req(address)
+        radius = input.comp_mode() == "radius"
+        req(input.comp_radius() if radius else input.comp_k())
+        return comparables_index(snapshot()).query(
+            address,
+            flat_type=input.comp_flat_type(),
+            area=input.comp_area(),
+            months=int(input.comp_months()),
+            k=int(input.comp_k() or 0),
+            radius_m=input.comp_radius() if radius else None,
+        )
+
+    @render.text
+    def comparables_summary():
+        result = comparables()
+        if result.empty:
+            return "No comparable transactions found. Widen the flat size band, period or radius."
+        return (
+            f"{len(result):,} comparable transactions within {result['Distance'].max():,.0f} m: "
+            f"median ${result['Resale_Price'].median():,.0f}, median PSF ${result['PSF'].median():,.0f}"
+        )
+
+    @render.data_frame
+    @timed
+    def comparables_table():
+        result = comparables()
+        if result.empty:
+            return pd.DataFrame({"Message": ["No data available"]})
+
+        # 1. Format and rename as in Table 9
+        result = result.assign(Date=result["date"].dt.strftime("%b %Y").str.upper())
+        result = result.rename(columns={
+            "ADDRESS": "Address",
+            "BUILDING": "Project Name",
+            "Flat_Type": "Flat Type",
+            "Flat_Model": "Flat Model",
+            "Floor_Area_Sqm": "Flat Size",
+            "Storey_Range": "Storey Range",
+            "Lease_Remain_Months": "Lease Remaining",
+            "Resale_Price": "Price",
+        })
+        result = result[[
+            "Distance", "Date", "Address", "Project Name", "Flat Type", "Flat Model",
+            "Flat Size", "Storey Range", "Lease Remaining", "Price", "PSF",
+        ]]
+
+        # 2. Formatting Numerics
+        result["Lease Remaining"] = result["Lease Remaining"] / 12
+        formats = cell_formats(result, {
+            "metres": ["Distance"], "usd": ["Price", "PSF"], "sqm": ["Flat Size"], "yrs": ["Lease Remaining"],
+        })
+
+        return render.DataTable(
+            result,
+            styles=[
+                {"style": {"padding": "4px 8px", "font-size": "12.5px", "white-space": "nowrap"}},
+                {"cols": [2], "style": {"min-width": "180px"}},
+                {"cols": [3], "style": {"min-width": "120px"}},
+                *formats,
+            ],
+            height="auto",
+            width="100%",
+        )
+
+    # ---- Table 12: Any Date Range ----
+    # Prefix sums and sparse maxima per entity (range_index.py): any range of
+    # months costs the same as the L12M window it opens on
+    # The months shown: the window last sent to the slider, then the slider's
+    # own value, so the placeholder the page opens on is never queried
+    range_span = reactive.value(None)
+    # The slider's last month, so a range ending on it can follow a swap
+    range_last = reactive.value(None)
+
+    @reactive.Effect
+    @reactive.event(snapshot, input.page)
+    def _refresh_range_months():
+        # First opened: the L12M window; later snapshots keep the range shown
+        first, last, opening = range_months(page_snapshot("ANALYSIS", "range_dates"))
+        start, end = range_span() or opening
+        previous = range_last()
+        # A range that ended on the slider's last month follows it to the new one
+        end = last if previous is not None and end >= previous else min(end, last)
+        start = min(max(start, first), end)
+        range_last.set(last)
+        range_span.set((start, end))
+        ui.update_slider("range_dates", min=first, max=last, value=(start, end))
+
+    @reactive.Effect
+    @reactive.event(input.range_dates)
+    def _follow_range_slider():
+        req(range_span() is not None)
+        range_span.set(tuple(input.range_dates()))
+
+    @reactive.calc
+    @timed
+    def range_stats():
+        span = range_span()
+        req(span)
+        start, end = span
+        return range_index(snapshot()).query(input.range_by(), start, end, input.range_flat_type())
+
+    @render.text
+    def range_summary():
+        result = range_stats()
+        start, end = range_span()
+        months = (end.year - start.year) * 12 + end.month - start.month + 1
+        return (
+            f"{start:%b %Y} to {end:%b %Y} ({months} months): {result['Count'].sum():,} transactions, "
+            f"{result['MD_Count'].sum():,} of them million-dollar"
+        )
+
+    @render.data_frame
+    @timed
+    def range_table():
+        result = range_stats()
+        if result.empty:
+            return pd.DataFrame({"Message": ["No data available"]})
+
+        # 1. Busiest million-dollar entities first
+        by = input.range_by()
+        result = result.sort_values(["MD_Count", "Count"], ascending=False).reset_index()
+        result[["MD_Max_Price", "MD_Max_PSF"]] = result[["MD_Max_Price", "MD_Max_PSF"]].fillna(0)
+        result = result.rename(columns={
+            by: {"Town": "Town", "BUILDING": "Project Name", "Flat_Type": "Flat Type"}[by],
+            "Count": "Transactions",
+            "MD_Count": "MD Transactions",
+            "MD_Share": "MD Share",
+            "Mean_Price": "Mean Price",
+            "Mean_PSF": "Mean PSF",
+            "MD_Max_Price": "MD Max Price",
+            "MD_Max_PSF": "MD Max PSF",
+        })
+        if by != "Flat_Type":
+            result.insert(1, "Flat Type", input.range_flat_type())
+
+        # 2. Formatting Numerics
+        formats = cell_formats(result, {
+            "pct": ["MD Share"],
+            "usd_m": ["Mean Price", "MD Max Price"],
+            "usd": ["Mean PSF", "MD Max PSF"],
+        })
+
+        return render.DataTable(
+            result,
+            styles=[
+                {"style": {"padding": "4px 8px", "font-size": "13px", "line-height": "1.1", "white-space": "nowrap"}},
+                {"cols": [0], "style": {"font-weight": "bold", "min-width": "220px"}},
+                {"cols": [result.columns.get_loc("MD Transactions")], "style": {"background-color": "#f8fafc", "font-weight": "600"}},
+                *formats,
+            ],
+            width="100%",
+        )
+
+    # ---- Table 11: All Resale Transactions ----
+    # Filters and sorting run on the snapshot's explorer index (explorer.py);
+    # only the current page of rows is sent to the browser
+    explore_page = reactive.value(0)
+
+    @reactive.Effect
+    @reactive.event(snapshot, input.page)
+    def _refresh_explorer_projects():
+        explorer = explorer_index(page_snapshot("TRANSACTIONS", "explore_building"))
+        projects = [b for b in explorer.indexes["BUILDING"].categories if b != "NIL"]
+        with reactive.isolate():
+            selected = [b for b in input.explore_building() if b in projects]
+        ui.update_selectize("explore_building", choices=projects, selected=selected, server=True)
+
+    # The limits the sliders were last given, so a range at an edge follows
+    # the edge on a swap (the placeholders before the page is first opened)
+    explore_edges = reactive.value(PLACEHOLDER_LIMITS)
+
+    @reactive.Effect
+    @reactive.event(snapshot, input.page)
+    def _refresh_explorer_limits():
+        limits = explorer_limits(page_snapshot("TRANSACTIONS", "explore_limits"))
+        price_top, storey_top, (first, last) = limits
+        old_price_top, old_storey_top, (old_first, old_last) = explore_edges()
+        price_min, price_max = input.explore_price()
+        storey_min, storey_max = input.explore_storey()
+        start, end = input.explore_dates()
+        explore_edges.set(limits)
+
+        # 1. A price or storey at the top of its slider (no upper limit) stays there
+        price_max = price_top if price_max >= old_price_top else min(price_max, price_top)
+        storey_max = storey_top if storey_max >= old_storey_top else min(storey_max, storey_top)
+        ui.update_slider("explore_price", max=price_top, value=(min(price_min, price_max), price_max))
+        ui.update_slider("explore_storey", max=storey_top, value=(min(storey_min, storey_max), storey_max))
+
+        # 2. Dates at either end of the range move with it
+        start = first if start is None or start <= old_first else min(max(start, first), last)
+        end = last if end is None or end >= old_last else max(min(end, last), start)
+        ui.update_date_range("explore_dates", start=start, end=end, min=first, max=last)
+
+    @reactive.calc
+    @timed
+    def explore_filters():
+        price_min, price_max = input.explore_price()
+        storey_min, storey_max = input.explore_storey()
+        first, last = input.explore_dates()
+        price_top, storey_top, _ = explore_edges()
+        return Filters(
+            towns=tuple(input.explore_town()),
+            buildings=tuple(input.explore_building()),
+            flat_types=tuple(input.explore_flat_type()),
+            address_prefix=input.explore_address(),
+            price=(price_min or None, None if price_max >= price_top else price_max),
+            storey=None if storey_min <= 1 and storey_max >= storey_top else (storey_min, storey_max),
+            dates=(first, last),
+        )
+
+    @reactive.Effect
+    @reactive.event(explore_filters, input.explore_sort, input.explore_desc, snapshot)
+    def _reset_explore_page():
+        explore_page.set(0)
+
+    @reactive.calc
+    @timed
+    def explore_results():
+        return explorer_index(snapshot()).search(
+            explore_filters(), input.explore_sort(), input.explore_desc(), offset=explore_page() * PAGE_SIZE,
+        )
+
+    @reactive.Effect
+    @reactive.event(input.explore_next)
+    def _next_explore_page():
+        total, _ = explore_results()
+        if (explore_page() + 1) * PAGE_SIZE < total:
+            explore_page.set(explore_page() + 1)
+
+    @reactive.Effect
+    @reactive.event(input.explore_prev)
+    def _previous_explore_page():
+        explore_page.set(max(explore_page() - 1, 0))
+
+    @render.text
+    def explore_status():
+        total, page = explore_results()
+        if not total:
+            return "No transactions match these filters."
+        first = explore_page() * PAGE_SIZE + 1
+        return f"Showing {first:,}–{first + len(page) - 1:,} of {total:,} transactions"
+
+    @render.data_frame
+    @timed
+    def explore_table():
+        _, result = explore_results()
+        if result.empty:
+            return pd.DataFrame({"Message": ["No data available"]})
+
+        # 1. Format and rename as in Table 9
+        result = result.assign(Date=result["date"].dt.strftime("%b %Y").str.upper())
+        result = result.rename(columns={
+            "Flat_Type": "Flat Type",
+            "BUILDING": "Project Name",
+            "ADDRESS": "Address",
+            "Flat_Model": "Flat Model",
+            "Floor_Area_Sqm": "Flat Size",
+            "Storey_Range": "Storey Range",
+            "Lease_Remain_Months": "Lease Remaining",
+            "Resale_Price": "Price",
+        })
+        result = result[[
+            "Date", "Town", "Flat Type", "Project Name", "Address", "Flat Model",
+            "Flat Size", "Storey Range", "Lease Remaining", "Price", "PSF",
+        ]]
+
+        # 2. Formatting Numerics
+        result["Lease Remaining"] = result["Lease Remaining"] / 12
+        formats = cell_formats(result, {"usd": ["Price", "PSF"], "sqm": ["Flat Size"], "yrs": ["Lease Remaining"]})
+
+        return render.DataTable(
+            result,
+            styles=[
+                {"style": {"padding": "4px 8px", "font-size": "12.5px", "white-space": "nowrap"}},
+                {"cols": [3], "style": {"min-width": "120px"}},
+                {"cols": [4], "style": {"min-width": "180px"}},
+                *formats,
+            ],
+            height="auto",
+            width="100%",
+        )
+
+    # ---- Map 1: Hexagon aggregates for the visible area ----
+    # The widget is drawn once per session; pans, zooms and input changes
+    # only swap the cells it holds, never the raw points
+    map_view = reactive.value(MAP_VIEW)
+
+    # Set once the period select has its choices (the page is opened); the
+    # widget waits for it rather than drawing an empty map
+    map_ready = reactive.value(False)
+
+    @reactive.Effect
+    @reactive.event(input.map_period)
+    def _map_ready():
+        req(input.map_period())
+        map_ready.set(True)
+
+    @reactive.calc
+    @timed
+    def map_cells():
+        req(input.map_period())
+        view = map_view()
+        bounds = viewport_bounds(view["lon"], view["lat"], view["zoom"], *MAP_SIZE_PX)
+        return spatial_index(snapshot()).cells(input.map_period(), bounds, view["zoom"])
+
+    def map_trace(cells, size, metric):
+        return dict(
+            geojson=cells_geojson(cells, size),
+            locations=list(range(len(cells))),
+            z=cells[metric],
+            customdata=cells[["Count", "Median_PSF", "MD_Share"]],
+            colorbar=dict(title=dict(text=MAP_METRICS[metric], side="right"), thickness=12),
+        )
+
+    @render_widget
+    @timed
+    def hex_map():
+        req(map_ready())
+        with reactive.isolate():
+            cells, size = map_cells()
+            metric = input.map_metric()
+            view = map_view()
+
+        fig = go.FigureWidget(go.Choroplethmap(
+            **map_trace(cells, size, metric),
+            colorscale="Emrld",
+            marker=dict(opacity=0.75, line=dict(width=0.3, color="white")),
+            hovertemplate=(
+                "Transactions: %{customdata[0]:,}<br>"
+                "Median PSF: $%{customdata[1]:,.0f}<br>"
+                "Million-Dollar Share: %{customdata[2]:.1f}%<extra></extra>"
+            ),
+        ))
+        fig.update_layout(
+            map=dict(style="carto-positron", center=dict(lon=view["lon"], lat=view["lat"]), zoom=view["zoom"]),
+            margin=dict(t=0, b=0, l=0, r=0),
+            font=dict(family="Inter, sans-serif", color="#2d3436"),
+        )
+
+        def on_view(layout, center, zoom):
+            map_view.set({"lon": center["lon"], "lat": center["lat"], "zoom": zoom})
+
+        fig.layout.on_change(on_view, "map.center", "map.zoom")
+        return fig
+
+    @reactive.Effect
+    def _update_hex_map():
+        widget = hex_map.widget
+        cells, size = map_cells()
+        metric = input.map_metric()
+        with widget.batch_update():
+            widget.data[0].update(map_trace(cells, size, metric))
+
+    @render.text
+    def map_caption():
+        cells, size = map_cells()
+        index = spatial_index(snapshot())
+        return (
+            f"{len(cells):,} areas of {size:,} m shown, from {index.rows:,} geocoded transactions. "
+            "Zoom in for finer areas."
+        )
+
 # Run app
 app = App(app_ui, server)
+app.starlette_app.router.routes.insert(0, metrics.route())
 
 if __name__ == "__main__":
     app.run(host="127.0.0.1", port=8000)
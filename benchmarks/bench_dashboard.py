@@ -0,0 +1,317 @@
+"""
+Dashboard benchmark (headless)
+
+Times the data path of every dashboard output on synthetic data:
+1. Write (or reuse) a synthetic dataset per size under benchmarks/.cache
+2. Import app.py against it in a fresh subprocess (load time, frame size)
+3. Time a period-window aggregate and apply_heatmap_style on their own
+4. Run server() in a stub session (headless.py) and call every renderer
+   for a fixed grid of inputs: latency, peak traced memory and serialized
+   payload bytes
+
+Renderers run in registration order within one stub session per input
+combination, so shared reactive calcs are charged to the first output that
+reads them, exactly as in a live flush.
+
+Usage:
+    python -m benchmarks.bench_dashboard --rows 100000 1000000 10000000 --out bench.json
+    python -m benchmarks.bench_dashboard --rows 100000 --baseline bench.json
+    python -m benchmarks.bench_dashboard --rows 1000000 --backend duckdb --baseline bench.json
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+from datetime import datetime, UTC
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# =====================================================
+# Configuration
+# =====================================================
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / "benchmarks" / ".cache"
+DEFAULT_ROWS = [100_000, 1_000_000, 10_000_000]
+
+# Each case is headless.BASE_INPUTS with the main selectors varied as below
+GRIDS = {
+    "quick": [{"Period1": p} for p in ("Monthly", "Quarterly", "Yearly")],
+    "full": [
+        {"Period1": p, "Flattype1": ft, "select_PSF": m, "select_PSF_town": m}
+        for p in ("Monthly", "Quarterly", "Yearly")
+        for ft in ("All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG")
+        for m in ("PSF", "PRICE")
+    ],
+}
+
+
+# =====================================================
+# Measurement helpers
+# =====================================================
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def payload_bytes(value):
+    if value is None:
+        return 0
+    if isinstance(value, str):
+        return len(value.encode())
+    if hasattr(value, "to_json"):  # plotly figure
+        return len(value.to_json().encode())
+    if hasattr(value, "to_payload"):  # render.DataTable / DataGrid
+        return len(json.dumps(value.to_payload(), default=str).encode())
+    return len(json.dumps(value, default=str).encode())
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "median": round(statistics.median(ordered) * 1000, 3),
+        "min": round(ordered[0] * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return summarize(samples)
+
+
+def traced_peak(fn):
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        result = fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+# =====================================================
+# Cases
+# =====================================================
+def bench_renderers(app_module, inputs, repeat):
+    from shiny.types import SilentException
+    from headless import call_renderer, stub_session
+
+    results = {}
+
+    # Timing passes: a fresh session each repeat so reactive calcs start cold.
+    # Outputs of other pages wait on inputs the grid does not set; skipped
+    for _ in range(repeat):
+        session = stub_session(app_module, inputs)
+        for name, info in session.output._outputs.items():
+            t = time.perf_counter()
+            try:
+                asyncio.run(call_renderer(session, info.renderer))
+            except SilentException:
+                continue
+            results.setdefault(name, {"samples": []})["samples"].append(time.perf_counter() - t)
+
+    # One traced pass for memory and payload (tracing slows pandas down)
+    session = stub_session(app_module, inputs)
+    for name, info in session.output._outputs.items():
+        if name not in results:
+            continue
+        value, peak = traced_peak(lambda: asyncio.run(call_renderer(session, info.renderer)))
+        results[name]["peak_mem_bytes"] = peak
+        results[name]["payload_bytes"] = payload_bytes(value)
+
+    return [
+        {
+            "name": name,
+            "inputs": inputs,
+            "latency_ms": summarize(r.pop("samples")),
+            **r,
+        }
+        for name, r in results.items()
+    ]
+
+
+def bench_helpers(app_module, repeat):
+    from query_backend import window_start
+
+    db = app_module.snapshots.current.data
+    latest = db.latest_date()
+    cases = []
+    for period, n in app_module.N_PERIODS.items():
+        # Town x period counts over all resale, as in Table 7B
+        def query():
+            return db.aggregate(
+                ["Town", "Period_sort", "Period"], {"Count": ("Resale_Price", "size")},
+                period=period, since=window_start(latest, period, n),
+            )
+        _, peak = traced_peak(query)
+        cases.append({
+            "name": "period_aggregate",
+            "inputs": {"period": period, "n": n},
+            "latency_ms": timed(query, repeat),
+            "peak_mem_bytes": peak,
+        })
+
+    # Heatmap over the widest table the app renders: projects x months
+    md = dict(min_price=1_000_000)
+    since = window_start(db.latest_date(**md), "Monthly", 10)
+    counts = db.aggregate(
+        ["BUILDING", "Period_sort", "Period"], {"Count": ("Resale_Price", "size")}, period="Monthly", since=since, **md
+    )
+    table = app_module.pivot_periods(counts, "BUILDING", "Count").reset_index()
+    cols = list(range(1, len(table.columns)))
+    styles, peak = traced_peak(lambda: app_module.apply_heatmap_style(table, cols))
+    cases.append({
+        "name": "apply_heatmap_style",
+        "inputs": {"rows": len(table), "cols": len(cols)},
+        "latency_ms": timed(lambda: app_module.apply_heatmap_style(table, cols), repeat),
+        "peak_mem_bytes": peak,
+        "payload_bytes": len(json.dumps(styles).encode()),
+    })
+    return cases
+
+
+# =====================================================
+# Child: one dataset size
+# =====================================================
+def run_child(rows, grid, repeat):
+    sys.path.insert(0, str(ROOT))
+    t = time.perf_counter()
+    import app as app_module
+    load_s = time.perf_counter() - t
+    from headless import BASE_INPUTS
+
+    db = app_module.snapshots.current.data
+    report = {
+        "rows": rows,
+        "backend": db.name,
+        "load": {
+            "import_and_load_ms": round(load_s * 1000, 3),
+            # DuckDB keeps the data on disk
+            "frame_bytes": int(db.df.memory_usage(deep=True).sum()) if db.name == "pandas" else 0,
+            "peak_rss_bytes": peak_rss_bytes(),
+        },
+        "cases": bench_helpers(app_module, repeat),
+    }
+    for overrides in GRIDS[grid]:
+        report["cases"] += bench_renderers(app_module, {**BASE_INPUTS, **overrides}, repeat)
+    report["peak_rss_bytes"] = peak_rss_bytes()
+    print(json.dumps(report))
+
+
+# =====================================================
+# Parent: orchestrate sizes, compare with a baseline
+# =====================================================
+def case_key(rows, case):
+    return (rows, case["name"], json.dumps(case["inputs"], sort_keys=True))
+
+
+def compare(report, baseline):
+    old = {
+        case_key(r["rows"], c): c["latency_ms"]["median"]
+        for r in baseline["results"] for c in r["cases"]
+    }
+    print(f"{'rows':>10}  {'case':<24} {'base ms':>10} {'now ms':>10} {'ratio':>7}")
+    for r in report["results"]:
+        for c in r["cases"]:
+            before = old.get(case_key(r["rows"], c))
+            if before is None:
+                continue
+            now = c["latency_ms"]["median"]
+            ratio = now / before if before else float("inf")
+            print(f"{r['rows']:>10,}  {c['name']:<24} {before:>10.1f} {now:>10.1f} {ratio:>6.2f}x")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS)
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--backend", choices=["pandas", "duckdb"], default="pandas", help="dashboard query backend")
+    parser.add_argument("--out", type=Path, default=None, help="write JSON report here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, default=None, help="earlier JSON report to compare against")
+    parser.add_argument("--child", type=int, default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        run_child(args.child, args.grid, args.repeat)
+        return
+
+    from benchmarks.synthetic import SEED, write_dataset
+    from bundle import build_bundle, read_manifest
+
+    seed = args.seed if args.seed is not None else SEED
+    report = {
+        "meta": {
+            "started": datetime.now(UTC).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "grid": args.grid,
+            "repeat": args.repeat,
+            "backend": args.backend,
+        },
+        "results": [],
+    }
+    for rows in args.rows:
+        data_dir = CACHE_DIR / f"rows_{rows}_seed_{seed}"
+        print(f"⏱ {rows:,} rows", file=sys.stderr)
+        out = write_dataset(rows, data_dir, seed)
+        if args.backend == "duckdb" and read_manifest(out) is None:
+            build_bundle(out)  # the DuckDB backend scans the bundle's Parquet copy
+
+        # A fresh interpreter per size keeps peak memory figures independent
+        child = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_dashboard", "--child", str(rows),
+             "--grid", args.grid, "--repeat", str(args.repeat)],
+            cwd=ROOT,
+            env={**os.environ, "HDB_DATA_DIR": str(data_dir), "HDB_QUERY_BACKEND": args.backend},
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            sys.stderr.write(child.stderr)
+            raise SystemExit(f"❌ Benchmark failed at {rows:,} rows")
+        report["results"].append(json.loads(child.stdout.strip().splitlines()[-1]))
+
+    text = json.dumps(report, indent=1)
+    if args.out:
+        args.out.write_text(text)
+        print(f"✅ Report saved to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.baseline:
+        compare(report, json.loads(args.baseline.read_text()))
+
+
+if __name__ == "__main__":
+    main()
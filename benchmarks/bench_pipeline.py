@@ -0,0 +1,239 @@
+"""
+Pipeline benchmark (offline)
+
+Runs the full transactions.main() flow without the network or the Windows
+shapefile paths:
+1. Write a synthetic data.gov.sg CSV where cache_data expects it (no download)
+2. Write synthetic subzone / ED / town-council shapefiles
+3. Serve OneMap from a local stub (latency, 429s, multi-result answers)
+4. Run main() once per worker count in a fresh subprocess and report
+   addresses/sec, per-stage wall/CPU time and peak RSS as JSON
+
+Usage:
+    python -m benchmarks.bench_pipeline --rows 200000 --workers 5 15 30 --latency-ms 80 --out pipeline.json
+
+Add --streaming to run with PIPELINE_STREAMING=1 (filter/enrich overlap geocoding).
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+from datetime import datetime, UTC
+from functools import wraps
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+import pandas as pd
+
+# =====================================================
+# Configuration
+# =====================================================
+ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = ROOT / "benchmarks" / ".cache"
+STAGES = ["cache_data", "prepare_addresses", "geocode_addresses", "filter_unwanted_buildings", "spatial_enrichment", "build_bundle"]
+
+
+def peak_rss_bytes():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+# =====================================================
+# Inputs
+# =====================================================
+def write_raw_csv(rows: int, dst: Path, seed: int):
+    """Synthetic transactions in the data.gov.sg download format."""
+    from benchmarks.synthetic import make_transactions
+
+    if dst.exists():
+        return dst
+    df = make_transactions(rows, seed)
+    lease = (df["Lease_Remain_Months"] // 12).astype(str) + " years"
+    months = df["Lease_Remain_Months"] % 12
+    lease = lease.where(months == 0, lease + " " + months.map("{:02d} months".format))
+    raw = {
+        "month": df["Year"].astype(str) + "-" + df["Month"].map("{:02d}".format),
+        "town": df["Town"],
+        "flat_type": df["Flat_Type"],
+        "block": df["Block"],
+        "street_name": df["Street"],
+        "storey_range": df["Storey_Range"],
+        "floor_area_sqm": df["Floor_Area_Sqm"],
+        "flat_model": df["Flat_Model"],
+        "lease_commence_date": df["Lease_Commence"],
+        "remaining_lease": lease,
+        "resale_price": df["Resale_Price"],
+    }
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    pd.DataFrame(raw).to_csv(dst, index=False)
+    return dst
+
+
+# =====================================================
+# Child: one full pipeline run
+# =====================================================
+def run_child():
+    import transactions
+
+    stages = {}
+    counts = {}
+
+    def timed(name, fn):
+        # Geocoding runs once per checkpointed batch, so times accumulate
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            wall, cpu = time.perf_counter(), time.process_time()
+            result = fn(*args, **kwargs)
+            stage = stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0})
+            stage["calls"] += 1
+            stage["wall_s"] = round(stage["wall_s"] + time.perf_counter() - wall, 4)
+            stage["cpu_s"] = round(stage["cpu_s"] + time.process_time() - cpu, 4)
+            stage["peak_rss_bytes"] = peak_rss_bytes()
+            return result
+        return wrapper
+
+    def count_rows(name, fn):
+        # Stages run once per batch in batched and streaming modes, so counts add up
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            result = fn(*args, **kwargs)
+            if name == "prepare_addresses":
+                counts["transactions"] = len(result[0])
+                counts["unique_addresses"] = len(result[1])
+            elif name == "geocode_addresses":
+                counts["geocode_rows"] = counts.get("geocode_rows", 0) + len(result)
+                empty = int(result["LATITUDE"].isna().sum()) if "LATITUDE" in result else len(result)
+                counts["geocode_empty_rows"] = counts.get("geocode_empty_rows", 0) + empty
+            elif name == "filter_unwanted_buildings":
+                counts["filter_rows_in"] = counts.get("filter_rows_in", 0) + len(args[0])
+                counts["filter_rows_out"] = counts.get("filter_rows_out", 0) + len(result)
+            elif name == "spatial_enrichment":
+                counts["enriched_rows"] = counts.get("enriched_rows", 0) + len(result)
+            return result
+        return wrapper
+
+    for name in STAGES:
+        setattr(transactions, name, timed(name, count_rows(name, getattr(transactions, name))))
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    transactions.main()
+    total_wall = time.perf_counter() - wall
+
+    geocode_s = stages["geocode_addresses"]["wall_s"]
+    print(json.dumps({
+        "workers": transactions.ONEMAP_WORKERS,
+        "streaming": transactions.PIPELINE_STREAMING,
+        "total_wall_s": round(total_wall, 4),
+        "total_cpu_s": round(time.process_time() - cpu, 4),
+        "addresses_per_s": round(counts["unique_addresses"] / geocode_s, 2) if geocode_s else None,
+        "stages": stages,
+        "counts": counts,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }))
+
+
+# =====================================================
+# Parent
+# =====================================================
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="synthetic transactions")
+    parser.add_argument("--workers", type=int, nargs="+", default=[15], help="geocoding threads to compare")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--multi-rate", type=float, default=0.1)
+    parser.add_argument("--miss-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--streaming", action="store_true", help="run with PIPELINE_STREAMING=1")
+    parser.add_argument("--out", type=Path, default=None, help="write JSON report here (default: stdout)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    from benchmarks.onemap_stub import OneMapStub, StubConfig
+    from benchmarks.synthetic import SEED
+    from benchmarks.synthetic_geo import write_layers
+
+    seed = args.seed if args.seed is not None else SEED
+    work = CACHE_DIR / f"pipeline_rows_{args.rows}_seed_{seed}"
+    boundary_store = CACHE_DIR / "boundaries" / "store"
+    write_raw_csv(args.rows, work / "data" / "raw" / "hdb_resale_transactions.csv", seed)
+    layers = write_layers(CACHE_DIR / "boundaries")
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.rate_429, args.multi_rate, args.miss_rate)
+    report = {
+        "meta": {
+            "started": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "rows": args.rows,
+            "seed": seed,
+            "streaming": args.streaming,
+            "stub": vars(config),
+        },
+        "runs": [],
+    }
+
+    with OneMapStub(config, seed=seed) as stub:
+        for workers in args.workers:
+            print(f"⏱ {workers} geocoding workers", file=sys.stderr)
+            stub.reset_stats()
+            run_dir = work / f"run_w{workers}"
+            shutil.rmtree(run_dir, ignore_errors=True)
+            shutil.copytree(work / "data", run_dir / "data")
+            # Converted layers are reused; the block lookup starts cold so
+            # every run pays the same spatial join
+            for table in boundary_store.glob("point_lookup-*.parquet"):
+                table.unlink()
+
+            env = {
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join([str(ROOT), os.environ.get("PYTHONPATH", "")]),
+                "ONEMAP_URL": stub.url,
+                "ONEMAP_EMAIL": "bench@example.com",
+                "ONEMAP_PASSWORD": "bench",
+                "ONEMAP_WORKERS": str(workers),
+                "SUBZONE_SHP": str(layers["subzone"]),
+                "ELD_SHP": str(layers["eld"]),
+                "TC_SHP": str(layers["tc"]),
+                "HDB_BOUNDARY_DIR": str(boundary_store),
+                "PIPELINE_STREAMING": "1" if args.streaming else "0",
+            }
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_pipeline", "--child"],
+                cwd=run_dir, env=env, capture_output=True, text=True,
+            )
+            if child.returncode != 0:
+                sys.stderr.write(child.stderr)
+                raise SystemExit(f"❌ Pipeline run failed with {workers} workers")
+            run = json.loads(child.stdout.strip().splitlines()[-1])
+            run["onemap"] = stub.stats.as_dict()
+            report["runs"].append(run)
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=1)
+    if args.out:
+        args.out.write_text(text)
+        print(f"✅ Report saved to {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Local OneMap stub server
+
+Mimics the two OneMap endpoints used by transactions.py:
+- POST /api/auth/post/getToken
+- GET  /api/common/elastic/search?searchVal=...&returnGeom=Y&getAddrDetails=Y&pageNum=1
+
+Answers come from the synthetic block universe (benchmarks/synthetic.py).
+Latency, jitter, the share of 429 responses and the share of multi-result
+answers are configurable. Whether an address is throttled or gets extra
+results depends only on the search value, so runs are repeatable.
+
+Usage: python -m benchmarks.onemap_stub --port 8765 --latency-ms 80 --rate-429 0.01
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import argparse
+import json
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from benchmarks.synthetic import SEED, make_blocks
+
+# =====================================================
+# Configuration
+# =====================================================
+# Neighbouring non-residential hits that filter_unwanted_buildings must drop
+EXTRA_BUILDINGS = ["SKOOL4KIDZ @ BLK {blk}", "{road} COMMUNITY CLUB", "PCF SPARKLETOTS PRESCHOOL"]
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 50.0
+    jitter_ms: float = 20.0
+    rate_429: float = 0.0
+    multi_rate: float = 0.1
+    miss_rate: float = 0.0
+
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    tokens: int = 0
+    status: dict = field(default_factory=dict)
+    empty: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, status, empty=False):
+        with self.lock:
+            self.requests += 1
+            self.status[str(status)] = self.status.get(str(status), 0) + 1
+            self.empty += int(empty)
+
+    def reset(self):
+        with self.lock:
+            self.requests, self.tokens, self.status, self.empty = 0, 0, {}, 0
+
+    def as_dict(self):
+        with self.lock:
+            return {"requests": self.requests, "tokens": self.tokens, "status": dict(self.status), "empty": self.empty}
+
+
+def _fraction(key: str, salt: str) -> float:
+    # Stable pseudo-random number in [0, 1) per (search value, purpose)
+    return zlib.crc32(f"{salt}:{key}".encode()) / 2**32
+
+
+# =====================================================
+# Address index
+# =====================================================
+def build_index(seed=SEED):
+    blocks = make_blocks(np.random.default_rng(seed))
+    index = {}
+    for b in blocks.itertuples(index=False):
+        address = f"{b.Block} {b.Street}"
+        record = {
+            "SEARCHVAL": f"{address} SINGAPORE {b.POSTAL}",
+            "BLK_NO": b.Block,
+            "ROAD_NAME": b.Street,
+            "BUILDING": b.BUILDING,
+            "ADDRESS": f"{address} {b.BUILDING + ' ' if b.BUILDING != 'NIL' else ''}SINGAPORE {b.POSTAL}",
+            "POSTAL": str(b.POSTAL),
+            "X": f"{28001.642 + (b.LONGITUDE - 103.8333) * 111_320:.3f}",
+            "Y": f"{38744.572 + (b.LATITUDE - 1.3667) * 110_574:.3f}",
+            "LATITUDE": f"{b.LATITUDE:.7f}",
+            "LONGITUDE": f"{b.LONGITUDE:.7f}",
+        }
+        index[address.upper()] = record
+        index[str(b.POSTAL)] = record
+    return index
+
+
+def search(index, config, search_val):
+    record = index.get(search_val.strip().upper())
+    if record is None or _fraction(search_val, "miss") < config.miss_rate:
+        return []
+    results = [record]
+    if _fraction(search_val, "multi") < config.multi_rate:
+        for template in EXTRA_BUILDINGS[: 1 + int(_fraction(search_val, "n") * len(EXTRA_BUILDINGS))]:
+            extra = dict(record)
+            extra["BUILDING"] = template.format(blk=record["BLK_NO"], road=record["ROAD_NAME"])
+            extra["SEARCHVAL"] = extra["BUILDING"]
+            results.append(extra)
+    return results
+
+
+# =====================================================
+# Server
+# =====================================================
+def make_handler(index, config, stats):
+    class OneMapHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            self.rfile.read(length)
+            if urlsplit(self.path).path != "/api/auth/post/getToken":
+                return self._send(404, {"error": "not found"})
+            with stats.lock:
+                stats.tokens += 1
+            self._send(200, {"access_token": "stub-token", "expiry_timestamp": str(int(time.time()) + 3 * 86400)})
+
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if parts.path != "/api/common/elastic/search":
+                return self._send(404, {"error": "not found"})
+            search_val = parse_qs(parts.query).get("searchVal", [""])[0]
+
+            jitter = config.jitter_ms * (2 * _fraction(search_val, "jitter") - 1)
+            time.sleep(max(config.latency_ms + jitter, 0) / 1000)
+
+            if _fraction(search_val, "429") < config.rate_429:
+                stats.record(429, empty=True)
+                return self._send(429, {"error": "Too many requests"})
+
+            results = search(index, config, search_val)
+            stats.record(200, empty=not results)
+            self._send(200, {"found": len(results), "totalNumPages": 1, "pageNum": 1, "results": results})
+
+    return OneMapHandler
+
+
+class OneMapStub:
+    """Run the stub on a background thread: `with OneMapStub(config) as stub: stub.url`."""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0, seed=SEED):
+        self.config = config or StubConfig()
+        self.stats = StubStats()
+        self.server = ThreadingHTTPServer((host, port), make_handler(build_index(seed), self.config, self.stats))
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def reset_stats(self):
+        self.stats.reset()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="onemap-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OneMap stub server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--multi-rate", type=float, default=0.1)
+    parser.add_argument("--miss-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency_ms, args.jitter_ms, args.rate_429, args.multi_rate, args.miss_rate)
+    with OneMapStub(config, port=args.port) as stub:
+        print(f"✔ OneMap stub listening on {stub.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,219 @@
+"""
+Synthetic HDB resale data generator
+
+Produces frames with the same schema as the merged pipeline output
+(HDB_Resale_Transactions_Merged_<date>.csv.gz) so that the dashboard and the
+pipeline can be benchmarked at any size without real data:
+1. A fixed universe of blocks per town (address, coordinates, project name)
+2. Transactions drawn from those blocks with town / project skew
+3. Flat-type mix, floor areas, storeys and prices shaped like the real data
+
+The same (rows, seed) always yields the same frame.
+
+Usage: python -m benchmarks.synthetic <rows> <out.csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Configuration
+# =====================================================
+SEED = 2026
+FIRST_YEAR = 2017
+LAST_YEAR = 2025
+
+# Town: (relative volume, price premium, latitude, longitude, region)
+TOWNS = {
+    "ANG MO KIO": (4.5, 1.05, 1.3691, 103.8454, "NORTH-EAST REGION"),
+    "BEDOK": (5.5, 1.00, 1.3236, 103.9273, "EAST REGION"),
+    "BISHAN": (2.0, 1.30, 1.3526, 103.8352, "CENTRAL REGION"),
+    "BUKIT BATOK": (4.0, 0.95, 1.3590, 103.7637, "WEST REGION"),
+    "BUKIT MERAH": (4.0, 1.35, 1.2819, 103.8239, "CENTRAL REGION"),
+    "BUKIT PANJANG": (3.5, 0.92, 1.3774, 103.7719, "WEST REGION"),
+    "BUKIT TIMAH": (0.3, 1.40, 1.3294, 103.8021, "CENTRAL REGION"),
+    "CENTRAL AREA": (0.8, 1.55, 1.2897, 103.8501, "CENTRAL REGION"),
+    "CHOA CHU KANG": (4.5, 0.88, 1.3840, 103.7470, "WEST REGION"),
+    "CLEMENTI": (2.5, 1.15, 1.3162, 103.7649, "WEST REGION"),
+    "GEYLANG": (2.5, 1.05, 1.3201, 103.8918, "CENTRAL REGION"),
+    "HOUGANG": (5.5, 0.98, 1.3612, 103.8863, "NORTH-EAST REGION"),
+    "JURONG EAST": (2.5, 0.97, 1.3329, 103.7436, "WEST REGION"),
+    "JURONG WEST": (7.0, 0.90, 1.3404, 103.7090, "WEST REGION"),
+    "KALLANG/WHAMPOA": (3.0, 1.30, 1.3100, 103.8651, "CENTRAL REGION"),
+    "MARINE PARADE": (0.7, 1.25, 1.3020, 103.8971, "CENTRAL REGION"),
+    "PASIR RIS": (3.0, 0.97, 1.3721, 103.9474, "EAST REGION"),
+    "PUNGGOL": (6.5, 1.00, 1.3984, 103.9072, "NORTH-EAST REGION"),
+    "QUEENSTOWN": (2.5, 1.45, 1.2942, 103.7861, "CENTRAL REGION"),
+    "SEMBAWANG": (3.0, 0.90, 1.4491, 103.8185, "NORTH REGION"),
+    "SENGKANG": (8.0, 0.98, 1.3868, 103.8914, "NORTH-EAST REGION"),
+    "SERANGOON": (2.0, 1.05, 1.3554, 103.8679, "NORTH-EAST REGION"),
+    "TAMPINES": (7.0, 1.00, 1.3496, 103.9568, "EAST REGION"),
+    "TOA PAYOH": (3.0, 1.25, 1.3343, 103.8563, "CENTRAL REGION"),
+    "WOODLANDS": (8.0, 0.88, 1.4382, 103.7890, "NORTH REGION"),
+    "YISHUN": (7.0, 0.90, 1.4304, 103.8354, "NORTH REGION"),
+}
+
+# Flat type: (share, median floor area sqm, flat model)
+FLAT_TYPES = {
+    "1 ROOM": (0.001, 31, "Improved"),
+    "2 ROOM": (0.018, 45, "Model A"),
+    "3 ROOM": (0.240, 68, "New Generation"),
+    "4 ROOM": (0.410, 93, "Model A"),
+    "5 ROOM": (0.250, 113, "Improved"),
+    "EXECUTIVE": (0.0805, 145, "Apartment"),
+    "MULTI-GENERATION": (0.0005, 160, "Multi Generation"),
+}
+
+STOREY_RANGES = [f"{lo:02d} TO {lo + 2:02d}" for lo in range(1, 52, 3)]
+STREET_SUFFIXES = ["AVE 1", "AVE 3", "AVE 5", "ST 11", "ST 21", "ST 31", "RD", "DR", "CRES", "CTRL"]
+PROJECTS_PER_TOWN = 4
+BLOCKS_PER_UNIT_VOLUME = 80
+
+
+# =====================================================
+# Blocks
+# =====================================================
+def make_blocks(rng: np.random.Generator) -> pd.DataFrame:
+    rows = []
+    postal = 100000
+    for town, (volume, premium, lat, lon, region) in TOWNS.items():
+        n_blocks = max(int(volume * BLOCKS_PER_UNIT_VOLUME), 10)
+        projects = [f"{town.split('/')[0].split()[0]} {name}" for name in ("VISTA", "GREEN", "SKYVILLE", "PARC")]
+        for b in range(n_blocks):
+            postal += 7
+            block = str(100 + b) + ("A" if b % 17 == 0 else "")
+            street = f"{town.split('/')[0]} {STREET_SUFFIXES[b % len(STREET_SUFFIXES)]}"
+            # Roughly one block in ten belongs to a named project
+            building = projects[b % PROJECTS_PER_TOWN] if rng.random() < 0.1 else "NIL"
+            rows.append({
+                "Town": town,
+                "Block": block,
+                "Street": street,
+                "BUILDING": building,
+                "POSTAL": postal,
+                "LATITUDE": lat + rng.normal(0, 0.008),
+                "LONGITUDE": lon + rng.normal(0, 0.008),
+                "Lease_Commence": int(rng.integers(1968, 2022)),
+                "REGION_N": region,
+                "SUBZONE_N": f"{town} {1 + b % 6}",
+                "ED_DESC": f"{town.split()[0]} GRC",
+                "TOWN_COUNC": f"{town.split()[0]} TOWN COUNCIL",
+            })
+    blocks = pd.DataFrame(rows)
+
+    # Zipf-like popularity within each town; named projects trade more often
+    popularity = 1 / (blocks.groupby("Town").cumcount() + 1) ** 0.6
+    popularity = popularity * np.where(blocks["BUILDING"] != "NIL", 2.0, 1.0)
+    blocks["weight"] = popularity * blocks["Town"].map({t: v[0] for t, v in TOWNS.items()})
+    blocks["weight"] /= blocks["weight"].sum()
+    return blocks
+
+
+# =====================================================
+# Transactions
+# =====================================================
+def make_transactions(rows: int, seed: int = SEED) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    blocks = make_blocks(rng)
+
+    idx = rng.choice(len(blocks), size=rows, p=blocks["weight"].to_numpy())
+    b = blocks.iloc[idx].reset_index(drop=True)
+
+    # Dates: volume grows slightly over time
+    n_months = (LAST_YEAR - FIRST_YEAR + 1) * 12
+    month_w = np.linspace(0.8, 1.2, n_months)
+    month_idx = rng.choice(n_months, size=rows, p=month_w / month_w.sum())
+    year = FIRST_YEAR + month_idx // 12
+    month = month_idx % 12 + 1
+
+    types = list(FLAT_TYPES)
+    shares = np.array([FLAT_TYPES[t][0] for t in types])
+    flat_type = np.array(types, dtype=object)[rng.choice(len(types), size=rows, p=shares / shares.sum())]
+    base_area = pd.Series(flat_type).map({t: v[1] for t, v in FLAT_TYPES.items()}).to_numpy()
+    area = np.round(base_area * rng.normal(1.0, 0.06, rows)).clip(28, 250)
+    model = pd.Series(flat_type).map({t: v[2] for t, v in FLAT_TYPES.items()}).to_numpy()
+
+    # Storeys skew low; price premium of ~1.5% per storey band
+    storey_w = 1 / np.arange(1, len(STOREY_RANGES) + 1) ** 1.4
+    storey_idx = rng.choice(len(STOREY_RANGES), size=rows, p=storey_w / storey_w.sum())
+    storey = np.array(STOREY_RANGES, dtype=object)[storey_idx]
+
+    age = np.clip(year - b["Lease_Commence"].to_numpy(), 0, 98)
+    lease_months = (99 - age) * 12 - (month - 1) - rng.integers(0, 12, rows)
+    lease_months = np.clip(lease_months, 12, 99 * 12 - 1)
+
+    premium = b["Town"].map({t: v[1] for t, v in TOWNS.items()}).to_numpy()
+    psf = (
+        430
+        * premium
+        * 1.045 ** (month_idx / 12)
+        * (1 + 0.015 * storey_idx)
+        * (0.75 + 0.25 * lease_months / (99 * 12))
+        * np.where(b["BUILDING"].to_numpy() != "NIL", 1.15, 1.0)
+        * rng.lognormal(0, 0.12, rows)
+    )
+    price = np.round(psf * area * 10.764, -3)
+
+    # SVY21 metres from lat/lon (good enough for benchmarks)
+    x = 28001.642 + (b["LONGITUDE"].to_numpy() - 103.8333) * 111_320
+    y = 38744.572 + (b["LATITUDE"].to_numpy() - 1.3667) * 110_574
+
+    df = pd.DataFrame({
+        "Year": year,
+        "Month": month,
+        "Town": b["Town"],
+        "Flat_Type": flat_type,
+        "Block": b["Block"],
+        "Street": b["Street"],
+        "Storey_Range": storey,
+        "Floor_Area_Sqm": area,
+        "Flat_Model": model,
+        "Lease_Commence": b["Lease_Commence"],
+        "Resale_Price": price,
+        "Lease_Remain_Months": lease_months,
+        "BLK_NO": b["Block"],
+        "ROAD_NAME": b["Street"],
+        "BUILDING": b["BUILDING"],
+        "ADDRESS": b["Block"] + " " + b["Street"] + " SINGAPORE " + b["POSTAL"].astype(str),
+        "POSTAL": b["POSTAL"],
+        "X": x.round(3),
+        "Y": y.round(3),
+        "LATITUDE": b["LATITUDE"].round(7),
+        "LONGITUDE": b["LONGITUDE"].round(7),
+        "SUBZONE_N": b["SUBZONE_N"],
+        "PLN_AREA_N": b["Town"],
+        "REGION_N": b["REGION_N"],
+        "ED_DESC": b["ED_DESC"],
+        "TOWN_COUNC": b["TOWN_COUNC"],
+    })
+    return df.sort_values(["Year", "Month"], kind="stable").reset_index(drop=True)
+
+
+def snapshot_name() -> str:
+    # Pipeline-style file name dated just after the last synthetic month
+    return f"HDB_Resale_Transactions_Merged_{LAST_YEAR + 1}0113.csv.gz"
+
+
+def write_dataset(rows: int, dst_dir: Path, seed: int = SEED) -> Path:
+    """Write (or reuse) a synthetic pipeline output in `dst_dir`."""
+    dst_dir = Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    out = dst_dir / snapshot_name()
+    if not out.exists():
+        partial = out.with_name(out.name + ".partial")
+        make_transactions(rows, seed).to_csv(partial, index=False, compression="gzip")
+        partial.rename(out)
+    return out
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1])
+    dst = Path(sys.argv[2])
+    make_transactions(n).to_csv(dst, index=False, compression="gzip")
+    print(f"✔ {n:,} synthetic rows saved: {dst}")
@@ -0,0 +1,122 @@
+"""
+Synthetic boundary layers
+
+Stand-ins for the three shapefiles read by transactions.spatial_enrichment:
+- URA_MP19_SUBZONE_NO_SEA_PL.shp  (subzones, URA attribute columns)
+- ELD2025.shp                     (electoral divisions, ED_DESC)
+- TOWN_COUNCIL_BDY_2025.shp       (town councils, TOWN_COUNC)
+
+Each layer tiles the island in SVY21 (EPSG:3414), like the real files.
+Tile edges are densified and wobbled so point-in-polygon tests cost about as
+much as on real, many-vertex boundaries; neighbouring tiles share identical
+edges, so every point falls in exactly one polygon per layer.
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import Polygon
+
+# =====================================================
+# Configuration
+# =====================================================
+CRS = "EPSG:3414"
+BOUNDS = (0.0, 20_000.0, 60_000.0, 52_000.0)  # xmin, ymin, xmax, ymax (metres)
+LAYERS = {
+    # name: (file name, columns x rows, vertices per edge)
+    "subzone": ("URA_MP19_SUBZONE_NO_SEA_PL.shp", (30, 16), 40),
+    "eld": ("ELD2025.shp", (10, 6), 80),
+    "tc": ("TOWN_COUNCIL_BDY_2025.shp", (6, 4), 120),
+}
+WOBBLE = 0.08  # edge displacement as a share of the cell size
+
+
+# =====================================================
+# Geometry
+# =====================================================
+def _edge(p0, p1, n, cell_w, cell_h):
+    # Displacement vanishes on grid lines, so shared edges match exactly
+    t = np.linspace(0, 1, n, endpoint=False)
+    x = p0[0] + (p1[0] - p0[0]) * t
+    y = p0[1] + (p1[1] - p0[1]) * t
+    if p0[0] == p1[0]:  # vertical edge: wobble in x
+        x = x + WOBBLE * cell_w * np.sin(np.pi * (y - BOUNDS[1]) / cell_h) * np.sin(y / 700)
+    else:  # horizontal edge: wobble in y
+        y = y + WOBBLE * cell_h * np.sin(np.pi * (x - BOUNDS[0]) / cell_w) * np.sin(x / 700)
+    return list(zip(x, y))
+
+
+def tiles(n_cols, n_rows, n_vertices):
+    xmin, ymin, xmax, ymax = BOUNDS
+    cell_w = (xmax - xmin) / n_cols
+    cell_h = (ymax - ymin) / n_rows
+    for i in range(n_cols):
+        for j in range(n_rows):
+            x0, y0 = xmin + i * cell_w, ymin + j * cell_h
+            x1, y1 = x0 + cell_w, y0 + cell_h
+            ring = (
+                _edge((x0, y0), (x1, y0), n_vertices, cell_w, cell_h)
+                + _edge((x1, y0), (x1, y1), n_vertices, cell_w, cell_h)
+                + _edge((x1, y1), (x0, y1), n_vertices, cell_w, cell_h)
+                + _edge((x0, y1), (x0, y0), n_vertices, cell_w, cell_h)
+            )
+            yield i, j, Polygon(ring)
+
+
+# =====================================================
+# Layers
+# =====================================================
+def subzone_layer():
+    _, (cols, rows), n = LAYERS["subzone"]
+    records = []
+    for k, (i, j, poly) in enumerate(tiles(cols, rows, n)):
+        area = f"AREA {i // 3:02d}{j // 4:02d}"
+        region = ["WEST REGION", "NORTH REGION", "CENTRAL REGION", "NORTH-EAST REGION", "EAST REGION"][i * 5 // cols]
+        records.append({
+            "OBJECTID": k + 1,
+            "SUBZONE_NO": j + 1,
+            "SUBZONE_N": f"SUBZONE {i:02d}-{j:02d}",
+            "SUBZONE_C": f"SZ{i:02d}{j:02d}",
+            "CA_IND": "N",
+            "PLN_AREA_N": area,
+            "PLN_AREA_C": area.replace(" ", "")[:6],
+            "REGION_N": region,
+            "REGION_C": "".join(w[0] for w in region.split()[0].split("-")) + "R",
+            "INC_CRC": f"{k:016X}",
+            "FMEL_UPD_D": "2019-12-05",
+            "geometry": poly,
+        })
+    return gpd.GeoDataFrame(records, crs=CRS)
+
+
+def eld_layer():
+    _, (cols, rows), n = LAYERS["eld"]
+    return gpd.GeoDataFrame(
+        [{"ED_DESC": f"DIVISION {i:02d}{j:02d}", "geometry": poly} for i, j, poly in tiles(cols, rows, n)],
+        crs=CRS,
+    )
+
+
+def tc_layer():
+    _, (cols, rows), n = LAYERS["tc"]
+    return gpd.GeoDataFrame(
+        [{"TOWN_COUNC": f"TOWN COUNCIL {i}{j}", "geometry": poly} for i, j, poly in tiles(cols, rows, n)],
+        crs=CRS,
+    )
+
+
+def write_layers(dst_dir: Path) -> dict:
+    """Write the three shapefiles (once) and return {layer: path}."""
+    dst_dir = Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    paths = {}
+    for name, build in (("subzone", subzone_layer), ("eld", eld_layer), ("tc", tc_layer)):
+        path = dst_dir / LAYERS[name][0]
+        if not path.exists():
+            build().to_file(path)
+        paths[name] = path
+    return paths
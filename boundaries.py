@@ -0,0 +1,212 @@
+"""
+Boundary layer store (2026)
+
+Keeps the polygon layers used by transactions.spatial_enrichment:
+1. Each shapefile is converted once to GeoParquet, reprojected to SVY21
+   (EPSG:3414); readers load only the columns they keep
+2. Converted layers are keyed by a hash of the shapefile, so a new boundary
+   release is picked up automatically
+3. One STRtree and prepared polygons per layer are built once per process
+4. lookup_points() answers subzone, ED_DESC and TOWN_COUNC for a batch of
+   points in one pass, with the same rows in the same order as chained
+   sjoin(how="left", predicate="within") calls
+5. enrich_coordinates() keeps those answers per rounded block coordinate in
+   a lookup table reused across runs; only unseen points are joined, and a
+   new boundary version starts a new table. With about 10k HDB blocks, even
+   a cold table is a single in-process join of well under a second
+
+Convert layers ahead of a run with:  python boundaries.py <shp> [<shp> ...]
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from pyproj import Transformer
+
+# =====================================================
+# Configuration
+# =====================================================
+BOUNDARY_CRS = "EPSG:3414"  # SVY21, the CRS of the URA / ELD / town council files
+BOUNDARY_DIR = Path(os.getenv("HDB_BOUNDARY_DIR", "data/boundaries"))
+SHAPEFILE_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+COORD_DECIMALS = 7  # ~1 cm; OneMap returns the same coordinates for a block every run
+KEYS = ["LON_KEY", "LAT_KEY"]
+
+_trees = {}
+_fingerprints = {}
+
+
+# =====================================================
+# GeoParquet store
+# =====================================================
+def layer_fingerprint(shp_path: Path) -> str:
+    # A shapefile is several files; attributes live in .dbf, CRS in .prj.
+    # Hashed once per process and version of the files (size, mtime), as
+    # every lookup and lookup-table check asks for it
+    shp_path = Path(shp_path).resolve()
+    parts = [(suffix, shp_path.with_suffix(suffix)) for suffix in SHAPEFILE_PARTS]
+    parts = [(suffix, part, part.stat()) for suffix, part in parts if part.exists()]
+    key = (shp_path, tuple((suffix, st.st_size, st.st_mtime_ns) for suffix, _, st in parts))
+    if key not in _fingerprints:
+        h = hashlib.sha256()
+        for suffix, part, _ in parts:
+            h.update(suffix.encode())
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        _fingerprints[key] = h.hexdigest()
+    return _fingerprints[key]
+
+
+def store_path(shp_path: Path, fingerprint: str) -> Path:
+    return BOUNDARY_DIR / f"{Path(shp_path).stem}-{fingerprint[:16]}.parquet"
+
+
+def convert_layer(shp_path: Path, fingerprint: str = None) -> Path:
+    """Write the GeoParquet copy of a shapefile (once per boundary version)."""
+    fingerprint = fingerprint or layer_fingerprint(shp_path)
+    dst = store_path(shp_path, fingerprint)
+    if dst.exists():
+        return dst
+
+    layer = gpd.read_file(shp_path).to_crs(BOUNDARY_CRS)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    partial = dst.with_name(dst.name + ".partial")
+    layer.to_parquet(partial, index=False)
+    os.replace(partial, dst)
+    print(f"✔ Boundary layer stored: {dst} ({len(layer):,} polygons)")
+    return dst
+
+
+def load_layer(shp_path: Path, columns=None, fingerprint: str = None) -> gpd.GeoDataFrame:
+    """Layer from the GeoParquet store; `columns=None` keeps every attribute."""
+    src = convert_layer(shp_path, fingerprint)
+    layer = gpd.read_parquet(src, columns=None if columns is None else [*columns, "geometry"])
+    return layer.reset_index(drop=True)
+
+
+# =====================================================
+# Point-in-polygon
+# =====================================================
+def layer_tree(shp_path: Path, columns=None, fingerprint: str = None):
+    """(attributes, prepared polygons, STRtree) for a layer, built once per process and boundary version."""
+    fingerprint = fingerprint or layer_fingerprint(shp_path)
+    key = (fingerprint, None if columns is None else tuple(columns))
+    if key not in _trees:
+        layer = load_layer(shp_path, columns, fingerprint)
+        polygons = layer.geometry.to_numpy()
+        shapely.prepare(polygons)
+        _trees[key] = (pd.DataFrame(layer.drop(columns="geometry")), polygons, shapely.STRtree(polygons))
+    return _trees[key]
+
+
+_to_boundary_crs = Transformer.from_crs("EPSG:4326", BOUNDARY_CRS, always_xy=True)
+
+
+def layer_columns(layers) -> list:
+    """Attribute columns lookup_points() adds, in order."""
+    return [c for shp_path, columns in layers for c in layer_tree(shp_path, columns)[0].columns]
+
+
+def project_points(lon, lat) -> np.ndarray:
+    # OneMap returns coordinates as strings; misses are NaN and match nothing
+    x, y = _to_boundary_crs.transform(
+        pd.to_numeric(lon, errors="coerce").to_numpy(float),
+        pd.to_numeric(lat, errors="coerce").to_numpy(float),
+    )
+    return shapely.points(x, y)
+
+
+def lookup_points(points, layers) -> pd.DataFrame:
+    """
+    Attributes of every layer polygon containing each point.
+
+    `points` are shapely geometries in BOUNDARY_CRS; `layers` is a list of
+    (shp_path, columns) pairs, applied in order. Returns one row per match
+    combination with a `_point` column holding the point's position; points
+    inside no polygon keep a row of NaNs, like sjoin(how="left").
+    """
+    result = pd.DataFrame({"_point": np.arange(len(points))})
+    for shp_path, columns in layers:
+        attrs, polygons, tree = layer_tree(shp_path, columns)
+        # Bounding-box candidates, then polygon.contains(point) on prepared
+        # polygons: the same pairs as predicate="within", several times faster
+        point_idx, poly_idx = tree.query(points)
+        inside = shapely.contains(polygons[poly_idx], points[point_idx])
+        point_idx, poly_idx = point_idx[inside], poly_idx[inside]
+        # sjoin orders a point's matches by polygon position; the tree does not
+        order = np.lexsort((poly_idx, point_idx))
+        point_idx, poly_idx = point_idx[order], poly_idx[order]
+        matches = attrs.iloc[poly_idx].reset_index(drop=True)
+        matches.insert(0, "_point", point_idx)
+        result = result.merge(matches, on="_point", how="left")
+    return result
+
+
+# =====================================================
+# Persistent block lookup
+# =====================================================
+def boundary_version(layers) -> str:
+    h = hashlib.sha256()
+    for shp_path, columns in layers:
+        h.update(layer_fingerprint(shp_path).encode())
+        h.update(repr(columns).encode())
+    return h.hexdigest()
+
+
+def lookup_table_path(version: str) -> Path:
+    return BOUNDARY_DIR / f"point_lookup-{version[:16]}.parquet"
+
+
+def enrich_coordinates(lon, lat, layers) -> pd.DataFrame:
+    """
+    Layer attributes for each (lon, lat) row, from the persistent lookup table.
+
+    Returns one row per match combination with a `_row` column holding the
+    input position, in input order, like lookup_points() but keyed by rounded
+    coordinates; missing coordinates get a row of NaNs.
+    """
+    keys = pd.DataFrame({
+        "LON_KEY": pd.to_numeric(lon, errors="coerce").round(COORD_DECIMALS).to_numpy(),
+        "LAT_KEY": pd.to_numeric(lat, errors="coerce").round(COORD_DECIMALS).to_numpy(),
+    })
+    path = lookup_table_path(boundary_version(layers))
+    table = pd.read_parquet(path) if path.exists() else None
+
+    # 1. Points never seen with this boundary version
+    wanted = keys.dropna().drop_duplicates()
+    if table is not None:
+        seen = wanted.merge(table[KEYS].drop_duplicates(), on=KEYS, how="left", indicator=True)
+        new = wanted[(seen["_merge"] == "left_only").to_numpy()]
+    else:
+        new = wanted
+
+    # 2. Join only those and append them (misses included) to the table
+    if len(new) or table is None:
+        found = lookup_points(project_points(new["LON_KEY"], new["LAT_KEY"]), layers)
+        found = pd.concat([new.iloc[found.pop("_point").to_numpy()].reset_index(drop=True), found], axis=1)
+        table = found if table is None else pd.concat([table, found], ignore_index=True)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        table.to_parquet(partial, index=False)
+        os.replace(partial, path)
+    print(f"✔ Spatial lookup: {len(wanted) - len(new):,} cached, {len(new):,} new points")
+
+    # 3. Every input row picks up its block's answer
+    keys["_row"] = np.arange(len(keys))
+    return keys.merge(table, on=KEYS, how="left").drop(columns=KEYS)
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        convert_layer(Path(path))
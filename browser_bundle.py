@@ -0,0 +1,205 @@
+"""
+Browser build bundle (2026)
+
+The Shinylive build in docs/ runs app.py in Pyodide. Rather than download
+and aggregate the transactions CSV there, it reads
+HDB_Resale_Transactions_Merged_<YYYYMMDD>.browser/:
+1. app.py runs headlessly against the newest pipeline output in a data
+   folder, for every choice of the inputs that shape its queries, while a
+   RecordingBackend keeps the answer to each backend call (period rollups,
+   leaderboards, top-K rows)
+2. The answers are packed into one compressed results.npz (strings as
+   codes, whole numbers as int32) with a manifest.json keyed by call
+3. Every output is rendered again from the packed answers and compared,
+   so the bundle is known to reproduce the server app
+4. With --app-dir, app.py and the modules it needs in the browser are
+   copied next to the bundle (with the pre-rendered outputs from
+   static_outputs.py, when there are any), ready for `shinylive export`
+
+In Pyodide (or with HDB_BROWSER_BUILD=1) app.py serves the bundle through
+query_backend.BundledBackend; the pages that need row-level data (map,
+analysis, transactions) are left out of that build.
+
+Build one with:  python browser_bundle.py <data dir> [--app-dir build/shinylive]
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bundle import source_sha256
+from query_backend import BundledBackend, call_key, pack_result
+from static_outputs import outputs_path_for
+
+# =====================================================
+# Configuration
+# =====================================================
+ROOT = Path(__file__).resolve().parent
+BROWSER_SUFFIX = ".browser"
+BROWSER_FORMAT = 1
+# The only inputs that change a backend call; the rest filter answers in the app
+QUERY_GRID = [
+    {"Period1": p, "Flattype1": ft}
+    for p in ("Monthly", "Quarterly", "Yearly")
+    for ft in ("All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG")
+]
+APP_FILES = [
+    "app.py", "bundle.py", "query_backend.py", "snapshots.py", "instrumentation.py", "static_outputs.py", "styles.css",
+]
+
+
+def browser_bundle_path(csv_path) -> Path:
+    name = Path(csv_path).name
+    return Path(csv_path).with_name(name[: -len(".csv.gz")] + BROWSER_SUFFIX)
+
+
+# =====================================================
+# Recording
+# =====================================================
+class RecordingBackend:
+    """Passes calls through to `inner`, keeping a copy of every answer by call_key."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.name = inner.name
+        self.answers = {}
+
+    def _record(self, method, *args, **filters):
+        value = getattr(self.inner, method)(*args, **filters)
+        key = call_key(method, *args, **filters)
+        if key not in self.answers:
+            self.answers[key] = value.copy() if isinstance(value, pd.DataFrame) else value
+        return value
+
+    def frame(self, columns=None):
+        return self.inner.frame(columns)  # per-snapshot indexes only; not part of the bundle
+
+    def towns(self):
+        return self._record("towns")
+
+    def latest_date(self, **filters):
+        return self._record("latest_date", **filters)
+
+    def aggregate(self, by, aggs, **filters):
+        return self._record("aggregate", by, aggs, **filters)
+
+    def rows(self, columns, **filters):
+        return self._record("rows", columns, **filters)
+
+    def top_k(self, by, order_by, k, columns, **filters):
+        return self._record("top_k", by, order_by, k, columns, **filters)
+
+
+def render_all(app_module, inputs) -> dict:
+    """Every output's serialized value for one set of inputs; outputs waiting on other inputs are skipped."""
+    from shiny.types import SilentException
+    from headless import call_renderer, stub_session
+
+    session = stub_session(app_module, inputs)
+    rendered = {}
+    for name, info in session.output._outputs.items():
+        try:
+            value = asyncio.run(call_renderer(session, info.renderer))
+        except SilentException:
+            continue
+        if hasattr(value, "to_json"):  # plotly figure
+            value = value.to_json()
+        elif hasattr(value, "to_payload"):  # render.DataGrid / DataTable
+            value = json.dumps(value.to_payload(), default=str)
+        rendered[name] = value
+    return rendered
+
+
+# =====================================================
+# Build
+# =====================================================
+def write_browser_bundle(answers: dict, out: Path, source: Path) -> int:
+    arrays, entries = {}, {}
+    for i, (key, value) in enumerate(answers.items()):
+        entries[key] = pack_result(value, arrays, f"r{i}")
+
+    # Written into a scratch folder and renamed, so manifest and arrays always match
+    tmp = out.with_name(out.name + ".partial")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.savez_compressed(tmp / "results.npz", **arrays)
+    manifest = {
+        "format": BROWSER_FORMAT, "source": source.name, "source_sha256": source_sha256(source), "results": entries,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, separators=(",", ":")))
+    shutil.rmtree(out, ignore_errors=True)
+    tmp.rename(out)
+    return sum(f.stat().st_size for f in out.iterdir())
+
+
+def build_browser_bundle(data_dir: Path) -> Path:
+    os.environ["HDB_DATA_DIR"] = str(data_dir)
+    os.environ["HDB_STATIC_OUTPUTS"] = "0"  # every output computed, so every call is recorded
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+    from headless import BASE_INPUTS
+
+    # 1. Record every call the outputs make, plus the two app.py makes at import
+    snap = app_module.snapshots.current
+    live = snap.data
+    recorder = snap.data = RecordingBackend(live)
+    recorder.towns()
+    recorder.latest_date()
+    start = time.perf_counter()
+    expected = [render_all(app_module, {**BASE_INPUTS, **inputs}) for inputs in QUERY_GRID]
+    print(f"✔ Recorded {len(recorder.answers):,} answers in {time.perf_counter() - start:.1f}s")
+
+    # 2. Pack them next to the CSV
+    out = browser_bundle_path(snap.path)
+    size = write_browser_bundle(recorder.answers, out, snap.path)
+    print(f"✔ Browser bundle: {out} ({size / 1e6:.2f} MB; CSV {snap.path.stat().st_size / 1e6:.2f} MB)")
+
+    # 3. Every output again, from the bundle alone
+    snap.data = BundledBackend(out)
+    for inputs, before in zip(QUERY_GRID, expected):
+        after = render_all(app_module, {**BASE_INPUTS, **inputs})
+        changed = [name for name in before if after.get(name) != before[name]]
+        if changed:
+            shutil.rmtree(out)
+            raise SystemExit(f"❌ Bundle does not reproduce {', '.join(changed)} for {inputs}")
+    snap.data = live
+    print(f"✅ All outputs reproduced from the bundle for {len(QUERY_GRID)} input combinations")
+    return out
+
+
+def copy_app(bundle: Path, app_dir: Path):
+    """A folder for `shinylive export`: the browser-side modules and the bundle, no transactions."""
+    app_dir.mkdir(parents=True, exist_ok=True)
+    for name in APP_FILES:
+        shutil.copy2(ROOT / name, app_dir / name)
+    for old in [*app_dir.glob("*" + BROWSER_SUFFIX), *app_dir.glob("*.outputs")]:
+        shutil.rmtree(old)
+    shutil.copytree(bundle, app_dir / bundle.name)
+    outputs = outputs_path_for(bundle)
+    if outputs.exists():
+        shutil.copytree(outputs, app_dir / outputs.name)
+    else:
+        print(f"🔎 No pre-rendered outputs for {bundle.name}; every chart renders in the browser")
+    print(f"✅ Shinylive app in {app_dir} (next: shinylive export {app_dir} docs)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("data_dir", type=Path, help="folder holding the pipeline output(s)")
+    parser.add_argument("--app-dir", type=Path, default=None, help="also assemble a Shinylive app folder here")
+    args = parser.parse_args()
+
+    bundle = build_browser_bundle(args.data_dir)
+    if args.app_dir:
+        copy_app(bundle, args.app_dir)
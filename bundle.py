@@ -0,0 +1,411 @@
+"""
+Precomputed dataset bundle (2026)
+
+Written next to each pipeline output, e.g.
+HDB_Resale_Transactions_Merged_20260113.csv.gz
+HDB_Resale_Transactions_Merged_20260113.bundle/
+
+The bundle holds:
+1. Every dashboard column (incl. derived date, PSF and EXECUTIVE/MG recode)
+   as .npy arrays that the app memory-maps instead of parsing the CSV, in
+   the compact dtypes of FRAME_SCHEMA (strings as categorical codes)
+2. Period rollups, top-K leaderboards and L12M stats by town
+3. transactions.parquet, the same columns sorted by date, which the DuckDB
+   query backend (query_backend.py) scans instead of loading the frame
+4. A manifest.json with the format version, source hash and town list. The
+   source's size and mtime are recorded too, so loading only re-hashes the
+   CSV when they change
+
+Pipeline outputs are a transactions table keyed by ADDRESS_ID plus an
+address dimension (HDB_Resale_Addresses_<date>.csv.gz); read_transactions()
+joins the address columns the dashboard reads. Older single-table outputs
+load unchanged. memory_report() compares the loaded frame with the same
+columns in the dtypes read_csv infers.
+
+Build one for an existing CSV with:  python bundle.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Configuration
+# =====================================================
+BUNDLE_FORMAT = 5
+MD_THRESHOLD = 1_000_000
+LEADERBOARD_K = 10
+PERIODS = ("Monthly", "Quarterly", "Yearly")
+PARQUET_FILE = "transactions.parquet"
+PARQUET_ROW_GROUP = 100_000
+
+ADDRESS_KEY = "ADDRESS_ID"
+# Address dimension columns the dashboard reads; the rest stay on disk
+DIMENSION_COLUMNS = ["Block", "Street", "BUILDING", "ADDRESS", "LATITUDE", "LONGITUDE"]
+
+# Declared dtypes of the loaded frame; text columns not listed become
+# categoricals too. date, PSF and the coordinates keep 64 bits: every
+# window filter compares Timestamps, and the charts plot PSF and
+# coordinates at full precision
+FRAME_SCHEMA = {
+    "Year": "int16", "Month": "int8", "Lease_Commence": "int16",
+    "Lease_Remain_Months": "int16",
+    "Resale_Price": "int32", "Floor_Area_Sqm": "float32", "POSTAL": "int32",
+    "Town": "category", "Flat_Type": "category", "Block": "category", "Street": "category",
+    "Storey_Range": "category", "Flat_Model": "category", "BUILDING": "category", "ADDRESS": "category",
+    "BLK_NO": "category", "ROAD_NAME": "category",
+}
+
+
+# =====================================================
+# Shared preparation
+# =====================================================
+def address_path_for(csv_path: Path) -> Path:
+    # HDB_Resale_Transactions_Merged_<date>.csv.gz[.partial] -> HDB_Resale_Addresses_<date>.csv.gz
+    csv_path = Path(csv_path)
+    stem = csv_path.name.split(".csv")[0].replace("Transactions_Merged", "Addresses")
+    return csv_path.with_name(stem + ".csv.gz")
+
+
+def read_transactions(csv_path: Path, columns=DIMENSION_COLUMNS) -> pd.DataFrame:
+    """Transactions with the requested address dimension columns joined on ADDRESS_ID."""
+    df = pd.read_csv(csv_path, compression="gzip")
+    if ADDRESS_KEY not in df.columns:
+        return df  # single merged table from before the address dimension
+
+    dim = pd.read_csv(
+        address_path_for(csv_path), compression="gzip",
+        usecols=[ADDRESS_KEY, *columns], index_col=ADDRESS_KEY,
+    )
+    joined = dim.reindex(df[ADDRESS_KEY].to_numpy())
+    for col in columns:
+        df[col] = joined[col].to_numpy()
+    return df
+
+
+def prepare_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    # Ensure a proper date column
+    df["date"] = pd.to_datetime(
+        df["Year"].astype(str) + "-" +
+        df["Month"].astype(str).str.zfill(2) + "-01"
+    )
+
+    # Rename flat types to combine executive and multi-generation flats
+    df["Flat_Type"] = df["Flat_Type"].replace(
+        {"EXECUTIVE": "EXECUTIVE/MG", "MULTI-GENERATION": "EXECUTIVE/MG"}
+    )
+    df["PSF"] = df["Resale_Price"] / (df["Floor_Area_Sqm"] * 10.764)
+
+    # Older outputs split the remaining lease into years (as text) and months
+    if "Lease_Remain_Months" not in df.columns and "Lease.Remain" in df.columns:
+        months = pd.to_numeric(df["Lease.Remain.Month"]) if "Lease.Remain.Month" in df.columns else 0
+        df["Lease_Remain_Months"] = pd.to_numeric(df["Lease.Remain"]) * 12 + months
+        df = df.drop(columns=["Lease.Remain", "Lease.Remain.Month"], errors="ignore")
+    return apply_schema(df)
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Columns in their FRAME_SCHEMA dtypes; a narrowing that would change a value is skipped with a note."""
+    casts = {col: dtype for col, dtype in FRAME_SCHEMA.items() if col in df.columns}
+    for col in df.columns:
+        if col not in casts and df[col].dtype == object:
+            casts[col] = "category"
+    for col, dtype in casts.items():
+        s = df[col]
+        if str(s.dtype) == dtype:
+            continue
+        if dtype == "category":
+            df[col] = s.astype(dtype)
+            continue
+        try:
+            narrow = s.astype(dtype)
+            lossless = bool((narrow.astype(s.dtype) == s).all())
+        except (TypeError, ValueError, OverflowError):
+            lossless = False
+        if lossless:
+            df[col] = narrow
+        else:
+            print(f"🔎 {col} kept as {s.dtype}: not every value fits {dtype}")
+    return df
+
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    """Bytes per column, as loaded and as read_csv would infer them (object strings, 64-bit numbers)."""
+    rows = []
+    for col in df.columns:
+        s = df[col]
+        loaded = int(s.memory_usage(index=False, deep=True))
+        is_cat = isinstance(s.dtype, pd.CategoricalDtype)
+        if is_cat and s.cat.categories.dtype == object:
+            # One pointer per row plus the row's own string object, as pandas counts object columns
+            sizes = np.array([sys.getsizeof(v) for v in s.cat.categories] + [sys.getsizeof(np.nan)])
+            inferred = 8 * len(s) + int(sizes[s.cat.codes.to_numpy()].sum())
+        elif is_cat or s.dtype.kind in "iuf":
+            inferred = 8 * len(s)
+        else:
+            inferred = loaded
+        rows.append({"Column": col, "Dtype": str(s.dtype), "Bytes": loaded, "Inferred_Bytes": inferred})
+    return pd.DataFrame(rows)
+
+
+def print_memory_report(df: pd.DataFrame):
+    report = memory_report(df)
+    loaded, inferred = report["Bytes"].sum(), report["Inferred_Bytes"].sum()
+    print(
+        f"✔ Frame: {len(df):,} rows, {loaded / 1e6:.1f} MB resident "
+        f"({inferred / 1e6:.1f} MB in inferred dtypes, {inferred / max(loaded, 1):.1f}x)"
+    )
+    for r in report.sort_values("Bytes", ascending=False).itertuples():
+        print(f"   {r.Column:<20} {r.Dtype:<15} {r.Bytes / 1e6:>7.2f} MB  (inferred {r.Inferred_Bytes / 1e6:.2f} MB)")
+
+
+def period_columns(dates: pd.Series, period: str) -> pd.DataFrame:
+    # Same Period / Period_sort labels as app.filter_period
+    if period == "Monthly":
+        sort = dates
+        label = dates.dt.strftime("%b%y")
+    elif period == "Quarterly":
+        sort = dates.dt.to_period("Q").dt.start_time
+        label = sort.dt.quarter.astype(str) + "Q" + (sort.dt.year % 100).astype(str)
+    else:
+        sort = dates.dt.to_period("Y").dt.start_time
+        label = sort.dt.year.astype(str)
+    return pd.DataFrame({"Period_sort": sort, "Period": label}, index=dates.index)
+
+
+# =====================================================
+# Aggregates
+# =====================================================
+def period_rollup(df: pd.DataFrame, period: str) -> pd.DataFrame:
+    frame = df[["Flat_Type", "Resale_Price", "PSF"]].join(period_columns(df["date"], period))
+    frame["MD"] = frame["Resale_Price"] >= MD_THRESHOLD
+    md = frame[frame["MD"]]
+
+    keys = ["Period_sort", "Period", "Flat_Type"]
+    rollup = frame.groupby(keys, observed=True).agg(
+        Count=("Resale_Price", "size"),
+        Median_Price=("Resale_Price", "median"),
+        Median_PSF=("PSF", "median"),
+    )
+    md_rollup = md.groupby(keys, observed=True).agg(
+        MD_Count=("Resale_Price", "size"),
+        MD_Max_Price=("Resale_Price", "max"),
+        MD_Median_Price=("Resale_Price", "median"),
+        MD_Max_PSF=("PSF", "max"),
+        MD_Median_PSF=("PSF", "median"),
+    )
+    rollup = rollup.join(md_rollup, how="left").reset_index()
+    rollup["MD_Count"] = rollup["MD_Count"].fillna(0).astype(int)
+    return rollup.sort_values(keys).reset_index(drop=True)
+
+
+def leaderboard(df: pd.DataFrame, k=LEADERBOARD_K) -> pd.DataFrame:
+    md = df[df["Resale_Price"] >= MD_THRESHOLD]
+    boards = []
+    for metric in ("Resale_Price", "PSF"):
+        top = (
+            md.sort_values(["Flat_Type", metric], ascending=[True, False])
+            .groupby("Flat_Type", observed=True)
+            .head(k)
+            .copy()
+        )
+        top["Metric"] = metric
+        top["Rank"] = top.groupby("Flat_Type", observed=True).cumcount() + 1
+        boards.append(top)
+    cols = ["Metric", "Rank", "Flat_Type", "date", "Town", "Resale_Price", "PSF", "Floor_Area_Sqm", "Storey_Range"]
+    cols += [c for c in ("BUILDING", "ADDRESS") if c in df.columns]
+    return pd.concat(boards, ignore_index=True)[cols]
+
+
+def l12m_stats(df: pd.DataFrame) -> pd.DataFrame:
+    # Same window as the L12M columns of Tables 7/8
+    l12m_start = df["date"].max() - pd.DateOffset(months=12)
+    recent = df[df["date"] > l12m_start]
+    frames = []
+    for ft, part in [("All", recent)] + list(recent.groupby("Flat_Type", observed=True)):
+        md = part[part["Resale_Price"] >= MD_THRESHOLD]
+        stats = part.groupby("Town", observed=True).agg(
+            Count=("Resale_Price", "size"),
+            Median_Price=("Resale_Price", "median"),
+            Median_PSF=("PSF", "median"),
+        ).join(md.groupby("Town", observed=True).agg(
+            MD_Count=("Resale_Price", "size"),
+            MD_Max_Price=("Resale_Price", "max"),
+            MD_Max_PSF=("PSF", "max"),
+            MD_Median_Price=("Resale_Price", "median"),
+            MD_Median_PSF=("PSF", "median"),
+        ), how="left")
+        stats["MD_Count"] = stats["MD_Count"].fillna(0).astype(int)
+        stats.insert(0, "Flat_Type", ft)
+        frames.append(stats.reset_index())
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_aggregates(df: pd.DataFrame) -> dict:
+    tables = {f"rollup_{p.lower()}": period_rollup(df, p) for p in PERIODS}
+    tables["leaderboard"] = leaderboard(df)
+    tables["l12m_town"] = l12m_stats(df)
+    return tables
+
+
+# =====================================================
+# Column storage
+# =====================================================
+def _write_frame(frame: pd.DataFrame, dst: Path) -> list:
+    # One .npy per column; strings become categorical codes + categories in
+    # the manifest. The codes keep the width pandas holds them in (int8 up to
+    # 127 categories), so they load without a conversion copy
+    dst.mkdir(parents=True)
+    columns = []
+    for i, col in enumerate(frame.columns):
+        s = frame[col]
+        meta = {"name": col, "file": f"{i:03d}.npy"}
+        if s.dtype == object or isinstance(s.dtype, pd.CategoricalDtype):
+            cat = pd.Categorical(s.astype(object))
+            values = cat.codes
+            meta["categories"] = cat.categories.tolist()
+        else:
+            values = s.to_numpy()
+        meta["dtype"] = str(values.dtype)
+        np.save(dst / meta["file"], values, allow_pickle=False)
+        columns.append(meta)
+    return columns
+
+
+def _read_frame(src: Path, columns: list, mmap=True) -> pd.DataFrame:
+    data = {}
+    for meta in columns:
+        values = np.load(src / meta["file"], mmap_mode="r" if mmap else None)
+        if "categories" in meta:
+            # Codes straight into a categorical; missing strings are code -1
+            values = pd.Categorical.from_codes(values, categories=meta["categories"])
+        data[meta["name"]] = values
+    # copy=False keeps every column on its mapped file, so worker processes
+    # share the pages (read-only: the app never writes into this frame)
+    return pd.DataFrame(data, copy=False)
+
+
+def _write_parquet(df: pd.DataFrame, dst: Path) -> str:
+    # Row groups sorted by date let DuckDB skip the months a query filters out;
+    # _row keeps the CSV order for first() and for breaking ties
+    frame = df.assign(_row=np.arange(len(df), dtype=np.int64)).sort_values("date", kind="stable")
+    frame["date"] = frame["date"].astype("datetime64[us]")
+    frame.to_parquet(dst, index=False, row_group_size=PARQUET_ROW_GROUP)
+    return dst.name
+
+
+# =====================================================
+# Build / load
+# =====================================================
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_sha256(csv_path: Path) -> str:
+    # The transactions file plus its address dimension, when there is one
+    digest = file_sha256(csv_path)
+    dim = address_path_for(csv_path)
+    if dim.exists():
+        digest = hashlib.sha256(f"{digest}:{file_sha256(dim)}".encode()).hexdigest()
+    return digest
+
+
+def source_stat(csv_path: Path) -> list:
+    # (size, mtime_ns) of the transactions file and its address dimension
+    paths = [Path(csv_path), address_path_for(csv_path)]
+    return [[p.stat().st_size, p.stat().st_mtime_ns] for p in paths if p.exists()]
+
+
+def bundle_path_for(csv_path: Path) -> Path:
+    csv_path = Path(csv_path)
+    return csv_path.with_name(csv_path.name.split(".csv")[0] + ".bundle")
+
+
+def build_bundle(csv_path: Path, dst: Path = None) -> Path:
+    csv_path = Path(csv_path)
+    dst = Path(dst) if dst is not None else bundle_path_for(csv_path)
+    df = prepare_transactions(read_transactions(csv_path))
+
+    # Build into a scratch folder and rename, so readers never see half a bundle
+    tmp = dst.with_name(dst.name + ".partial")
+    shutil.rmtree(tmp, ignore_errors=True)
+
+    manifest = {
+        "bundle_format": BUNDLE_FORMAT,
+        "source_stat": source_stat(csv_path),
+        "source_sha256": source_sha256(csv_path),
+        "rows": len(df),
+        "latest_date": df["date"].max().strftime("%Y-%m-%d"),
+        "towns": df["Town"].unique().tolist(),
+        "columns": _write_frame(df, tmp / "columns"),
+        "aggregates": {
+            name: _write_frame(table, tmp / "aggregates" / name)
+            for name, table in build_aggregates(df).items()
+        },
+        "parquet": _write_parquet(df, tmp / PARQUET_FILE),
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=1))
+
+    shutil.rmtree(dst, ignore_errors=True)
+    tmp.rename(dst)
+    print(f"✔ Bundle saved: {dst} ({len(df):,} rows)")
+    return dst
+
+
+def read_manifest(csv_path: Path):
+    """Return the bundle manifest if it exists and matches the CSV, else None."""
+    bundle = bundle_path_for(csv_path)
+    try:
+        manifest = json.loads((bundle / "manifest.json").read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("bundle_format") != BUNDLE_FORMAT:
+        return None
+    stat = source_stat(csv_path)
+    if manifest.get("source_stat") == stat:
+        return manifest
+
+    # Touched or copied since the build: the hash decides, and a match records
+    # the new size and mtime so the next load skips the hash again
+    if manifest.get("source_sha256") != source_sha256(csv_path):
+        return None
+    manifest["source_stat"] = stat
+    tmp = bundle / f"manifest.json.{os.getpid()}"
+    try:
+        tmp.write_text(json.dumps(manifest, indent=1))
+        tmp.replace(bundle / "manifest.json")
+    except OSError:
+        tmp.unlink(missing_ok=True)
+    return manifest
+
+
+def load_bundle_frame(csv_path: Path):
+    manifest = read_manifest(csv_path)
+    if manifest is None:
+        return None
+    return _read_frame(bundle_path_for(csv_path) / "columns", manifest["columns"])
+
+
+def load_aggregate(csv_path: Path, name: str):
+    manifest = read_manifest(csv_path)
+    if manifest is None or name not in manifest["aggregates"]:
+        return None
+    return _read_frame(bundle_path_for(csv_path) / "aggregates" / name, manifest["aggregates"][name])
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        build_bundle(Path(arg))
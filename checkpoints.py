@@ -0,0 +1,144 @@
+"""
+Pipeline checkpoints (2026)
+
+transactions.main() runs each stage through a StageRunner:
+1. A stage's key hashes its name, CHECKPOINT_VERSION and the content
+   hashes of its inputs (raw CSV, upstream outputs, boundary version)
+2. Its output frames are written as parquet under data/checkpoints and
+   their sha256 recorded in manifest.json once the stage completes
+3. A re-run loads any stage whose key and files still match instead of
+   running it again
+
+Geocoding commits one checkpoint per batch of addresses, so an interrupted
+run resumes after the last finished batch. A batch with failed OneMap
+requests is not committed, so they are retried on the next run. Set HDB_CHECKPOINTS=0 (or delete
+data/checkpoints) for a clean run.
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from bundle import file_sha256
+
+# =====================================================
+# Configuration
+# =====================================================
+CHECKPOINT_DIR = Path(os.getenv("HDB_CHECKPOINT_DIR", "data/checkpoints"))
+CHECKPOINTS_ENABLED = os.getenv("HDB_CHECKPOINTS", "1") != "0"
+CHECKPOINT_VERSION = 1  # bump when a stage's output format changes
+
+
+def combine_digests(digests) -> str:
+    h = hashlib.sha256()
+    for d in digests:
+        h.update(str(d).encode())
+    return h.hexdigest()
+
+
+# =====================================================
+# Stage runner
+# =====================================================
+class StageRunner:
+    def __init__(self, root: Path = CHECKPOINT_DIR, enabled=CHECKPOINTS_ENABLED):
+        self.root = Path(root)
+        self.enabled = enabled
+        self.manifest_path = self.root / "manifest.json"
+        try:
+            self.manifest = json.loads(self.manifest_path.read_text()) if enabled else {}
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def key(self, name, inputs=()) -> str:
+        return combine_digests([CHECKPOINT_VERSION, name, *inputs])
+
+    def digest(self, name) -> str:
+        """Content hash of a finished stage's output, to key the stages after it."""
+        return self.manifest[name]["digest"]
+
+    def track_file(self, name, path: Path) -> str:
+        """Record an input file produced outside the runner (e.g. the download)."""
+        digest = file_sha256(path)
+        self.manifest[name] = {"key": name, "digest": digest, "files": []}
+        self._write_manifest()
+        return digest
+
+    def run(self, name, fn, inputs=(), complete=None):
+        """
+        Return fn()'s DataFrame (or tuple of DataFrames), from the checkpoint
+        when it is still valid. If `complete(result)` is False the result is
+        used but not committed, so the next run computes it again.
+        """
+        key = self.key(name, inputs)
+        cached = self._load(name, key)
+        if cached is not None:
+            print(f"↩ {name}: reusing checkpoint")
+            return cached
+
+        result = fn()
+        if complete is not None and not complete(result):
+            # Never matches a key, and a digest of its own so no later stage
+            # built on this result is reused either
+            self.manifest[name] = {"key": None, "digest": combine_digests([key, os.urandom(16).hex()]), "files": []}
+        elif self.enabled:
+            self._save(name, key, result)
+        else:
+            self.manifest[name] = {"key": key, "digest": key, "files": []}
+        return result
+
+    def prune(self, prefix, keep):
+        """Drop checkpoints under `prefix` that the current run no longer uses (e.g. old geocode batches)."""
+        for name in [n for n in self.manifest if n.startswith(prefix) and n not in keep]:
+            for file in self.manifest.pop(name)["files"]:
+                (self.root / file).unlink(missing_ok=True)
+        self._write_manifest()
+
+    # =====================================================
+    # Storage
+    # =====================================================
+    def _load(self, name, key):
+        entry = self.manifest.get(name)
+        if not self.enabled or entry is None or entry["key"] != key:
+            return None
+        paths = [self.root / f for f in entry["files"]]
+        if not all(p.exists() for p in paths):
+            return None
+        if combine_digests(file_sha256(p) for p in paths) != entry["digest"]:
+            return None
+        frames = [pd.read_parquet(p) for p in paths]
+        return tuple(frames) if entry["tuple"] else frames[0]
+
+    def _save(self, name, key, result):
+        frames = list(result) if isinstance(result, tuple) else [result]
+        files = []
+        for i, frame in enumerate(frames):
+            file = f"{name}.{i}.parquet"
+            path = self.root / file
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_name(path.name + ".partial")
+            frame.to_parquet(partial)
+            os.replace(partial, path)
+            files.append(file)
+
+        # The manifest entry is the commit point: written only after every file
+        self.manifest[name] = {
+            "key": key,
+            "digest": combine_digests(file_sha256(self.root / f) for f in files),
+            "files": files,
+            "tuple": isinstance(result, tuple),
+        }
+        self._write_manifest()
+
+    def _write_manifest(self):
+        if not self.enabled:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        partial = self.manifest_path.with_name(self.manifest_path.name + ".partial")
+        partial.write_text(json.dumps(self.manifest, indent=1))
+        os.replace(partial, self.manifest_path)
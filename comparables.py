@@ -0,0 +1,149 @@
+"""
+Comparable transactions (2026)
+
+Answers "what did nearby flats of the same type sell for lately?" without
+scanning the transactions:
+1. A KD-tree over block coordinates (one point per ADDRESS, in metres on
+   the spatial_index grid)
+2. Every block's transactions stored contiguously and sorted by date, so
+   the last N months of a block are one slice
+3. query() takes the k nearest comparables or every one within a radius,
+   filtered by Flat_Type and a Floor_Area_Sqm band
+
+Time lookups on an existing CSV with:  python comparables.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from spatial_index import to_metres
+
+# =====================================================
+# Configuration
+# =====================================================
+COMPARABLE_COLUMNS = [
+    "ADDRESS", "BUILDING", "Town", "LATITUDE", "LONGITUDE", "date", "Flat_Type",
+    "Flat_Model", "Floor_Area_Sqm", "Storey_Range", "Lease_Remain_Months", "Resale_Price", "PSF",
+]
+CATEGORY_COLUMNS = ["ADDRESS", "BUILDING", "Town", "Flat_Type", "Flat_Model", "Storey_Range"]
+FIRST_BLOCKS = 16  # blocks searched first for a k-nearest query; grows 4x until k rows are found
+
+
+# =====================================================
+# Index
+# =====================================================
+class ComparablesIndex:
+    def __init__(self, df: pd.DataFrame):
+        lon = pd.to_numeric(df["LONGITUDE"], errors="coerce").to_numpy(float)
+        lat = pd.to_numeric(df["LATITUDE"], errors="coerce").to_numpy(float)
+        located = np.isfinite(lon) & np.isfinite(lat) & df["ADDRESS"].notna().to_numpy()
+
+        # 1. Rows grouped by block, by date within a block; strings as categories
+        rows = df.loc[located, COMPARABLE_COLUMNS].reset_index(drop=True)
+        block, self.addresses = pd.factorize(rows["ADDRESS"], sort=True)
+        order = np.lexsort((rows["date"].to_numpy(), block))
+        rows = rows.iloc[order].reset_index(drop=True)
+        for col in CATEGORY_COLUMNS:
+            rows[col] = rows[col].astype("category")
+        self.rows = rows.drop(columns=["LATITUDE", "LONGITUDE"])
+        self.dates = rows["date"].to_numpy()
+        self.flat_types = rows["Flat_Type"].cat.codes.to_numpy()
+        self.areas = rows["Floor_Area_Sqm"].to_numpy(float)
+        self.latest = rows["date"].max()
+
+        # 2. Block b owns rows starts[b]:starts[b + 1]
+        block = block[order]
+        self.starts = np.searchsorted(block, np.arange(len(self.addresses) + 1))
+        first = self.starts[:-1]
+        self.xy = np.column_stack(to_metres(lon[located][order][first], lat[located][order][first]))
+        self.tree = cKDTree(self.xy)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def block_of(self, address) -> int:
+        b = self.addresses.get_indexer([address])[0]
+        if b < 0:
+            raise KeyError(address)
+        return b
+
+    def _gather(self, blocks, distances, since, flat_type, area):
+        # Each block's rows from `since` onward, then the flat type / size filters
+        parts, dist = [], []
+        for b, d in zip(blocks, distances):
+            start, end = self.starts[b], self.starts[b + 1]
+            start += np.searchsorted(self.dates[start:end], since, side="right")
+            parts.append(np.arange(start, end))
+            dist.append(np.full(end - start, d))
+        if not parts:
+            return np.empty(0, int), np.empty(0)
+        pos, dist = np.concatenate(parts), np.concatenate(dist)
+        keep = np.ones(len(pos), bool)
+        if flat_type not in (None, "All"):
+            keep &= self.flat_types[pos] == self.rows["Flat_Type"].cat.categories.get_indexer([flat_type])[0]
+        if area is not None:
+            keep &= (self.areas[pos] >= area[0]) & (self.areas[pos] <= area[1])
+        return pos[keep], dist[keep]
+
+    def query(self, address, flat_type=None, area=None, months=12, k=20, radius_m=None) -> pd.DataFrame:
+        """
+        Comparables around `address`, nearest first, latest first within a block.
+
+        Covers the last `months` months of the data (date > latest - months,
+        as the L12M columns); `area` is an inclusive (min, max) sqm band.
+        With `radius_m` every match within that distance is returned,
+        otherwise the `k` nearest.
+        """
+        since = (self.latest - pd.DateOffset(months=months)).to_datetime64()
+        xy = self.xy[self.block_of(address)]
+
+        if radius_m is not None:
+            blocks = np.asarray(self.tree.query_ball_point(xy, radius_m), dtype=int)
+            distances = np.hypot(*(self.xy[blocks] - xy).T)
+            pos, dist = self._gather(blocks, distances, since, flat_type, area)
+        else:
+            # Blocks beyond the n nearest are farther than all of them, so k
+            # rows found among those are the k nearest overall
+            n = FIRST_BLOCKS
+            while True:
+                n = min(n, len(self.addresses))
+                distances, blocks = self.tree.query(xy, k=n)
+                pos, dist = self._gather(np.atleast_1d(blocks), np.atleast_1d(distances), since, flat_type, area)
+                if len(pos) >= k or n == len(self.addresses):
+                    break
+                n *= 4
+
+        # Nearest first, latest first within a block; only the kept rows are materialised
+        order = np.lexsort((-self.dates[pos].astype(np.int64), dist))
+        if radius_m is None:
+            order = order[:k]
+        result = self.rows.iloc[pos[order]].assign(Distance=dist[order])
+        # A few rows: plain strings again, so a rendered table doesn't carry every category
+        result[CATEGORY_COLUMNS] = result[CATEGORY_COLUMNS].astype(object)
+        return result.reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from bundle import load_bundle_frame, prepare_transactions, read_transactions
+
+    for arg in sys.argv[1:]:
+        frame = load_bundle_frame(arg)
+        if frame is None:
+            frame = prepare_transactions(read_transactions(arg))
+        start = time.perf_counter()
+        index = ComparablesIndex(frame[COMPARABLE_COLUMNS])
+        print(f"✔ Comparables index: {len(index):,} rows, {len(index.addresses):,} blocks in {time.perf_counter() - start:.1f}s")
+
+        rng = np.random.default_rng(0)
+        for kwargs in ({"k": 20}, {"radius_m": 500}):
+            start = time.perf_counter()
+            for address in rng.choice(index.addresses, 200):
+                index.query(address, flat_type="4 ROOM", area=(80, 110), months=12, **kwargs)
+            print(f"⏱ {kwargs}: {(time.perf_counter() - start) / 200 * 1000:.2f} ms per query")
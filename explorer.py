@@ -0,0 +1,216 @@
+"""
+Transaction explorer index (2026)
+
+Backs the TRANSACTIONS page: filter, sort and page through the full
+history without scanning it:
+1. Rows are stored in date order, so a date range is one slice
+2. Town, Flat_Type, BUILDING, ADDRESS and Storey_Range get inverted
+   indexes (row positions per value); addresses are sorted, so a prefix
+   search is one contiguous run of them
+3. Price and the other sort columns keep a sorted order and a rank per row
+4. search() starts from the most selective filter, checks the others on
+   those candidates only, and sorts just enough of them for one page
+
+Time searches on an existing CSV with:  python explorer.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from dataclasses import dataclass
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# Configuration
+# =====================================================
+EXPLORER_COLUMNS = [
+    "date", "Town", "Flat_Type", "BUILDING", "ADDRESS", "Flat_Model",
+    "Floor_Area_Sqm", "Storey_Range", "Lease_Remain_Months", "Resale_Price", "PSF",
+]
+INDEXED_COLUMNS = ["Town", "Flat_Type", "BUILDING", "ADDRESS", "Storey_Range"]
+SORT_COLUMNS = ["date", "Resale_Price", "PSF", "Floor_Area_Sqm"]
+PAGE_SIZE = 50
+
+
+@dataclass
+class Filters:
+    """A filter left as None (or empty) matches every row; ranges are inclusive."""
+    towns: tuple = ()
+    buildings: tuple = ()
+    flat_types: tuple = ()
+    address_prefix: str = None
+    price: tuple = None  # (min, max); either side may be None
+    storey: tuple = None  # (lowest, highest) floor; a Storey_Range matches if it overlaps
+    dates: tuple = None  # (first, last) date
+
+
+def storey_bounds(labels) -> np.ndarray:
+    # "10 TO 12" -> (10, 12)
+    parts = pd.Series(labels, dtype=object).str.extract(r"(\d+)\D+(\d+)").astype(float)
+    return parts.to_numpy()
+
+
+# =====================================================
+# Index
+# =====================================================
+class InvertedIndex:
+    """Row positions per value of one column: value c owns order[offsets[c]:offsets[c + 1]]."""
+
+    def __init__(self, values: pd.Series):
+        cat = pd.Categorical(values.astype(object))  # categories sorted
+        self.categories = cat.categories
+        self.codes = cat.codes
+        self.order = np.argsort(self.codes, kind="stable")
+        self.offsets = np.searchsorted(self.codes[self.order], np.arange(-1, len(self.categories) + 1))[1:]
+
+    def codes_of(self, values) -> np.ndarray:
+        codes = self.categories.get_indexer(list(values))
+        return np.sort(codes[codes >= 0])
+
+    def prefix_range(self, prefix):
+        """Codes [lo, hi) of every value starting with `prefix`."""
+        return (
+            self.categories.searchsorted(prefix, side="left"),
+            self.categories.searchsorted(prefix + "\uffff", side="left"),
+        )
+
+    def count(self, codes) -> int:
+        return int((self.offsets[codes + 1] - self.offsets[codes]).sum())
+
+    def positions(self, codes) -> np.ndarray:
+        if len(codes) and codes[-1] - codes[0] + 1 == len(codes):
+            return self.order[self.offsets[codes[0]]:self.offsets[codes[-1] + 1]]  # a run of values, e.g. a prefix
+        return np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in codes] or [np.empty(0, int)])
+
+
+class ExplorerIndex:
+    def __init__(self, df: pd.DataFrame):
+        # 1. Date order, so a date range is a slice of positions
+        rows = df[EXPLORER_COLUMNS].sort_values("date", kind="stable").reset_index(drop=True)
+        self.dates = rows["date"].to_numpy()
+
+        # 2. Inverted indexes; the frame keeps their codes instead of strings
+        self.indexes = {col: InvertedIndex(rows[col]) for col in INDEXED_COLUMNS}
+        for col, index in self.indexes.items():
+            rows[col] = pd.Categorical.from_codes(index.codes, categories=index.categories)
+        self.rows = rows
+        bounds = storey_bounds(self.indexes["Storey_Range"].categories)
+        self.storey_low, self.storey_high = bounds[:, 0], bounds[:, 1]
+
+        # 3. Sorted order (ascending, missing last) and rank per row for each sort column
+        self.sorted = {}
+        self.ranks = {}
+        for col in SORT_COLUMNS:
+            order = np.argsort(rows[col].to_numpy(), kind="stable")
+            rank = np.empty(len(order), np.int64)
+            rank[order] = np.arange(len(order))
+            self.sorted[col], self.ranks[col] = order, rank
+        self.sorted_prices = rows["Resale_Price"].to_numpy(float)[self.sorted["Resale_Price"]]
+
+    def __len__(self):
+        return len(self.rows)
+
+    # =====================================================
+    # Filters as (estimated rows, candidate positions, check on candidates)
+    # =====================================================
+    def _code_filter(self, column, codes):
+        index = self.indexes[column]
+        allowed = np.zeros(len(index.categories), bool)
+        allowed[codes] = True
+        return index.count(codes), lambda: index.positions(codes), lambda pos: allowed[index.codes[pos]]
+
+    def _price_filter(self, low, high):
+        # A price range is a run of the price order; a row is inside if its rank is
+        prices, rank = self.sorted_prices, self.ranks["Resale_Price"]
+        lo = 0 if low is None else np.searchsorted(prices, low, side="left")
+        hi = len(prices) if high is None else np.searchsorted(prices, high, side="right")
+        return hi - lo, lambda: self.sorted["Resale_Price"][lo:hi], lambda pos: (rank[pos] >= lo) & (rank[pos] < hi)
+
+    def _date_filter(self, first, last):
+        lo = 0 if first is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(first)), side="left")
+        hi = len(self.dates) if last is None else np.searchsorted(self.dates, np.datetime64(pd.Timestamp(last)), side="right")
+        return hi - lo, lambda: np.arange(lo, hi), lambda pos: (pos >= lo) & (pos < hi)
+
+    def _filters(self, f: Filters) -> list:
+        found = []
+        for column, values in (("Town", f.towns), ("BUILDING", f.buildings), ("Flat_Type", f.flat_types)):
+            if values:
+                found.append(self._code_filter(column, self.indexes[column].codes_of(values)))
+        if f.address_prefix:
+            lo, hi = self.indexes["ADDRESS"].prefix_range(f.address_prefix.strip().upper())
+            found.append(self._code_filter("ADDRESS", np.arange(lo, hi)))
+        if f.storey is not None:
+            overlaps = (self.storey_low <= f.storey[1]) & (self.storey_high >= f.storey[0])
+            found.append(self._code_filter("Storey_Range", np.flatnonzero(overlaps)))
+        if f.price is not None and (f.price[0] is not None or f.price[1] is not None):
+            found.append(self._price_filter(*f.price))
+        if f.dates is not None and (f.dates[0] is not None or f.dates[1] is not None):
+            found.append(self._date_filter(*f.dates))
+        return found
+
+    # =====================================================
+    # Search
+    # =====================================================
+    def search(self, filters: Filters, sort_by="date", descending=True, offset=0, limit=PAGE_SIZE):
+        """(matching rows, one page of them as a frame)."""
+        found = self._filters(filters)
+        rank = self.ranks[sort_by]
+        stop = offset + limit
+
+        if not found:
+            # Every row matches: the page is a slice of the sorted order
+            order = self.sorted[sort_by][::-1] if descending else self.sorted[sort_by]
+            return len(self), self._page(order[offset:stop])
+
+        # 1. Candidates from the most selective filter, checked against the rest
+        found.sort(key=lambda f: f[0])
+        pos = found[0][1]()
+        for _, _, check in found[1:]:
+            pos = pos[check(pos)]
+
+        # 2. Only the rows up to the end of the page are put in order
+        total = len(pos)
+        keys = -rank[pos] if descending else rank[pos]
+        if stop < total:
+            head = np.argpartition(keys, stop - 1)[:stop]
+            pos, keys = pos[head], keys[head]
+        return total, self._page(pos[np.argsort(keys)][offset:stop])
+
+    def _page(self, positions) -> pd.DataFrame:
+        page = self.rows.iloc[positions].reset_index(drop=True)
+        # A page of rows: plain strings again, so a rendered table doesn't carry every category
+        cats = [col for col, dtype in page.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+        return page.astype(dict.fromkeys(cats, object))
+
+
+if __name__ == "__main__":
+    from bundle import load_bundle_frame, prepare_transactions, read_transactions
+
+    for arg in sys.argv[1:]:
+        frame = load_bundle_frame(arg)
+        if frame is None:
+            frame = prepare_transactions(read_transactions(arg))
+        start = time.perf_counter()
+        index = ExplorerIndex(frame)
+        print(f"✔ Explorer index: {len(index):,} rows in {time.perf_counter() - start:.1f}s")
+
+        latest = frame["date"].max()
+        cases = {
+            "everything, by price": (Filters(), "Resale_Price"),
+            "one town, 4 ROOM": (Filters(towns=(frame["Town"].iloc[0],), flat_types=("4 ROOM",)), "date"),
+            "address prefix": (Filters(address_prefix=str(frame["ADDRESS"].iloc[0])[:3]), "PSF"),
+            "million-dollar, high floors": (Filters(price=(1_000_000, None), storey=(30, 99)), "date"),
+            "last 12 months, 5 ROOM, page 20": (
+                Filters(flat_types=("5 ROOM",), dates=(latest - pd.DateOffset(months=12), latest)), "Resale_Price"
+            ),
+        }
+        for name, (filters, sort_by) in cases.items():
+            offset = 19 * PAGE_SIZE if "page 20" in name else 0
+            start = time.perf_counter()
+            for _ in range(20):
+                total, page = index.search(filters, sort_by, offset=offset)
+            print(f"⏱ {name}: {total:,} rows, {(time.perf_counter() - start) / 20 * 1000:.1f} ms per page")
@@ -0,0 +1,154 @@
+"""
+Local geocoder (2026)
+
+Answers OneMap searches from results OneMap already gave us:
+1. Every OneMap result row is kept in a parquet cache (data/geocode)
+2. Rows are indexed by block number + normalized street tokens, and by
+   postal code; ST/STREET, CTRL/CENTRAL, JLN/JALAN etc. normalize alike
+3. A search resolves locally when its postal code or block + street match
+   exactly, or when its street tokens match one known street of the same
+   block closely enough, short of one word that does not make it another
+   street (not UPP, NTH, STH etc. or a number); anything less confident
+   goes to OneMap
+
+Seed the cache from earlier address tables with:
+    python geocoder.py HDB_Resale_Addresses_<date>.csv.gz [...]
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+from urllib.parse import unquote
+import os
+import re
+import sys
+
+import pandas as pd
+
+# =====================================================
+# Configuration
+# =====================================================
+GEOCODE_CACHE = Path(os.getenv("HDB_GEOCODE_CACHE", "data/geocode/onemap_results.parquet"))
+MIN_CONFIDENCE = 0.75  # token overlap needed to trust a fuzzy street match
+# Words that name a different street: UPPER BOON KENG RD is not BOON KENG RD
+QUALIFIERS = {"UPP", "LOWER", "NTH", "STH", "EAST", "WEST", "NEW", "OLD"}
+
+# Long and short spellings map to one token
+TOKEN_ALIASES = {
+    "AVENUE": "AVE", "STREET": "ST", "SAINT": "ST", "ROAD": "RD", "DRIVE": "DR",
+    "CENTRAL": "CTRL", "CENTRE": "CTR", "CRESCENT": "CRES", "JALAN": "JLN",
+    "LORONG": "LOR", "NORTH": "NTH", "SOUTH": "STH", "UPPER": "UPP",
+    "BUKIT": "BT", "KAMPONG": "KG", "TANJONG": "TG", "PLACE": "PL",
+    "TERRACE": "TER", "CLOSE": "CL", "GARDENS": "GDNS", "HEIGHTS": "HTS",
+    "PARK": "PK", "SQUARE": "SQ", "COMMONWEALTH": "CWEALTH", "MARKET": "MKT",
+}
+RESULT_COLUMNS = ["SEARCHVAL", "BLK_NO", "ROAD_NAME", "BUILDING", "ADDRESS", "POSTAL", "X", "Y", "LATITUDE", "LONGITUDE"]
+
+
+# =====================================================
+# Normalization
+# =====================================================
+def normalize_tokens(text) -> tuple:
+    text = unquote(str(text)).upper().replace("'", "")
+    return tuple(TOKEN_ALIASES.get(t, t) for t in re.sub(r"[^A-Z0-9]+", " ", text).split())
+
+
+def is_postal(text) -> bool:
+    return re.fullmatch(r"\d{6}", unquote(str(text)).strip()) is not None
+
+
+# =====================================================
+# Geocoder
+# =====================================================
+class LocalGeocoder:
+    """In-process index over cached OneMap result rows."""
+
+    def __init__(self, rows: pd.DataFrame = None):
+        self.rows = pd.DataFrame(columns=RESULT_COLUMNS) if rows is None else rows.reset_index(drop=True)
+        self._index()
+
+    @classmethod
+    def load(cls, path: Path = GEOCODE_CACHE):
+        return cls(pd.read_parquet(path) if Path(path).exists() else None)
+
+    def _index(self):
+        blocks = [normalize_tokens(b) for b in self.rows["BLK_NO"]]
+        streets = [normalize_tokens(r) for r in self.rows["ROAD_NAME"]]
+        self.by_key = {}
+        for i, key in enumerate(zip(blocks, streets)):
+            self.by_key.setdefault(key, []).append(i)
+        self.by_block = {}
+        for block, street in self.by_key:
+            self.by_block.setdefault(block, set()).add(street)
+        self.by_postal = {}
+        for i, postal in enumerate(self.rows["POSTAL"].astype(str)):
+            self.by_postal.setdefault(postal, (blocks[i], streets[i]))
+
+    def resolve(self, search_val):
+        """(block, street) key for a search value and a 0-1 confidence."""
+        if is_postal(search_val):
+            key = self.by_postal.get(unquote(str(search_val)).strip())
+            return key, 1.0 if key else 0.0
+
+        tokens = normalize_tokens(search_val)
+        if len(tokens) < 2:
+            return None, 0.0
+        block, street = tokens[:1], tokens[1:]
+        if (block, street) in self.by_key:
+            return (block, street), 1.0
+
+        # Same block, closest known street by token overlap; ties are not trusted
+        scored = sorted(
+            ((len(set(street) & set(s)) / len(set(street) | set(s)), s) for s in self.by_block.get(block, ())),
+            reverse=True,
+        )
+        if not scored or (len(scored) > 1 and scored[0][0] == scored[1][0]):
+            return None, 0.0
+        confidence, best = scored[0]
+
+        # At most one word added or dropped, and not one that makes it another street
+        extra = set(street) ^ set(best)
+        if len(extra) > 1 or extra & QUALIFIERS or any(t.isdigit() for t in extra):
+            return None, 0.0
+        return (block, best), confidence
+
+    def geocode(self, addresses, min_confidence=MIN_CONFIDENCE):
+        """Result rows for confidently resolved addresses (like call_geocode) and the unresolved rest."""
+        positions, searches, remaining = [], [], []
+        for a in addresses:
+            key, confidence = self.resolve(a)
+            if key is not None and confidence >= min_confidence:
+                idx = self.by_key[key]
+                positions.extend(idx)
+                searches.extend([a] * len(idx))
+            else:
+                remaining.append(a)
+
+        found = self.rows.iloc[positions].reset_index(drop=True)
+        found["search_input"] = searches
+        return found, remaining
+
+    def add(self, results: pd.DataFrame):
+        """Keep new OneMap result rows (misses carry no coordinates and are skipped)."""
+        if "LATITUDE" not in results:
+            return
+        new = results.loc[results["LATITUDE"].notna(), [c for c in RESULT_COLUMNS if c in results]]
+        rows = pd.concat([self.rows, new.astype(str).where(new.notna())], ignore_index=True)
+        self.rows = rows.drop_duplicates().reset_index(drop=True)
+        self._index()
+
+    def save(self, path: Path = GEOCODE_CACHE):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".partial")
+        self.rows.to_parquet(partial, index=False)
+        os.replace(partial, path)
+
+
+if __name__ == "__main__":
+    geocoder = LocalGeocoder.load()
+    for arg in sys.argv[1:]:
+        geocoder.add(pd.read_csv(arg, dtype=str))
+    geocoder.save()
+    print(f"✔ Local geocoder: {len(geocoder.rows):,} result rows in {GEOCODE_CACHE}")
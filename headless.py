@@ -0,0 +1,55 @@
+"""
+Headless dashboard sessions (2026)
+
+Renders app.py outputs without a browser or a running server, for the build
+tools (static_outputs.py, browser_bundle.py) and the benchmarks:
+1. new_session() is a Shiny stub session with a set of inputs
+2. stub_session() also runs app.server() in it, registering every output
+3. call_renderer() runs one output's renderer in that session, outside any
+   reactive flush, and returns its value
+
+The stub session does not run effects, so only outputs and the calcs they
+read are exercised.
+"""
+
+# =====================================================
+# Configuration
+# =====================================================
+# A fixed set of Latest Trends inputs; callers override the ones they vary
+BASE_INPUTS = {
+    "Period1": "Quarterly",
+    "Flattype1": "All",
+    "select_flat_type": ("4 ROOM", "5 ROOM", "EXECUTIVE/MG"),
+    "select_PSF": "PSF",
+    "select_town": ("BISHAN", "BUKIT MERAH", "QUEENSTOWN", "TOA PAYOH", "KALLANG/WHAMPOA"),
+    "select_PSF_town": "PSF",
+}
+
+
+# =====================================================
+# Sessions
+# =====================================================
+def new_session(inputs):
+    from shiny.express._stub_session import ExpressStubSession
+
+    session = ExpressStubSession()
+    for name, value in inputs.items():
+        session.input[name]._set(value)
+    return session
+
+
+def stub_session(app_module, inputs):
+    from shiny.session import session_context
+
+    session = new_session(inputs)
+    with session_context(session):
+        app_module.server(session.input, session.output, session)
+    return session
+
+
+async def call_renderer(session, renderer):
+    from shiny import reactive
+    from shiny.session import session_context
+
+    with session_context(session), reactive.isolate():
+        return await renderer.fn()
@@ -0,0 +1,213 @@
+"""
+Render instrumentation for the dashboard.
+
+Wraps render functions and reactive calcs to record, per output:
+1. Execution time (Prometheus histogram)
+2. Rows in the result (table rows or plotted points)
+3. Serialized payload size sent to the browser, measured on a sample of
+   renders (the first and then every HDB_PAYLOAD_SAMPLE-th per output), as
+   it costs a second serialization
+4. Errors
+
+Metrics are served in Prometheus text format at /metrics (local clients only).
+Set HDB_SLOW_RENDER_MS to print every render slower than that threshold
+together with the input values it ran with; set HDB_METRICS=0 to turn the
+wrappers off entirely.
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from functools import wraps
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+from shiny import reactive
+from shiny.types import SilentException, SilentCancelOutputException
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+
+# =====================================================
+# Configuration
+# =====================================================
+METRICS_ENABLED = os.getenv("HDB_METRICS", "1") != "0"
+SLOW_RENDER_MS = float(os.getenv("HDB_SLOW_RENDER_MS", "0"))  # 0 disables the slow-render log
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LOCAL_CLIENTS = {"127.0.0.1", "::1", "localhost"}
+PAYLOAD_SAMPLE = int(os.getenv("HDB_PAYLOAD_SAMPLE", "20"))  # size 1 in N renders per output; 0 never
+
+
+# =====================================================
+# Result inspection
+# =====================================================
+def result_rows(value):
+    if isinstance(value, pd.DataFrame):
+        return len(value)
+    if isinstance(value, tuple):
+        return next((len(v) for v in value if isinstance(v, pd.DataFrame)), None)
+    if hasattr(value, "data") and isinstance(getattr(value, "data"), pd.DataFrame):  # render.DataTable
+        return len(value.data)
+    if hasattr(value, "to_plotly_json"):  # plotly figure
+        return sum(len(t.x) for t in value.data if getattr(t, "x", None) is not None)
+    return None
+
+
+def payload_bytes(value):
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, pd.DataFrame):
+        return len(value.to_json(orient="split").encode())
+    if hasattr(value, "to_payload"):  # render.DataTable
+        return len(json.dumps(value.to_payload(), default=str).encode())
+    if hasattr(value, "to_plotly_json"):  # plotly figure
+        return len(value.to_json().encode())
+    return None
+
+
+# =====================================================
+# Registry
+# =====================================================
+class RenderMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, seconds, rows=None, payload=None, error=False):
+        with self._lock:
+            s = self._stats.setdefault(name, {
+                "count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS),
+                "errors": 0, "payload_total": 0, "payload_samples": 0, "payload_last": None, "rows_last": None,
+            })
+            s["count"] += 1
+            s["sum"] += seconds
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le:
+                    s["buckets"][i] += 1
+            s["errors"] += int(error)
+            if payload is not None:
+                s["payload_total"] += payload
+                s["payload_samples"] += 1
+                s["payload_last"] = payload
+            if rows is not None:
+                s["rows_last"] = rows
+
+    def sample_payload(self, name) -> bool:
+        if not PAYLOAD_SAMPLE:
+            return False
+        with self._lock:
+            s = self._stats.get(name)
+            return s is None or s["count"] % PAYLOAD_SAMPLE == 0
+
+    def decorator(self, input, input_ids=()):
+        """Build the per-session decorator: `@render_widget` / `@timed` / `def Chart_1()`."""
+
+        def read_inputs():
+            values = {}
+            with reactive.isolate():
+                for input_id in input_ids:
+                    try:
+                        value = input[input_id]()
+                    except Exception:
+                        continue
+                    values[input_id] = list(value) if isinstance(value, tuple) else value
+            return values
+
+        def timed(fn):
+            if not METRICS_ENABLED:
+                return fn
+
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    value = fn(*args, **kwargs)
+                except (SilentException, SilentCancelOutputException):
+                    # req() and friends: nothing rendered, nothing failed
+                    raise
+                except Exception:
+                    self.record(fn.__name__, time.perf_counter() - start, error=True)
+                    raise
+                seconds = time.perf_counter() - start
+
+                # Serializing again only to count bytes doubles a render's cost,
+                # so only sampled renders (and logged slow ones) pay it
+                slow = SLOW_RENDER_MS and seconds * 1000 >= SLOW_RENDER_MS
+                rows = result_rows(value)
+                payload = payload_bytes(value) if slow or self.sample_payload(fn.__name__) else None
+                self.record(fn.__name__, seconds, rows, payload)
+                if slow:
+                    print(
+                        f"🐢 Slow render {fn.__name__}: {seconds * 1000:.0f} ms, "
+                        f"rows={rows}, payload={payload} B, inputs={json.dumps(read_inputs(), default=str)}"
+                    )
+                return value
+
+            return wrapper
+
+        return timed
+
+    # =====================================================
+    # Prometheus text format
+    # =====================================================
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stats = {name: dict(s, buckets=list(s["buckets"])) for name, s in sorted(self._stats.items())}
+
+        lines = [
+            "# HELP hdb_render_seconds Time spent in a dashboard render function or reactive calc.",
+            "# TYPE hdb_render_seconds histogram",
+        ]
+        for name, s in stats.items():
+            for le, n in zip(BUCKETS, s["buckets"]):
+                lines.append(f'hdb_render_seconds_bucket{{name="{name}",le="{le}"}} {n}')
+            lines.append(f'hdb_render_seconds_bucket{{name="{name}",le="+Inf"}} {s["count"]}')
+            lines.append(f'hdb_render_seconds_sum{{name="{name}"}} {s["sum"]:.6f}')
+            lines.append(f'hdb_render_seconds_count{{name="{name}"}} {s["count"]}')
+
+        lines += [
+            "# HELP hdb_render_errors_total Renders that raised an exception.",
+            "# TYPE hdb_render_errors_total counter",
+        ]
+        lines += [f'hdb_render_errors_total{{name="{name}"}} {s["errors"]}' for name, s in stats.items()]
+
+        lines += [
+            "# HELP hdb_render_payload_bytes_total Serialized bytes produced for the browser, over sampled renders.",
+            "# TYPE hdb_render_payload_bytes_total counter",
+        ]
+        lines += [f'hdb_render_payload_bytes_total{{name="{name}"}} {s["payload_total"]}' for name, s in stats.items()]
+
+        lines += [
+            "# HELP hdb_render_payload_samples_total Renders whose payload was measured.",
+            "# TYPE hdb_render_payload_samples_total counter",
+        ]
+        lines += [f'hdb_render_payload_samples_total{{name="{name}"}} {s["payload_samples"]}' for name, s in stats.items()]
+
+        lines += [
+            "# HELP hdb_render_payload_bytes Serialized bytes of the latest sampled render.",
+            "# TYPE hdb_render_payload_bytes gauge",
+        ]
+        lines += [
+            f'hdb_render_payload_bytes{{name="{name}"}} {s["payload_last"]}'
+            for name, s in stats.items() if s["payload_last"] is not None
+        ]
+
+        lines += [
+            "# HELP hdb_render_rows Rows (table rows or plotted points) in the latest render.",
+            "# TYPE hdb_render_rows gauge",
+        ]
+        lines += [
+            f'hdb_render_rows{{name="{name}"}} {s["rows_last"]}'
+            for name, s in stats.items() if s["rows_last"] is not None
+        ]
+        return "\n".join(lines) + "\n"
+
+    def route(self, path="/metrics") -> Route:
+        async def endpoint(request):
+            if request.client is None or request.client.host not in LOCAL_CLIENTS:
+                return PlainTextResponse("Not Found", status_code=404)
+            return PlainTextResponse(self.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+        return Route(path, endpoint, methods=["GET"])
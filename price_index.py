@@ -0,0 +1,265 @@
+"""
+Repeat-sales price index (2026)
+
+A Bailey-Muth-Nourse repeat-sales index, kept up to date as new months
+arrive:
+1. A unit is (ADDRESS, Storey_Range, Floor_Area_Sqm); each sale pairs
+   with the unit's previous sale in an earlier quarter
+2. Pairs are kept as sufficient statistics: the number of pairs and the
+   sum of log(price2 / price1) per (Town, Flat_Type, quarter1, quarter2).
+   They add up, so any Town / Flat_Type view is a sum of cells
+3. A view is solved as a sparse least-squares problem in the quarterly
+   log levels, with a light smoothing penalty for quarters without pairs,
+   and scaled to 100 in the base quarter: the first quarter with pairs in
+   any view, so every view shares it (HDB's own 1Q2009 base predates the
+   data). A view whose pairs start later is carried flat back to it
+4. The statistics and each unit's latest sale are saved under
+   HDB_PRICE_INDEX_DIR (data/price_index next to this file by default;
+   a failed save is logged and the index kept in memory). A new
+   pipeline output only folds in the months
+   after the saved ones; the latest month, which later runs still add
+   registrations to, is applied on top and never saved
+5. If the saved months no longer match the data (e.g. a revised history),
+   the index is rebuilt from scratch
+
+Build or update it for an existing CSV with:  python price_index.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from pathlib import Path
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import spsolve
+
+# =====================================================
+# Configuration
+# =====================================================
+ROOT = Path(__file__).resolve().parent
+PRICE_INDEX_DIR = Path(os.getenv("HDB_PRICE_INDEX_DIR", ROOT / "data" / "price_index"))
+PRICE_INDEX_COLUMNS = ["ADDRESS", "Storey_Range", "Floor_Area_Sqm", "Town", "Flat_Type", "date", "Resale_Price"]
+UNIT_KEYS = ["ADDRESS", "Storey_Range", "Floor_Area_Sqm"]
+CELL_KEYS = ["Town", "Flat_Type"]
+SMOOTHING = 1.0  # weight of (level_t - level_t-1)^2, in pairs; only matters where pairs are scarce
+STATE_FORMAT = 1
+
+
+def quarter_number(dates) -> np.ndarray:
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year * 4 + (dates.month - 1) // 3).to_numpy(np.int32)
+
+
+def quarter_start(numbers) -> pd.DatetimeIndex:
+    numbers = np.asarray(numbers)
+    return pd.DatetimeIndex(pd.to_datetime({"year": numbers // 4, "month": numbers % 4 * 3 + 1, "day": 1}))
+
+
+# =====================================================
+# Model
+# =====================================================
+class RepeatSalesIndex:
+    def __init__(self, stats=None, last=None, through=None, rows=0):
+        # stats: Town, Flat_Type, Q1, Q2, N, Y (sum of log price ratios)
+        # last:  each unit's latest sale (UNIT_KEYS, Town, Flat_Type, date, Quarter, Log_Price)
+        self.stats = stats if stats is not None else pd.DataFrame(
+            {"Town": [], "Flat_Type": [], "Q1": np.array([], np.int32), "Q2": np.array([], np.int32), "N": [], "Y": []}
+        )
+        self.last = last
+        self.through = through  # sales before this date are folded in
+        self.rows = rows
+
+    def copy(self):
+        return RepeatSalesIndex(self.stats.copy(), self.last, self.through, self.rows)
+
+    @property
+    def base_quarter(self):
+        # The quarter every view is 100 in; None before any pairs
+        return int(self.stats["Q1"].min()) if len(self.stats) else None
+
+    @property
+    def base_label(self):
+        if self.base_quarter is None:
+            return None
+        base = quarter_start([self.base_quarter])[0]
+        return f"{base.quarter}Q{base.year}"
+
+    # =====================================================
+    # Incremental update
+    # =====================================================
+    def update(self, sales: pd.DataFrame) -> int:
+        """Fold in sales later than every sale seen so far; returns the new pairs."""
+        new = sales[PRICE_INDEX_COLUMNS].assign(
+            Quarter=quarter_number(sales["date"]),
+            Log_Price=np.log(sales["Resale_Price"].to_numpy(float)),
+            _new=True,
+        )
+        frames = [new] if self.last is None else [self.last.assign(_new=False), new]
+        combined = pd.concat(frames, ignore_index=True)
+
+        # 1. Each unit's sales in order; saved latest sales come first
+        combined = combined.sort_values([*UNIT_KEYS, "date", "_new"], kind="stable").reset_index(drop=True)
+        same_unit = combined.duplicated(UNIT_KEYS)
+        prev = combined.shift()
+
+        # 2. Pairs: a new sale and the unit's previous sale, in different quarters
+        pair = same_unit & combined["_new"] & (prev["Quarter"] != combined["Quarter"])
+        pairs = pd.DataFrame({
+            "Town": combined.loc[pair, "Town"],
+            "Flat_Type": combined.loc[pair, "Flat_Type"],
+            "Q1": prev.loc[pair, "Quarter"].astype(np.int32),
+            "Q2": combined.loc[pair, "Quarter"],
+            "Y": combined.loc[pair, "Log_Price"] - prev.loc[pair, "Log_Price"],
+        })
+        added = pairs.groupby([*CELL_KEYS, "Q1", "Q2"], observed=True).agg(N=("Y", "size"), Y=("Y", "sum")).reset_index()
+        self.stats = (
+            pd.concat([self.stats, added.astype({col: object for col in CELL_KEYS})], ignore_index=True)
+            .groupby([*CELL_KEYS, "Q1", "Q2"]).sum().reset_index()
+        )
+
+        # 3. Latest sale per unit for the next update
+        self.last = combined.drop_duplicates(UNIT_KEYS, keep="last").drop(columns="_new").reset_index(drop=True)
+        self.rows += len(sales)
+        return len(pairs)
+
+    # =====================================================
+    # Solve a view
+    # =====================================================
+    def series(self, town=None, flat_type=None) -> pd.DataFrame:
+        """Quarterly index (100 in the base quarter) for one Town / Flat_Type view; None or "All" keeps every value."""
+        stats = self.stats
+        if town not in (None, "All"):
+            stats = stats[stats["Town"] == town]
+        if flat_type not in (None, "All"):
+            stats = stats[stats["Flat_Type"] == flat_type]
+        stats = stats.groupby(["Q1", "Q2"])[["N", "Y"]].sum().reset_index()
+        if stats.empty:
+            return pd.DataFrame(columns=["Period_sort", "Period", "Index", "Pairs"])
+
+        first = self.base_quarter
+        n = int(stats["Q2"].max()) - first + 1
+        i, j = (stats["Q1"] - first).to_numpy(), (stats["Q2"] - first).to_numpy()
+        weight, y = stats["N"].to_numpy(float), stats["Y"].to_numpy(float)
+
+        # Normal equations of log(p2 / p1) = level[q2] - level[q1], plus smoothing
+        a = sparse.coo_matrix(
+            (np.r_[weight, weight, -weight, -weight], (np.r_[i, j, i, j], np.r_[i, j, j, i])), shape=(n, n)
+        ).tocsc()
+        diff = sparse.diags([-np.ones(n - 1), np.ones(n - 1)], [0, 1], shape=(n - 1, n))
+        a = a + SMOOTHING * (diff.T @ diff)
+        b = np.bincount(j, y, n) - np.bincount(i, y, n)
+
+        # The base quarter (the first) has its level fixed at 0
+        keep = np.arange(1, n)
+        level = np.zeros(n)
+        if len(keep):
+            level[keep] = spsolve(a[keep][:, keep], b[keep])
+
+        quarters = first + np.arange(n)
+        sort = quarter_start(quarters)
+        return pd.DataFrame({
+            "Period_sort": sort,
+            "Period": [f"{d.quarter}Q{d.year % 100:02d}" for d in sort],
+            "Index": 100 * np.exp(level),
+            "Pairs": (np.bincount(j, weight, n) + np.bincount(i, weight, n)).astype(int),
+        })
+
+    # =====================================================
+    # Persistence
+    # =====================================================
+    def save(self, root: Path = PRICE_INDEX_DIR) -> bool:
+        # Written into a scratch folder of this process's own and renamed, so
+        # the tables and state always match, even with several workers saving.
+        # The saved index only spares a rebuild: if it cannot be written, the
+        # caller keeps the one in memory
+        root = Path(root)
+        tmp = old = None
+        try:
+            root.parent.mkdir(parents=True, exist_ok=True)
+            tmp = Path(tempfile.mkdtemp(prefix=root.name + ".", suffix=".partial", dir=root.parent))
+            self.stats.to_parquet(tmp / "stats.parquet", index=False)
+            self.last.to_parquet(tmp / "last.parquet", index=False)
+            state = {"format": STATE_FORMAT, "through": self.through.strftime("%Y-%m-%d"), "rows": self.rows}
+            (tmp / "state.json").write_text(json.dumps(state))
+
+            # The saved folder is moved aside first (a folder cannot be renamed
+            # over a full one); a worker that loses the race keeps the winner's
+            old = tmp.with_suffix(".old")
+            try:
+                root.rename(old)
+            except FileNotFoundError:
+                old = None
+            tmp.rename(root)
+            return True
+        except OSError as e:
+            print(f"❌ Price index not saved to {root}: {e}")
+            return False
+        finally:
+            for leftover in (tmp, old):
+                if leftover is not None:
+                    shutil.rmtree(leftover, ignore_errors=True)
+
+    @classmethod
+    def load(cls, root: Path = PRICE_INDEX_DIR):
+        root = Path(root)
+        try:
+            state = json.loads((root / "state.json").read_text())
+            if state.get("format") != STATE_FORMAT:
+                return None
+            return cls(
+                pd.read_parquet(root / "stats.parquet"), pd.read_parquet(root / "last.parquet"),
+                pd.Timestamp(state["through"]), state["rows"],
+            )
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def maintained_index(df: pd.DataFrame, root: Path = PRICE_INDEX_DIR) -> RepeatSalesIndex:
+    """The saved index brought up to date with `df`, plus its latest (still filling) month."""
+    latest_month = df["date"].max().to_period("M").start_time
+    dates = df["date"]
+
+    # 1. Reuse the saved state if its months still hold the same sales
+    index = RepeatSalesIndex.load(root)
+    if index is not None and int((dates < index.through).sum()) != index.rows:
+        print("❌ Saved price index no longer matches the data; rebuilding")
+        index = None
+    start = time.perf_counter()
+    if index is None:
+        index = RepeatSalesIndex(through=pd.Timestamp.min)
+
+    # 2. Fold in the complete months after it and save
+    new = df[(dates >= index.through) & (dates < latest_month)]
+    if len(new) or index.through != latest_month:
+        pairs = index.update(new) if len(new) else 0
+        index.through = latest_month
+        index.save(root)
+        print(f"✔ Price index: {len(new):,} sales folded in ({pairs:,} pairs) in {time.perf_counter() - start:.1f}s")
+
+    # 3. The latest month goes on a copy
+    current = index.copy()
+    current.update(df[dates >= latest_month])
+    return current
+
+
+if __name__ == "__main__":
+    from bundle import load_bundle_frame, prepare_transactions, read_transactions
+
+    for arg in sys.argv[1:]:
+        frame = load_bundle_frame(arg)
+        if frame is None:
+            frame = prepare_transactions(read_transactions(arg))
+        start = time.perf_counter()
+        index = maintained_index(frame[PRICE_INDEX_COLUMNS])
+        print(f"⏱ Loaded and updated in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        print(index.series().tail(8).to_string(index=False))
+        print(f"⏱ All-market view solved in {(time.perf_counter() - start) * 1000:.1f} ms")
@@ -0,0 +1,384 @@
+"""
+Dashboard query backends (2026)
+
+The dashboard asks every chart and table question through one of these:
+1. PandasBackend (default) answers from the in-memory transactions frame
+2. DuckDBBackend answers with SQL against the bundle's transactions.parquet
+   in an embedded DuckDB; date and price filters are pushed down to the
+   Parquet scan (row groups are sorted by date) and queries run on
+   HDB_DUCKDB_THREADS threads, so the full history never sits in memory
+
+Both return the same frames for the same call:
+- aggregate(by, aggs, ...)  grouped named aggregations, keys as the index
+- rows(columns, ...)        matching rows (with Period / Period_sort)
+- top_k(by, order_by, k, ...)  the k highest rows per group, ranked
+Rows are filtered by `since` (date >= since, see window_start), `after`
+(date > after), `min_price`, `flat_type` ("All" keeps every type) and
+`named_only` (drops BUILDING == "NIL").
+
+Pick the backend with HDB_QUERY_BACKEND=pandas|duckdb. The Shinylive build
+uses a third, BundledBackend, which replays answers recorded ahead of time
+(see browser_bundle.py).
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from collections import OrderedDict
+from pathlib import Path
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bundle import bundle_path_for, period_columns, read_manifest
+
+# =====================================================
+# Configuration
+# =====================================================
+QUERY_BACKEND = os.getenv("HDB_QUERY_BACKEND", "pandas")
+DUCKDB_THREADS = int(os.getenv("HDB_DUCKDB_THREADS", os.cpu_count() or 1))
+AGGREGATIONS = ("size", "max", "median", "first")
+SELECTION_CACHE = 16  # filtered frames kept per pandas snapshot; charts and tables share windows
+SELECTION_CACHE_SHARE = 0.25  # only frames up to this share of the rows are kept
+
+
+def window_start(latest, period, n):
+    """First date of the last `n` periods ending at `latest` (the dashboard's period window)."""
+    if period == "Monthly":
+        return latest - pd.DateOffset(months=n - 1)
+    if period == "Quarterly":
+        return latest - pd.DateOffset(months=3 * (n - 1))
+    return latest - pd.DateOffset(years=n - 1)
+
+
+# =====================================================
+# pandas
+# =====================================================
+def plain_values(df: pd.DataFrame) -> pd.DataFrame:
+    # Answers carry plain values, as DuckDB's do; categoricals stay inside the frame
+    cats = {col: object for col, dtype in df.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+    if cats:
+        df = df.astype(cats)
+    index = df.index
+    if isinstance(index, pd.MultiIndex):
+        index = index.remove_unused_levels()
+        levels = [lvl.astype(object) if isinstance(lvl, pd.CategoricalIndex) else lvl for lvl in index.levels]
+        return df.set_axis(index.set_levels(levels), axis=0)
+    if isinstance(index, pd.CategoricalIndex):
+        return df.set_axis(index.astype(object), axis=0)
+    return df
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        return self.df if columns is None else self.df[list(columns)]
+
+    def towns(self) -> list:
+        return self.df["Town"].unique().tolist()
+
+    def latest_date(self, **filters):
+        return self._select(**filters)["date"].max()
+
+    def _select(self, **filters):
+        # Every table of a page filters the same way; reuse the frame (read-only)
+        key = tuple(sorted(filters.items()))
+        with self._lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+        df = self._filter(**filters)
+        if len(df) > len(self.df) * SELECTION_CACHE_SHARE:
+            return df  # wide windows (e.g. 8 years of all resale) would pin a second copy of the data
+        with self._lock:
+            self._selections[key] = df
+            while len(self._selections) > SELECTION_CACHE:
+                self._selections.popitem(last=False)
+        return df
+
+    def _filter(self, period=None, since=None, after=None, min_price=None, flat_type=None, named_only=False):
+        df = self.df
+        masks = []
+        if since is not None:
+            masks.append(df["date"] >= since)
+        if after is not None:
+            masks.append(df["date"] > after)
+        if min_price is not None:
+            masks.append(df["Resale_Price"] >= min_price)
+        if flat_type not in (None, "All"):
+            masks.append(df["Flat_Type"] == flat_type)
+        if named_only:
+            masks.append(df["BUILDING"] != "NIL")
+        if masks:
+            df = df[pd.concat(masks, axis=1).all(axis=1)]
+        if period is not None:
+            # Shallow copy: the period columns are added without copying the rest
+            df = df.copy(deep=False)
+            df[["Period_sort", "Period"]] = period_columns(df["date"], period)
+        return df
+
+    def aggregate(self, by, aggs, **filters) -> pd.DataFrame:
+        return plain_values(self._select(**filters).groupby(list(by), observed=True).agg(**aggs))
+
+    def rows(self, columns, **filters) -> pd.DataFrame:
+        keys = ["Period_sort", "Period"] if filters.get("period") else []
+        return plain_values(self._select(**filters)[keys + list(columns)].reset_index(drop=True))
+
+    def top_k(self, by, order_by, k, columns, **filters) -> pd.DataFrame:
+        df = self._select(**filters)
+        df = df.sort_values(list(by) + [order_by], ascending=[True] * len(by) + [False])
+        df = df[list(columns)].assign(Rank=df.groupby(list(by), observed=True).cumcount() + 1)
+        return plain_values(df[df["Rank"] <= k].reset_index(drop=True))
+
+
+# =====================================================
+# DuckDB
+# =====================================================
+PERIOD_SQL = {
+    # (Period_sort, Period) with the same labels as bundle.period_columns
+    "Monthly": ("date", "strftime(date, '%b%y')"),
+    "Quarterly": (
+        "date_trunc('quarter', date)",
+        "CAST(quarter(date) AS VARCHAR) || 'Q' || CAST(year(date) % 100 AS VARCHAR)",
+    ),
+    "Yearly": ("date_trunc('year', date)", "CAST(year(date) AS VARCHAR)"),
+}
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def aggregate_sql(column, func):
+    if func not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {func}")
+    col = quote(column)
+    if func == "size":
+        return "count(*)"
+    if func == "first":
+        # pandas' first(): the earliest non-null value in row order
+        return f"first({col} ORDER BY _row) FILTER (WHERE {col} IS NOT NULL)"
+    return f"{func}({col})"
+
+
+class DuckDBBackend:
+    name = "duckdb"
+
+    def __init__(self, parquet_path, threads=DUCKDB_THREADS):
+        import duckdb
+
+        self.path = str(parquet_path)
+        self.con = duckdb.connect()
+        self.con.execute(f"SET threads TO {int(threads)}")
+        self.con.execute(f"CREATE VIEW transactions AS SELECT * FROM read_parquet('{self.path.replace(chr(39), chr(39) * 2)}')")
+
+    def _query(self, sql, params=()) -> pd.DataFrame:
+        # One cursor per query; sessions and the snapshot watcher may query concurrently
+        cursor = self.con.cursor()
+        try:
+            df = cursor.execute(sql, list(params)).df()
+        finally:
+            cursor.close()
+        for col in ("date", "Period_sort"):
+            if col in df:
+                df[col] = df[col].astype("datetime64[ns]")
+        return df
+
+    def _where(self, since=None, after=None, min_price=None, flat_type=None, named_only=False):
+        clauses, params = [], []
+        # Plain column comparisons, so DuckDB prunes Parquet row groups by their min/max
+        if since is not None:
+            clauses.append("date >= ?")
+            params.append(pd.Timestamp(since).to_pydatetime() if pd.notna(since) else None)
+        if after is not None:
+            clauses.append("date > ?")
+            params.append(pd.Timestamp(after).to_pydatetime() if pd.notna(after) else None)
+        if min_price is not None:
+            clauses.append("Resale_Price >= ?")
+            params.append(float(min_price))
+        if flat_type not in (None, "All"):
+            clauses.append("Flat_Type = ?")
+            params.append(flat_type)
+        if named_only:
+            clauses.append("BUILDING IS DISTINCT FROM 'NIL'")
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def _source(self, period=None, **filters):
+        where, params = self._where(**filters)
+        extra = ""
+        if period is not None:
+            sort, label = PERIOD_SQL[period]
+            extra = f", {sort} AS Period_sort, {label} AS Period"
+        return f"(SELECT *{extra} FROM transactions {where})", params
+
+    def frame(self, columns=None) -> pd.DataFrame:
+        cols = "*" if columns is None else ", ".join(quote(c) for c in columns)
+        return self._query(f"SELECT {cols} FROM transactions ORDER BY _row")
+
+    def towns(self) -> list:
+        return self._query("SELECT Town FROM transactions GROUP BY Town ORDER BY min(_row)")["Town"].tolist()
+
+    def latest_date(self, **filters):
+        where, params = self._where(**filters)
+        return self._query(f"SELECT max(date) AS date FROM transactions {where}", params)["date"].iloc[0]
+
+    def aggregate(self, by, aggs, **filters) -> pd.DataFrame:
+        source, params = self._source(**filters)
+        keys = ", ".join(quote(c) for c in by)
+        values = ", ".join(f"{aggregate_sql(col, func)} AS {quote(name)}" for name, (col, func) in aggs.items())
+        # groupby() drops missing keys and sorts by them
+        not_null = " AND ".join(f"{quote(c)} IS NOT NULL" for c in by)
+        df = self._query(
+            f"SELECT {keys}, {values} FROM {source} WHERE {not_null} GROUP BY ALL ORDER BY {keys}", params
+        )
+        return df.set_index(list(by))
+
+    def rows(self, columns, **filters) -> pd.DataFrame:
+        source, params = self._source(**filters)
+        keys = ["Period_sort", "Period"] if filters.get("period") else []
+        cols = ", ".join(quote(c) for c in keys + list(columns))
+        return self._query(f"SELECT {cols} FROM {source} ORDER BY _row", params)
+
+    def top_k(self, by, order_by, k, columns, **filters) -> pd.DataFrame:
+        source, params = self._source(**filters)
+        keys = ", ".join(quote(c) for c in by)
+        order = f"{keys}, {quote(order_by)} DESC NULLS LAST, _row"
+        cols = ", ".join(quote(c) for c in columns)
+        return self._query(
+            f"SELECT {cols}, Rank FROM ("
+            f"SELECT *, row_number() OVER (PARTITION BY {keys} ORDER BY {quote(order_by)} DESC NULLS LAST, _row) AS Rank"
+            f" FROM {source}) WHERE Rank <= ? ORDER BY {order}",
+            [*params, int(k)],
+        )
+
+
+# =====================================================
+# Precomputed (browser build)
+# =====================================================
+def call_key(method, *args, **filters) -> str:
+    """One string per backend call: arguments in order, filters by name, dates as ISO text."""
+    def plain(value):
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+        if isinstance(value, np.generic):
+            return value.item()
+        raise TypeError(f"Cannot key a {type(value).__name__}")
+    return json.dumps([method, args, filters], default=plain, sort_keys=True)
+
+
+def pack_result(value, arrays: dict, prefix: str) -> dict:
+    """Manifest entry for one answer; its columns go into `arrays` under `prefix`."""
+    if isinstance(value, list):
+        return {"kind": "list", "value": value}
+    if not isinstance(value, pd.DataFrame):
+        return {"kind": "timestamp", "value": None if pd.isna(value) else pd.Timestamp(value).isoformat()}
+
+    index = [] if isinstance(value.index, pd.RangeIndex) else list(value.index.names)
+    frame = value.reset_index() if index else value
+    columns = []
+    for i, name in enumerate(frame.columns):
+        col, key = frame[name], f"{prefix}_{i}"
+        entry = {"name": name, "array": key, "dtype": str(col.dtype)}
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            arrays[key] = col.cat.codes.to_numpy()
+            entry["categories"] = col.cat.categories.tolist()
+            entry["ordered"] = bool(col.cat.ordered)
+        elif col.dtype == object:
+            # Strings as codes into a list of distinct values (-1 for missing)
+            codes, uniques = pd.factorize(col)
+            arrays[key] = codes.astype(np.int32)
+            entry["categories"] = uniques.tolist()
+        elif pd.api.types.is_datetime64_dtype(col.dtype):
+            arrays[key] = col.to_numpy("datetime64[ns]").view(np.int64)
+        elif col.dtype.kind == "f" and col.notna().all() and (col % 1 == 0).all() and col.abs().max() < 2**31:
+            arrays[key] = col.to_numpy(np.int32)  # whole prices and counts compress far better as integers
+        else:
+            arrays[key] = col.to_numpy()
+        columns.append(entry)
+    return {"kind": "frame", "index": index, "columns": columns}
+
+
+def unpack_result(entry: dict, arrays):
+    if entry["kind"] == "list":
+        return list(entry["value"])
+    if entry["kind"] == "timestamp":
+        return pd.NaT if entry["value"] is None else pd.Timestamp(entry["value"])
+
+    data = {}
+    for col in entry["columns"]:
+        values = arrays[col["array"]]
+        if "ordered" in col:
+            data[col["name"]] = pd.Categorical.from_codes(values, col["categories"], ordered=col["ordered"])
+        elif "categories" in col:
+            lookup = np.array([*col["categories"], np.nan], dtype=object)
+            data[col["name"]] = lookup[values]
+        elif col["dtype"].startswith("datetime64"):
+            data[col["name"]] = values.view("datetime64[ns]")
+        else:
+            data[col["name"]] = values.astype(col["dtype"], copy=False)
+    frame = pd.DataFrame(data)
+    return frame.set_index(entry["index"]) if entry["index"] else frame
+
+
+class BundledBackend:
+    """Answers recorded by browser_bundle.py; a call that was not recorded raises LookupError."""
+
+    name = "browser"
+
+    def __init__(self, path):
+        path = Path(path)
+        manifest = json.loads((path / "manifest.json").read_text())
+        self.entries = manifest["results"]
+        self.arrays = np.load(path / "results.npz")  # read lazily, one array at a time
+        self._decoded = {}
+
+    def _answer(self, method, *args, **filters):
+        key = call_key(method, *args, **filters)
+        if key not in self._decoded:
+            if key not in self.entries:
+                raise LookupError(f"Not in the browser bundle: {key}")
+            self._decoded[key] = unpack_result(self.entries[key], self.arrays)
+        value = self._decoded[key]
+        # Callers may add columns to the frames they get, as with the other backends
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+
+    def frame(self, columns=None):
+        # Never recorded: the bundle holds query answers, not transactions
+        raise LookupError(f"Not in the browser bundle: frame {columns!r}")
+
+    def towns(self) -> list:
+        return self._answer("towns")
+
+    def latest_date(self, **filters):
+        return self._answer("latest_date", **filters)
+
+    def aggregate(self, by, aggs, **filters) -> pd.DataFrame:
+        return self._answer("aggregate", by, aggs, **filters)
+
+    def rows(self, columns, **filters) -> pd.DataFrame:
+        return self._answer("rows", columns, **filters)
+
+    def top_k(self, by, order_by, k, columns, **filters) -> pd.DataFrame:
+        return self._answer("top_k", by, order_by, k, columns, **filters)
+
+
+# =====================================================
+# Selection
+# =====================================================
+def open_backend(csv_path, load_frame, backend=QUERY_BACKEND):
+    """The configured backend for one pipeline output; `load_frame` reads it for pandas."""
+    if backend == "duckdb":
+        manifest = read_manifest(csv_path)
+        if manifest is not None and manifest.get("parquet"):
+            return DuckDBBackend(bundle_path_for(csv_path) / manifest["parquet"])
+        print(f"❌ No Parquet bundle for {csv_path}; using pandas (run: python bundle.py {csv_path})")
+    return PandasBackend(load_frame(csv_path))
@@ -0,0 +1,201 @@
+"""
+Date-range index (2026)
+
+Tables 7 and 8 show fixed windows (the last 10 months / 8 quarters / 8
+years, and the last 12 months). This index answers any range of months
+instead, in constant time per entity however long the range:
+1. Sales are placed in a month grid per (entity, flat type), for HDB towns,
+   named projects (BUILDING) and flat types, with "All" flat types as well
+2. Counts, million-dollar counts and price / PSF sums are kept as prefix
+   sums over the months, so a range is one subtraction per entity
+3. Million-dollar maxima are kept as sparse tables (the maximum over every
+   power-of-two run of months), so a range is the larger of two lookups
+4. It is built once per snapshot, next to the other indexes
+
+Build one for an existing CSV and time range queries with:  python range_index.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bundle import MD_THRESHOLD
+
+# =====================================================
+# Configuration
+# =====================================================
+RANGE_COLUMNS = ["date", "Town", "BUILDING", "Flat_Type", "Resale_Price", "PSF"]
+DIMENSIONS = ("Town", "BUILDING", "Flat_Type")
+ALL = "All"
+
+
+def month_number(dates) -> np.ndarray:
+    dates = pd.DatetimeIndex(dates)
+    return (dates.year * 12 + dates.month - 1).to_numpy(np.int32)
+
+
+def month_start(number) -> pd.Timestamp:
+    return pd.Timestamp(year=int(number) // 12, month=int(number) % 12 + 1, day=1)
+
+
+# =====================================================
+# Building blocks
+# =====================================================
+def prefix_sums(rows, months, n_rows, n_months, weights=None) -> np.ndarray:
+    """(n_rows, n_months + 1) running totals; months a..b of row r is p[r, b + 1] - p[r, a]."""
+    totals = np.bincount(rows * n_months + months, weights, n_rows * n_months).reshape(n_rows, n_months)
+    out = np.zeros((n_rows, n_months + 1), np.int32 if weights is None else np.float64)
+    np.cumsum(totals, axis=1, out=out[:, 1:])
+    return out
+
+
+def sparse_max(rows, months, values, n_rows, n_months) -> list:
+    """levels[k][r, i] is the maximum of row r over months i .. i + 2**k - 1 (-inf where no sales)."""
+    cells = pd.Series(values).groupby(rows * n_months + months).max()
+    level = np.full(n_rows * n_months, -np.inf)
+    level[cells.index.to_numpy()] = cells.to_numpy()
+    levels = [level.reshape(n_rows, n_months)]
+    width = 1
+    while 2 * width <= n_months:
+        prev = levels[-1]
+        levels.append(np.maximum(prev[:, :-width], prev[:, width:]))
+        width *= 2
+    return levels
+
+
+def range_max(levels, rows, a, b) -> np.ndarray:
+    # Two overlapping power-of-two runs cover months a..b exactly
+    k = (b - a + 1).bit_length() - 1
+    top = levels[k]
+    return np.maximum(top[rows, a], top[rows, b - (1 << k) + 1])
+
+
+class Grid:
+    """Prefix sums (and, for million-dollar sales, sparse maxima) per (entity, flat type) row."""
+
+    def __init__(self, keys, months, price, psf, n_months, maxima=False):
+        # keys: entity code * (flat types + 1) + flat type code; one row per key with sales
+        self.keys, rows = np.unique(keys, return_inverse=True)
+        n = len(self.keys)
+        self.count = prefix_sums(rows, months, n, n_months)
+        self.price_sum = prefix_sums(rows, months, n, n_months, price)
+        self.psf_sum = prefix_sums(rows, months, n, n_months, psf)
+        if maxima:
+            self.max_price = sparse_max(rows, months, price, n, n_months)
+            self.max_psf = sparse_max(rows, months, psf, n, n_months)
+
+
+# =====================================================
+# Index
+# =====================================================
+class RangeIndex:
+    def __init__(self, df: pd.DataFrame):
+        # 1. Month of each sale, counted from the first month
+        months = month_number(df["date"])
+        self.first = int(months.min())
+        self.n_months = int(months.max()) - self.first + 1
+        months = months - self.first
+        price = df["Resale_Price"].to_numpy(float)
+        psf = df["PSF"].to_numpy(float)
+        flat_codes, self.flat_types = pd.factorize(df["Flat_Type"], sort=True)
+        all_code = len(self.flat_types)  # the "All" flat type
+        stride = all_code + 1
+
+        # 2. Each sale counts under its own flat type and under "All"
+        self.entities, self.grids = {}, {}
+        for dim in DIMENSIONS:
+            keep = df[dim].notna().to_numpy()
+            if dim == "BUILDING":
+                keep &= (df[dim] != "NIL").to_numpy()
+            codes, self.entities[dim] = pd.factorize(df[dim][keep], sort=True)
+            keys = np.r_[codes * stride + flat_codes[keep], codes * stride + all_code]
+            m, p, s = np.tile(months[keep], 2), np.tile(price[keep], 2), np.tile(psf[keep], 2)
+            md = p >= MD_THRESHOLD
+            self.grids[dim] = (
+                Grid(keys, m, p, s, self.n_months),
+                Grid(keys[md], m[md], p[md], s[md], self.n_months, maxima=True),
+            )
+
+    @property
+    def months(self) -> tuple:
+        """(first, last) month start covered."""
+        return month_start(self.first), month_start(self.first + self.n_months - 1)
+
+    def _flat_code(self, flat_type):
+        if flat_type in (None, ALL):
+            return len(self.flat_types)
+        found = self.flat_types.get_indexer([flat_type])[0]
+        return None if found < 0 else found
+
+    def query(self, by, start, end, flat_type=ALL) -> pd.DataFrame:
+        """
+        Sales per `by` entity in the months of `start` .. `end` (inclusive),
+        for one flat type: Count, MD_Count, MD_Share, Mean_Price, Mean_PSF,
+        MD_Max_Price and MD_Max_PSF. Entities without sales are left out.
+        """
+        columns = ["Count", "MD_Count", "MD_Share", "Mean_Price", "Mean_PSF", "MD_Max_Price", "MD_Max_PSF"]
+        a = max(int(month_number([start])[0]) - self.first, 0)
+        b = min(int(month_number([end])[0]) - self.first, self.n_months - 1)
+        code = self._flat_code(flat_type)
+        if a > b or code is None:
+            return pd.DataFrame(columns=columns, index=pd.Index([], name=by))
+
+        stride = len(self.flat_types) + 1
+        sales, md = self.grids[by]
+
+        # 1. Prefix-sum differences over the selected flat type's rows
+        rows = np.flatnonzero(sales.keys % stride == code)
+        count = sales.count[rows, b + 1] - sales.count[rows, a]
+        result = pd.DataFrame({
+            "Count": count,
+            "Mean_Price": (sales.price_sum[rows, b + 1] - sales.price_sum[rows, a]) / np.maximum(count, 1),
+            "Mean_PSF": (sales.psf_sum[rows, b + 1] - sales.psf_sum[rows, a]) / np.maximum(count, 1),
+        }, index=pd.Index(np.asarray(self.entities[by])[sales.keys[rows] // stride], name=by))
+
+        # 2. Million-dollar counts and maxima, for the entities that have any
+        md_rows = np.flatnonzero(md.keys % stride == code)
+        md_count = md.count[md_rows, b + 1] - md.count[md_rows, a]
+        md_stats = pd.DataFrame({
+            "MD_Count": md_count,
+            "MD_Max_Price": range_max(md.max_price, md_rows, a, b),
+            "MD_Max_PSF": range_max(md.max_psf, md_rows, a, b),
+        }, index=pd.Index(np.asarray(self.entities[by])[md.keys[md_rows] // stride], name=by))
+        result = result.join(md_stats, how="left")
+        result["MD_Count"] = result["MD_Count"].fillna(0).astype(int)
+        result[["MD_Max_Price", "MD_Max_PSF"]] = result[["MD_Max_Price", "MD_Max_PSF"]].replace(-np.inf, np.nan)
+        result["MD_Share"] = result["MD_Count"] / np.maximum(result["Count"], 1) * 100
+        return result.loc[result["Count"] > 0, columns]
+
+
+if __name__ == "__main__":
+    from bundle import load_bundle_frame, prepare_transactions, read_transactions
+
+    for arg in sys.argv[1:]:
+        frame = load_bundle_frame(arg)
+        if frame is None:
+            frame = prepare_transactions(read_transactions(arg))
+        start = time.perf_counter()
+        index = RangeIndex(frame[RANGE_COLUMNS])
+        first, last = index.months
+        print(f"✔ Range index: {index.n_months} months ({first:%b %Y} - {last:%b %Y}) in {time.perf_counter() - start:.2f}s")
+
+        # Random ranges, timed per dimension and checked against a scan of the frame
+        rng = np.random.default_rng(0)
+        for dim in DIMENSIONS:
+            ranges = np.sort(rng.integers(0, index.n_months, (200, 2)), axis=1) + index.first
+            start = time.perf_counter()
+            for a, b in ranges:
+                result = index.query(dim, month_start(a), month_start(b))
+            elapsed = (time.perf_counter() - start) / len(ranges) * 1000
+            a, b = month_start(ranges[-1][0]), month_start(ranges[-1][1])
+            scan = frame[(frame["date"] >= a) & (frame["date"] <= b)]
+            if dim == "BUILDING":
+                scan = scan[scan["BUILDING"] != "NIL"]
+            expected = scan.groupby(dim, observed=True)["Resale_Price"].size()
+            ok = (result["Count"] == expected.reindex(result.index)).all() and len(result) == len(expected)
+            print(f"⏱ {dim}: {len(result):,} entities per range in {elapsed:.2f} ms {'✅' if ok else '❌'}")
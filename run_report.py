@@ -0,0 +1,205 @@
+"""
+Pipeline run report (2026)
+
+transactions.main() writes one JSON report per run to data/reports with:
+1. Wall time, CPU time and peak RSS per stage. Stages that run once per
+   batch add up their times and keep their highest peak. CPU time is that
+   of the thread running the stage, so streamed stages on two threads are
+   not counted twice (work a stage hands to its own pool, e.g. geocoding
+   requests, is left out). Peak RSS is sampled every RSS_SAMPLE_INTERVAL
+   while the stage runs (Linux); the process-wide high-water mark is
+   reported once, at the top
+2. OneMap requests: status codes (or the exception when there was no
+   response), empty results and latency percentiles / histogram
+3. Row counts: transactions, unique addresses, local geocoder hits and the
+   rows filter_unwanted_buildings dropped
+4. Spatial join hit rates per boundary layer
+
+Compare reports month to month to spot throughput regressions.
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from contextlib import contextmanager
+from datetime import datetime, UTC
+from pathlib import Path
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# =====================================================
+# Configuration
+# =====================================================
+RUN_REPORT_DIR = Path(os.getenv("HDB_RUN_REPORT_DIR", "data/reports"))
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+PERCENTILES = (50, 90, 99)
+RSS_SAMPLE_INTERVAL = 0.05  # seconds between RSS samples while a stage runs
+
+
+def peak_rss_bytes():
+    # High-water mark for the whole process so far
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def current_rss_bytes():
+    # Resident set size right now; None where /proc is not available
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class RssSampler:
+    """Samples the current RSS on a background thread; each open stage keeps the highest sample it saw."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._open = {}
+        self._thread = None
+
+    def start(self):
+        rss = current_rss_bytes()
+        if rss is None:
+            return None
+        token = object()
+        with self._lock:
+            self._open[token] = rss
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+                self._thread.start()
+        return token
+
+    def stop(self, token):
+        if token is None:
+            return None
+        rss = current_rss_bytes() or 0
+        with self._lock:
+            return max(self._open.pop(token), rss)
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval)
+            rss = current_rss_bytes() or 0
+            with self._lock:
+                for token, peak in self._open.items():
+                    if rss > peak:
+                        self._open[token] = rss
+
+
+# =====================================================
+# Report
+# =====================================================
+class RunReport:
+    """Collects stage timings and counters; safe to update from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rss = RssSampler()
+        self.started = datetime.now(UTC)
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        self.meta = {}
+        self.stages = {}
+        self.counts = {}
+        self.spatial = {}
+        self.status_codes = {}
+        self.latencies = []
+        self.empty_results = 0
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block, or a function when used as a decorator."""
+        wall, cpu, rss = time.perf_counter(), time.thread_time(), self._rss.start()
+        try:
+            yield
+        finally:
+            peak = self._rss.stop(rss)
+            with self._lock:
+                s = self.stages.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_bytes": None})
+                s["calls"] += 1
+                s["wall_s"] += time.perf_counter() - wall
+                s["cpu_s"] += time.thread_time() - cpu
+                if peak is not None:
+                    s["peak_rss_bytes"] = max(s["peak_rss_bytes"] or 0, peak)
+
+    def count(self, **values):
+        """Add to named row counters."""
+        with self._lock:
+            for name, value in values.items():
+                self.counts[name] = self.counts.get(name, 0) + int(value)
+
+    def record_request(self, status, seconds, results):
+        """One OneMap search: HTTP status (or exception name), latency and result rows."""
+        with self._lock:
+            status = str(status)
+            self.status_codes[status] = self.status_codes.get(status, 0) + 1
+            self.latencies.append(seconds)
+            self.empty_results += results == 0
+
+    def record_spatial(self, layer, points, hits):
+        with self._lock:
+            s = self.spatial.setdefault(layer, {"points": 0, "hits": 0})
+            s["points"] += int(points)
+            s["hits"] += int(hits)
+
+    # =====================================================
+    # Output
+    # =====================================================
+    def onemap_summary(self):
+        latencies = np.asarray(self.latencies)
+        summary = {
+            "requests": len(latencies),
+            "status_codes": dict(sorted(self.status_codes.items())),
+            "empty_results": int(self.empty_results),
+        }
+        if len(latencies):
+            summary["latency_s"] = {
+                **{f"p{p}": round(float(np.percentile(latencies, p)), 4) for p in PERCENTILES},
+                "mean": round(float(latencies.mean()), 4),
+                "max": round(float(latencies.max()), 4),
+            }
+            # Requests per bucket (upper bound in seconds), not cumulative
+            edges = np.searchsorted(LATENCY_BUCKETS, latencies, side="left")
+            counts = np.bincount(edges, minlength=len(LATENCY_BUCKETS) + 1)
+            labels = [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+            summary["latency_histogram"] = dict(zip(labels, counts.tolist()))
+        return summary
+
+    def to_dict(self, status="completed"):
+        with self._lock:
+            return {
+                "started": self.started.isoformat(timespec="seconds"),
+                "finished": datetime.now(UTC).isoformat(timespec="seconds"),
+                "status": status,
+                "total_wall_s": round(time.perf_counter() - self._wall, 4),
+                "total_cpu_s": round(time.process_time() - self._cpu, 4),
+                "peak_rss_bytes": peak_rss_bytes(),
+                "meta": self.meta,
+                "stages": {
+                    name: {**s, "wall_s": round(s["wall_s"], 4), "cpu_s": round(s["cpu_s"], 4)}
+                    for name, s in self.stages.items()
+                },
+                "counts": self.counts,
+                "onemap": self.onemap_summary(),
+                "spatial": {
+                    layer: {**s, "hit_rate": round(s["hits"] / s["points"], 4) if s["points"] else None}
+                    for layer, s in self.spatial.items()
+                },
+            }
+
+    def save(self, status="completed", root: Path = RUN_REPORT_DIR) -> Path:
+        path = Path(root) / f"run_{self.started:%Y%m%dT%H%M%SZ}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(status), indent=1))
+        return path
@@ -0,0 +1,134 @@
+"""
+Dataset snapshots for the dashboard.
+
+The pipeline in transactions.py writes one
+HDB_Resale_Transactions_Merged_<YYYYMMDD>.csv.gz per run. The manager below:
+1. Finds the newest pipeline output in the data directory
+2. Loads it on a background thread (the app keeps serving the old one),
+   then runs the optional `warm` hook for anything needed before it goes
+   live (per-snapshot indexes are built on first use, via Snapshot.cached)
+3. Swaps it in atomically under a new version id
+4. Leaves the previous version (and its caches) to the garbage collector
+   once the last session holding it moves on
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from dataclasses import dataclass, field
+from pathlib import Path
+import re
+import sys
+import threading
+import time
+
+# =====================================================
+# Configuration
+# =====================================================
+SNAPSHOT_PATTERN = "HDB_Resale_Transactions_Merged_*.csv.gz"
+SNAPSHOT_STAMP = re.compile(r"_(\d{8})\.")
+POLL_INTERVAL = 60  # seconds between checks for a newer pipeline output
+
+
+# =====================================================
+# Snapshot
+# =====================================================
+@dataclass
+class Snapshot:
+    version: str
+    path: Path
+    data: object
+    loaded_at: float = field(default_factory=time.time)
+    _cache: dict = field(default_factory=dict, repr=False)
+    _locks: dict = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def cached(self, key, fn):
+        """Compute `fn()` once per snapshot; the result dies with the snapshot."""
+        if key in self._cache:
+            return self._cache[key]
+        # One lock per key: a slow build never holds up lookups of the others
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._cache:
+                self._cache[key] = fn()
+        return self._cache[key]
+
+
+def snapshot_version(path: Path) -> str:
+    # Run date from the file name, plus mtime so a same-day re-run still counts
+    match = SNAPSHOT_STAMP.search(path.name)
+    stamp = match.group(1) if match else "00000000"
+    return f"{stamp}.{int(path.stat().st_mtime)}"
+
+
+# =====================================================
+# Manager
+# =====================================================
+class SnapshotManager:
+    def __init__(self, data_dir: Path, loader, pattern=SNAPSHOT_PATTERN, poll_interval=POLL_INTERVAL, warm=None):
+        self.data_dir = Path(data_dir)
+        self.loader = loader
+        self.warm = warm
+        self.pattern = pattern
+        self.poll_interval = poll_interval
+        self._current = None
+        self._swap_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def current(self) -> Snapshot:
+        if self._current is None:
+            self.refresh()
+        return self._current
+
+    @property
+    def version(self):
+        snap = self._current
+        return snap.version if snap is not None else None
+
+    def latest_path(self):
+        candidates = sorted(
+            self.data_dir.glob(self.pattern),
+            key=lambda p: (snapshot_version(p), p.name),
+        )
+        if not candidates:
+            raise FileNotFoundError(f"No {self.pattern} found in {self.data_dir}")
+        return candidates[-1]
+
+    def refresh(self) -> bool:
+        """Load the newest pipeline output if it differs from the live one."""
+        with self._swap_lock:
+            path = self.latest_path()
+            version = snapshot_version(path)
+            if self._current is not None and self._current.version == version:
+                return False
+
+            # Build the whole snapshot before publishing it; readers holding the
+            # old one keep a consistent view until their next interaction.
+            snap = Snapshot(version=version, path=path, data=self.loader(path))
+            if self.warm is not None:
+                self.warm(snap)
+            # The old snapshot's cache is not cleared: sessions still on it (until
+            # their next poll) would only rebuild its indexes into it
+            old, self._current = self._current, snap
+            if old is not None:
+                print(f"✔ Dataset swapped: {old.version} → {snap.version}")
+            return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                self.refresh()
+            except Exception as e:
+                # A half-written or broken file must never take down the live app
+                print(f"❌ Snapshot refresh failed: {e}")
+
+    def start(self):
+        """Start the background watcher (no-op under Pyodide, which has no threads)."""
+        if self._thread is not None or sys.platform == "emscripten":
+            return
+        self._thread = threading.Thread(target=self._watch, name="snapshot-watcher", daemon=True)
+        self._thread.start()
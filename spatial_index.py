@@ -0,0 +1,194 @@
+"""
+Spatial aggregation index (2026)
+
+Backs the Geographical Distribution map:
+1. Every geocoded transaction is binned into hexagons at several sizes
+   (levels), on a flat metre grid centred on Singapore
+2. Each cell keeps, per year and across all years, its transaction count,
+   median PSF and million-dollar share
+3. cells() answers one level and period for a map viewport, so the browser
+   only receives the cells it can show, never the raw points
+4. app.py builds the index once per dataset snapshot, before it goes live
+
+Build and time one for an existing CSV with:  python spatial_index.py <csv.gz>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+import math
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from bundle import MD_THRESHOLD
+
+# =====================================================
+# Configuration
+# =====================================================
+HEX_SIZES_M = (3200, 1600, 800, 400, 200, 100)  # centre-to-corner, coarsest first
+ORIGIN = (103.8198, 1.3521)  # lon / lat of the grid origin
+M_PER_DEG_LAT = 110_574
+M_PER_DEG_LON = 111_320 * math.cos(math.radians(ORIGIN[1]))  # ~0.1% off across the island
+TILE_PX = 512  # plotly / MapLibre tile width; the world is TILE_PX * 2**zoom pixels wide
+CELL_PX = 24  # smallest on-screen hex width before the map switches to a finer level
+VIEW_MARGIN = 0.5  # extra viewport share sent on each side, so short pans stay filled
+MAX_CELLS = 4000  # cells per answer; a busier viewport falls back to a coarser level
+ALL_PERIODS = "All years"
+INDEX_COLUMNS = ["date", "LATITUDE", "LONGITUDE", "Resale_Price", "PSF"]
+SQRT3 = math.sqrt(3)
+
+
+# =====================================================
+# Hex grid (pointy-top, axial coordinates)
+# =====================================================
+def to_metres(lon, lat):
+    return (np.asarray(lon) - ORIGIN[0]) * M_PER_DEG_LON, (np.asarray(lat) - ORIGIN[1]) * M_PER_DEG_LAT
+
+
+def to_degrees(x, y):
+    return np.asarray(x) / M_PER_DEG_LON + ORIGIN[0], np.asarray(y) / M_PER_DEG_LAT + ORIGIN[1]
+
+
+def hex_cells(x, y, size):
+    """Axial (q, r) of the hexagon containing each point."""
+    q = (SQRT3 / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    # Round in cube coordinates; the component with the largest error is rebuilt
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+    return rq.astype(np.int32), rr.astype(np.int32)
+
+
+def hex_centres(q, r, size):
+    return size * SQRT3 * (q + r / 2), size * 1.5 * r
+
+
+def hex_corners(q, r, size):
+    """(n, 7, 2) lon / lat rings, closed, for each cell."""
+    x, y = hex_centres(np.asarray(q, float), np.asarray(r, float), size)
+    angles = np.radians(np.arange(7) * 60 - 30)
+    lon, lat = to_degrees(x[:, None] + size * np.cos(angles), y[:, None] + size * np.sin(angles))
+    return np.stack([lon, lat], axis=-1)
+
+
+# =====================================================
+# Viewport
+# =====================================================
+def metres_per_pixel(zoom, lat=ORIGIN[1]):
+    return 40_075_016 * math.cos(math.radians(lat)) / (TILE_PX * 2 ** zoom)
+
+
+def viewport_bounds(lon, lat, zoom, width_px, height_px, margin=VIEW_MARGIN):
+    """(lon_min, lon_max, lat_min, lat_max) seen on a map of that size, plus `margin` per side."""
+    deg_per_px = 360 / (TILE_PX * 2 ** zoom)
+    half_lon = width_px / 2 * deg_per_px * (1 + 2 * margin)
+    half_lat = height_px / 2 * deg_per_px * math.cos(math.radians(lat)) * (1 + 2 * margin)
+    return lon - half_lon, lon + half_lon, lat - half_lat, lat + half_lat
+
+
+# =====================================================
+# Index
+# =====================================================
+def cell_stats(frame, by):
+    return frame.groupby(by, sort=False).agg(
+        Count=("PSF", "size"),
+        MD_Count=("MD", "sum"),
+        Median_PSF=("PSF", "median"),
+    ).reset_index()
+
+
+class SpatialIndex:
+    """Per-level hexagon aggregates, split by period, with cell centres in lon / lat."""
+
+    def __init__(self, levels: dict, rows: int, skipped: int):
+        self.levels = levels  # size -> {period -> cells}
+        self.rows = rows
+        self.skipped = skipped
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        lon = pd.to_numeric(df["LONGITUDE"], errors="coerce").to_numpy(float)
+        lat = pd.to_numeric(df["LATITUDE"], errors="coerce").to_numpy(float)
+        located = np.isfinite(lon) & np.isfinite(lat)
+        x, y = to_metres(lon[located], lat[located])
+
+        frame = pd.DataFrame({
+            "Year": pd.DatetimeIndex(df["date"].to_numpy()[located]).year.astype(str),
+            "PSF": df["PSF"].to_numpy()[located],
+            "MD": df["Resale_Price"].to_numpy()[located] >= MD_THRESHOLD,
+        })
+
+        levels = {}
+        for size in HEX_SIZES_M:
+            frame["Q"], frame["R"] = hex_cells(x, y, size)
+            cells = pd.concat([
+                cell_stats(frame, ["Q", "R"]).assign(Period=ALL_PERIODS),
+                cell_stats(frame, ["Year", "Q", "R"]).rename(columns={"Year": "Period"}),
+            ], ignore_index=True)
+            cells["MD_Share"] = (cells["MD_Count"] / cells["Count"] * 100).round(1)
+            cells["Lon"], cells["Lat"] = to_degrees(*hex_centres(cells["Q"].to_numpy(float), cells["R"].to_numpy(float), size))
+            levels[size] = {
+                period: part.drop(columns="Period").reset_index(drop=True)
+                for period, part in cells.groupby("Period", sort=False)
+            }
+        return cls(levels, rows=int(located.sum()), skipped=int((~located).sum()))
+
+    @property
+    def periods(self) -> list:
+        """ALL_PERIODS, then years, latest first."""
+        years = sorted((p for p in self.levels[HEX_SIZES_M[0]] if p != ALL_PERIODS), reverse=True)
+        return [ALL_PERIODS, *years]
+
+    def level_for_zoom(self, zoom, lat=ORIGIN[1]) -> int:
+        """The finest hexagon size still at least CELL_PX wide at this zoom."""
+        fitting = [s for s in HEX_SIZES_M if SQRT3 * s >= CELL_PX * metres_per_pixel(zoom, lat)]
+        return fitting[-1] if fitting else HEX_SIZES_M[0]
+
+    def cells(self, period, bounds, zoom):
+        """(cells inside `bounds`, hexagon size) at the level for `zoom`, at most MAX_CELLS."""
+        lon_min, lon_max, lat_min, lat_max = bounds
+        size = self.level_for_zoom(zoom, (lat_min + lat_max) / 2)
+        while True:
+            cells = self.levels[size].get(period)
+            if cells is None:
+                return pd.DataFrame(columns=["Q", "R", "Count", "MD_Share", "Median_PSF", "Lon", "Lat"]), size
+            inside = cells["Lon"].between(lon_min, lon_max) & cells["Lat"].between(lat_min, lat_max)
+            if inside.sum() <= MAX_CELLS or size == HEX_SIZES_M[0]:
+                return cells[inside].reset_index(drop=True), size
+            size = HEX_SIZES_M[HEX_SIZES_M.index(size) - 1]
+
+
+def cells_geojson(cells: pd.DataFrame, size, decimals=5) -> dict:
+    """Hexagon outlines for `cells` as a FeatureCollection; feature ids are row positions."""
+    rings = hex_corners(cells["Q"].to_numpy(), cells["R"].to_numpy(), size).round(decimals).tolist()
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "id": i, "geometry": {"type": "Polygon", "coordinates": [ring]}}
+            for i, ring in enumerate(rings)
+        ],
+    }
+
+
+if __name__ == "__main__":
+    from bundle import load_bundle_frame, prepare_transactions, read_transactions
+
+    for arg in sys.argv[1:]:
+        frame = load_bundle_frame(arg)
+        if frame is None:
+            frame = prepare_transactions(read_transactions(arg))
+        start = time.perf_counter()
+        index = SpatialIndex.from_frame(frame[INDEX_COLUMNS])
+        cells = sum(len(part) for level in index.levels.values() for part in level.values())
+        print(
+            f"✔ Spatial index: {index.rows:,} rows ({index.skipped:,} without coordinates), "
+            f"{cells:,} cells in {time.perf_counter() - start:.1f}s"
+        )
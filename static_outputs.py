@@ -0,0 +1,349 @@
+"""
+Pre-rendered dashboard outputs (2026)
+
+The Latest Trends page offers a small, finite set of choices: Period1 (3)
+x Flattype1 (5) x the two PSF / PRICE toggles, with the flat types of
+Chart 5 and the towns of Chart 6 as the page opens them. For one pipeline
+output:
+1. export_outputs() renders every output for every such choice headlessly
+   and notes which inputs each output reads
+2. Each distinct payload is written once as JSON, named by its hash, with a
+   manifest.json keyed by output and the values of the inputs it reads,
+   under HDB_Resale_Transactions_Merged_<YYYYMMDD>.outputs/
+3. app.py serves a matching payload instead of computing it; anything else
+   (e.g. a custom set of towns) still renders live
+4. The manifest records the dataset hash and a fingerprint of the code that
+   renders the outputs, so a stale export is ignored rather than served
+
+Export for the newest pipeline output in a folder with:  python static_outputs.py <data dir>
+"""
+
+# =====================================================
+# Imports
+# =====================================================
+from functools import wraps
+from pathlib import Path
+import asyncio
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+from bundle import read_manifest, source_sha256
+
+# =====================================================
+# Configuration
+# =====================================================
+ROOT = Path(__file__).resolve().parent
+OUTPUTS_SUFFIX = ".outputs"
+OUTPUTS_FORMAT = 1
+RENDER_FILES = ("app.py", "bundle.py", "query_backend.py")  # code the payloads depend on
+CHART5_DEFAULT_TYPES = ("4 ROOM", "5 ROOM", "EXECUTIVE/MG")
+EXPORT_GRID = [
+    {"Period1": p, "Flattype1": ft, "select_PSF": m, "select_PSF_town": mt}
+    for p in ("Monthly", "Quarterly", "Yearly")
+    for ft in ("All", "3 ROOM", "4 ROOM", "5 ROOM", "EXECUTIVE/MG")
+    for m in ("PSF", "PRICE")
+    for mt in ("PSF", "PRICE")
+]
+
+
+def serving_static() -> bool:
+    # HDB_STATIC_OUTPUTS=0 renders everything live (read per render, so exporters can switch it off)
+    return os.getenv("HDB_STATIC_OUTPUTS", "1") != "0"
+
+
+def outputs_path_for(path) -> Path:
+    # Next to the CSV (server) or the browser bundle (Shinylive)
+    path = Path(path)
+    return path.with_name(re.sub(r"(\.csv\.gz|\.browser)$", "", path.name) + OUTPUTS_SUFFIX)
+
+
+def dataset_sha256(path) -> str:
+    path = Path(path)
+    if path.is_dir():  # a browser bundle records the CSV it was built from
+        return json.loads((path / "manifest.json").read_text()).get("source_sha256")
+    # A matching bundle has already hashed this CSV
+    manifest = read_manifest(path)
+    return manifest["source_sha256"] if manifest is not None else source_sha256(path)
+
+
+def code_fingerprint(root=ROOT) -> str:
+    digest = hashlib.sha256()
+    for name in RENDER_FILES:
+        digest.update((Path(root) / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def input_key(values: dict) -> str:
+    return json.dumps(values, sort_keys=True, default=list)
+
+
+# =====================================================
+# Payloads
+# =====================================================
+def _pruned(value):
+    # Empty objects (e.g. a figure's blank legend title) mean the same as none
+    if isinstance(value, dict):
+        return {k: _pruned(v) for k, v in value.items() if v != {}}
+    if isinstance(value, list):
+        return [_pruned(v) for v in value]
+    return value
+
+
+def payload_text(value) -> str:
+    """What the browser receives for an output, as canonical JSON (used to compare renders)."""
+    if hasattr(value, "to_plotly_json"):
+        payload = _pruned(json.loads(value.to_json()))
+    elif hasattr(value, "to_payload"):  # render.DataTable / DataGrid
+        payload = value.to_payload()
+    elif isinstance(value, pd.DataFrame):
+        from shiny import render
+        payload = render.DataGrid(value).to_payload()
+    else:
+        payload = value
+    return json.dumps(payload, sort_keys=True, default=str)
+
+
+def _plain(value):
+    if hasattr(value, "item"):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Cannot export a {type(value).__name__}")
+
+
+def _frame_json(df: pd.DataFrame) -> dict:
+    return {
+        "columns": df.columns.tolist(),
+        "dtypes": [str(t) for t in df.dtypes],
+        "data": df.to_numpy(object).tolist(),
+    }
+
+
+def _frame(spec: dict) -> pd.DataFrame:
+    df = pd.DataFrame(spec["data"], columns=spec["columns"])
+    return df.astype(dict(zip(df.columns, spec["dtypes"])))
+
+
+def encode(value) -> dict:
+    if hasattr(value, "to_plotly_json"):
+        return {"kind": "figure", "figure": json.loads(value.to_json())}
+    if hasattr(value, "to_payload"):
+        return {
+            "kind": "table", "class": type(value).__name__, "frame": _frame_json(value.data),
+            "options": {
+                "width": value.width, "height": value.height, "summary": value.summary,
+                "filters": value.filters, "editable": value.editable, "styles": value.styles,
+            },
+        }
+    if isinstance(value, pd.DataFrame):
+        return {"kind": "frame", "frame": _frame_json(value)}
+    if isinstance(value, str):
+        return {"kind": "text", "value": value}
+    raise TypeError(f"Cannot export a {type(value).__name__}")
+
+
+def decode(entry: dict):
+    if entry["kind"] == "figure":
+        import plotly.graph_objects as go
+        return go.Figure(entry["figure"])
+    if entry["kind"] == "table":
+        from shiny import render
+        return getattr(render, entry["class"])(_frame(entry["frame"]), **entry["options"])
+    if entry["kind"] == "frame":
+        return _frame(entry["frame"])
+    return entry["value"]
+
+
+# =====================================================
+# Serving
+# =====================================================
+class StaticOutputs:
+    def __init__(self, path: Path, manifest: dict):
+        self.path = path
+        self.outputs = manifest["outputs"]  # name -> {"inputs": [...], "payloads": {key: file}}
+
+    @classmethod
+    def open(cls, data_path):
+        """The export for this pipeline output (CSV or browser bundle) if it matches data and code, else None."""
+        path = outputs_path_for(data_path)
+        try:
+            manifest = json.loads((path / "manifest.json").read_text())
+        except (OSError, ValueError):
+            return None
+        if (
+            manifest.get("format") != OUTPUTS_FORMAT
+            or manifest.get("code") != code_fingerprint()
+            or manifest.get("source_sha256") != dataset_sha256(data_path)
+        ):
+            print(f"🔎 {path.name} was exported from other data or code; rendering live")
+            return None
+        return cls(path, manifest)
+
+    def inputs_of(self, name):
+        spec = self.outputs.get(name)
+        return None if spec is None else spec["inputs"]
+
+    def lookup(self, name, values: dict):
+        file = self.outputs[name]["payloads"].get(input_key(values))
+        if file is None:
+            return None
+        return decode(json.loads((self.path / file).read_text()))
+
+
+def prerendered(store, input):
+    """
+    Decorator for an output's render function: serve the exported payload
+    for the current inputs when there is one, else render live.
+
+    `store()` returns the live snapshot's StaticOutputs (or None). Only the
+    inputs the output read at export time are read here, so it keeps the
+    same reactive dependencies as its live render.
+    """
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper():
+            outputs = store() if serving_static() else None
+            names = outputs.inputs_of(fn.__name__) if outputs is not None else None
+            if names is not None:
+                value = outputs.lookup(fn.__name__, {name: input[name]() for name in names})
+                if value is not None:
+                    return value
+            return fn()
+        return wrapper
+    return decorate
+
+
+# =====================================================
+# Export
+# =====================================================
+class ReadRecorder:
+    """Stands in for a session's inputs and notes which ones are read."""
+
+    def __init__(self, inputs):
+        self._inputs = inputs
+        self.read = set()
+
+    def __getattr__(self, name):
+        self.read.add(name)
+        return getattr(self._inputs, name)
+
+    def __getitem__(self, name):
+        self.read.add(name)
+        return self._inputs[name]
+
+
+def render_output(app_module, inputs: dict, name):
+    """(value, inputs read) for one output in a fresh headless session, so shared calcs are charged to it too."""
+    from shiny.session import session_context
+    from headless import call_renderer, new_session
+
+    session = new_session(inputs)
+    recorder = ReadRecorder(session.input)
+    with session_context(session):
+        app_module.server(recorder, session.output, session)
+    recorder.read.clear()  # reactive.event() arguments are read while the server is set up
+    value = asyncio.run(call_renderer(session, session.output._outputs[name].renderer))
+    return value, recorder.read
+
+
+def opening_states(app_module, db) -> list:
+    """Every full set of Latest Trends inputs to export: the grid, with Chart 6 both empty and on its Top 5."""
+    states = []
+    for choice in EXPORT_GRID:
+        medians = app_module.town_medians(db, choice["Period1"])
+        for towns in ((), tuple(app_module.default_towns(medians, choice["select_PSF_town"]))):
+            states.append({**choice, "select_flat_type": CHART5_DEFAULT_TYPES, "select_town": towns})
+    return states
+
+
+def export_output(app_module, name, states, dst: Path):
+    """(inputs read, payload file per key, renders) for one output across `states`."""
+    reads, renders = set(), 0
+    while True:
+        # 1. One render per distinct value of the inputs it reads; if a
+        #    render reads a new input, the output starts over
+        payloads = {}
+        for state in states:
+            key = input_key({k: state[k] for k in sorted(reads)})
+            if key in payloads:
+                continue
+            value, read = render_output(app_module, state, name)
+            renders += 1
+            if not read <= reads:
+                reads |= read
+                break
+
+            # 2. Written once per distinct payload, and checked as it will be served
+            entry = json.dumps(encode(value), default=_plain)
+            if payload_text(decode(json.loads(entry))) != payload_text(value):
+                raise SystemExit(f"❌ {name} does not survive export for {state}")
+            file = hashlib.sha256(entry.encode()).hexdigest()[:16] + ".json"
+            (dst / file).write_text(entry)
+            payloads[key] = file
+        else:
+            return reads, payloads, renders
+
+
+def export_outputs(data_dir: Path) -> Path:
+    from shiny.types import SilentException
+
+    os.environ["HDB_DATA_DIR"] = str(data_dir)
+    os.environ["HDB_STATIC_OUTPUTS"] = "0"  # render everything live, whatever an earlier export holds
+    os.environ["HDB_METRICS"] = "0"  # the slow-render log would read every input
+    sys.path.insert(0, str(ROOT))
+    import app as app_module
+    from headless import stub_session
+
+    snap = app_module.snapshots.current
+    states = opening_states(app_module, snap.data)
+    names = list(stub_session(app_module, states[0]).output._outputs)
+    out = outputs_path_for(snap.path)
+    tmp = out.with_name(out.name + ".partial")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    # 1-2. Every output that renders with these inputs alone
+    start = time.perf_counter()
+    outputs, renders = {}, 0
+    for name in names:
+        try:
+            reads, payloads, n = export_output(app_module, name, states, tmp)
+        except SilentException:
+            continue  # waits on inputs of another page
+        outputs[name] = {"inputs": sorted(reads), "payloads": payloads}
+        renders += n
+
+    # 3. Unused payload files (from restarts) are dropped
+    used = {f for spec in outputs.values() for f in spec["payloads"].values()}
+    for f in tmp.glob("*.json"):
+        if f.name not in used:
+            f.unlink()
+    manifest = {
+        "format": OUTPUTS_FORMAT,
+        "source_sha256": dataset_sha256(snap.path),
+        "code": code_fingerprint(),
+        "outputs": outputs,
+    }
+    (tmp / "manifest.json").write_text(json.dumps(manifest, indent=1))
+    shutil.rmtree(out, ignore_errors=True)
+    tmp.rename(out)
+
+    size = sum(f.stat().st_size for f in out.iterdir())
+    print(
+        f"✔ Exported {len(outputs)} outputs ({len(used):,} payloads, {size / 1e6:.2f} MB) "
+        f"from {renders:,} renders in {time.perf_counter() - start:.1f}s"
+    )
+    print(f"✅ Static outputs saved: {out}")
+    return out
+
+
+if __name__ == "__main__":
+    for arg in sys.argv[1:]:
+        export_outputs(Path(arg))
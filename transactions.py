@@ -4,10 +4,18 @@ HDB Resale Transactions Geocoder (2026)
 End-to-end script to:
 1. Download HDB resale data
 2. Clean and deduplicate addresses
-3. Geocode via OneMap
+3. Geocode locally from earlier OneMap results, then via OneMap
 4. Remove non-residential matches
 5. Spatially enrich results
-6. Output final CSV
+6. Keep one best match per address
+7. Output the transactions table, its address table and the precomputed
+   bundle (bundle.py)
+
+Every run also writes a JSON report (run_report.py) to data/reports.
+
+With PIPELINE_STREAMING=1, steps 3-6 run per batch: each geocoded batch is
+filtered, enriched and appended to the address table while the next batches
+are still being geocoded.
 """
 
 # =====================================================
@@ -19,29 +27,43 @@ from datetime import datetime, UTC
 import os
 import time
 import re
+import queue
 import requests
+import threading
 import concurrent.futures
 
 import pandas as pd
-import geopandas as gpd
 from tqdm import tqdm
 
+from boundaries import boundary_version, enrich_coordinates, layer_columns
+from bundle import ADDRESS_KEY, address_path_for, build_bundle
+from checkpoints import StageRunner, combine_digests
+from geocoder import RESULT_COLUMNS, LocalGeocoder
+from run_report import RunReport
+
 # =====================================================
 # Configuration
 # =====================================================
 DATA_DIR = Path("data/raw")
-DATA_DIR.mkdir(exist_ok=True)
+DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 DATASET_ID = "d_8b84c4ee58e3cfc0ece0d773c8ca6abc"
 RAW_CSV = DATA_DIR / "hdb_resale_transactions.csv"
 
-SUBZONE_SHP = Path(r"C:\Users\benja\OneDrive\Documents\R\Geocoder\URA_MP19_SUBZONE_NO_SEA_PL.shp")
-ELD_SHP = Path(r"C:\Users\benja\OneDrive\Documents\R\Geocoder\ELD2025.shp")
-TC_SHP = Path(r"C:\Users\benja\OneDrive\Documents\R\Geocoder\TOWN_COUNCIL_BDY_2025.shp")
+SUBZONE_SHP = Path(os.getenv("SUBZONE_SHP", r"C:\Users\benja\OneDrive\Documents\R\Geocoder\URA_MP19_SUBZONE_NO_SEA_PL.shp"))
+ELD_SHP = Path(os.getenv("ELD_SHP", r"C:\Users\benja\OneDrive\Documents\R\Geocoder\ELD2025.shp"))
+TC_SHP = Path(os.getenv("TC_SHP", r"C:\Users\benja\OneDrive\Documents\R\Geocoder\TOWN_COUNCIL_BDY_2025.shp"))
 
+ONEMAP_URL = os.getenv("ONEMAP_URL", "https://www.onemap.gov.sg")
+ONEMAP_WORKERS = int(os.getenv("ONEMAP_WORKERS", "15"))
+GEOCODE_BATCH_SIZE = int(os.getenv("GEOCODE_BATCH_SIZE", "500"))  # addresses per checkpoint
+PIPELINE_STREAMING = os.getenv("PIPELINE_STREAMING", "0") == "1"
+STREAM_QUEUE_DEPTH = 2  # geocoded batches waiting for filter/enrich before geocoding pauses
 ONEMAP_EMAIL = os.getenv("ONEMAP_EMAIL")
 ONEMAP_PASSWORD = os.getenv("ONEMAP_PASSWORD")
 
+report = RunReport()
+
 if not ONEMAP_EMAIL or not ONEMAP_PASSWORD:
     raise RuntimeError("❌ OneMap credentials not set in environment variables")
 
@@ -49,9 +71,14 @@ if not ONEMAP_EMAIL or not ONEMAP_PASSWORD:
 # =====================================================
 # Address cleaning
 # =====================================================
-ADDRESS_REPLACEMENTS = {
+# Street-level rewrites, applied (as regex) anywhere in an address
+STREET_REPLACEMENTS = {
     "ST.%20GEORGE'S%20RD": "SAINT%20GEORGE'S%20RD",
     "ST.%20GEORGE'S%20LANE": "SAINT%20GEORGE'S%20LANE",
+}
+
+# Whole-address rewrites, looked up exactly
+ADDRESS_REPLACEMENTS = {
     "926%20HOUGANG%20ST%2091": "926%20HOUGANG%20STREET%2091",
     "11%20HOLLAND%20DR": "11%20HOLLAND%20VISTA",
     "52%20KENT%20RD": "52%20KENT%20RD%20KENT%20VILLE",
@@ -78,6 +105,9 @@ ADDRESS_EXCLUDE = {
     "2A%20WOODLANDS%20CTR%20RD",
 }
 
+# "61 years 04 months", "61 years"; older extracts hold a bare number of years
+REMAINING_LEASE = r"^\s*(\d{1,2})(?:\s*years?)?(?:\s+(\d{1,2})\s*months?)?\s*$"
+
 
 # =====================================================
 # Utilities
@@ -121,20 +151,32 @@ def cache_data(dataset_id: str, dst: Path) -> Path:
 # =====================================================
 # Step 1–2: Load & Prepare Data
 # =====================================================
-def clean_address_strings(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df["x"] = df["x"].replace(ADDRESS_REPLACEMENTS, regex=True)
-    df = df[~df["x"].isin(ADDRESS_EXCLUDE)]
-    return df
-
-
+def clean_address_strings(x: pd.Series) -> pd.Series:
+    # Run on unique addresses only; callers map the result back to transactions
+    x = x.replace(STREET_REPLACEMENTS, regex=True)
+    return x.map(ADDRESS_REPLACEMENTS).fillna(x)
+
+
+def parse_remaining_lease(values: pd.Series) -> pd.Series:
+    # Total months remaining; parsed once per distinct value, and any value
+    # that isn't a lease term stops the run rather than becoming NaN
+    codes, uniques = pd.factorize(values.astype(str))
+    parts = pd.Series(uniques).str.extract(REMAINING_LEASE)
+    years, months = pd.to_numeric(parts[0]), pd.to_numeric(parts[1]).fillna(0)
+    bad = (years.isna() | (months > 11)).to_numpy()
+    if bad.any():
+        raise ValueError(f"❌ Unrecognised remaining_lease values: {uniques[bad][:5].tolist()}")
+    total = (years * 12 + months).astype("int16").to_numpy()
+    return pd.Series(total[codes], index=values.index)
+
+
+@report.stage("prepare")
 def prepare_addresses(csv_path: Path):
     df = pd.read_csv(csv_path)
 
     df["Year"] = df["month"].str[:4].astype(int)
     df["Month"] = df["month"].str[5:7].astype(int)
-    df["Lease.Remain"] = df["remaining_lease"].str[:2]
-    df["Lease.Remain.Month"] = df["remaining_lease"].str[9:11].replace("", "00")
+    df["Lease_Remain_Months"] = parse_remaining_lease(df["remaining_lease"])
 
     df = df.rename(columns={
         "town": "Town",
@@ -152,25 +194,28 @@ def prepare_addresses(csv_path: Path):
         "Year", "Month", "Town", "Flat_Type", "Block", "Street",
         "Storey_Range", "Floor_Area_Sqm", "Flat_Model",
         "Lease_Commence", "Resale_Price",
-        "Lease.Remain", "Lease.Remain.Month",
+        "Lease_Remain_Months",
     ]]
 
-    # 1. Construct x
-    df["x"] = (
-        df["Block"].astype(str) + " " + df["Street"]
-    ).str.replace(" ", "%20", regex=False)
-
-    # 2. Apply cleaning to FULL dataframe (this is the missing step)
-    df = clean_address_strings(df)
+    # 1. One code per distinct block; everything below runs on ~10k blocks
+    codes = df.groupby(["Block", "Street"], sort=False, dropna=False).ngroup().to_numpy()
+    blocks = df[["Block", "Street"]].drop_duplicates().reset_index(drop=True)
 
-    # 3. Build unique geocoding table from already-cleaned x
-    unique = (
-        df[["Block", "Street", "x"]]
-        .drop_duplicates()
-        .reset_index(drop=True)
+    # 2. Construct and clean x on the unique blocks
+    blocks["x"] = clean_address_strings(
+        (blocks["Block"].astype(str) + " " + blocks["Street"]).str.replace(" ", "%20", regex=False)
     )
 
-    unique["POSTALX"] = unique.index + 1
+    # 3. Drop excluded addresses and map x back to the FULL dataframe by code
+    keep = ~blocks["x"].isin(ADDRESS_EXCLUDE).to_numpy()
+    df = df[keep[codes]].copy()
+    x_codes, x_values = pd.factorize(blocks["x"])
+    df["x"] = pd.Categorical.from_codes(x_codes[codes[keep[codes]]], categories=x_values)
+
+    # 4. Unique geocoding table from the cleaned blocks
+    unique = blocks[keep].drop_duplicates().reset_index(drop=True)
+
+    unique["ADDRESS_ID"] = unique.index + 1
 
     return df, unique
 
@@ -179,7 +224,7 @@ def prepare_addresses(csv_path: Path):
 # =====================================================
 def get_onemap_token():
     res = requests.post(
-        "https://www.onemap.gov.sg/api/auth/post/getToken",
+        f"{ONEMAP_URL}/api/auth/post/getToken",
         json={"email": ONEMAP_EMAIL, "password": ONEMAP_PASSWORD},
         timeout=15,
     )
@@ -189,36 +234,87 @@ def get_onemap_token():
 
 def call_geocode(search_val, token, session):
     url = (
-        "https://www.onemap.gov.sg/api/common/elastic/search"
+        f"{ONEMAP_URL}/api/common/elastic/search"
         f"?searchVal={search_val}&returnGeom=Y&getAddrDetails=Y&pageNum=1"
     )
     headers = {"Authorization": f"Bearer {token}"}
 
+    # A failed search still becomes an empty row; the run report keeps why,
+    # and the caller learns it failed so the row is not checkpointed as a miss
+    started, status, results = time.perf_counter(), None, []
     try:
         r = session.get(url, headers=headers, timeout=10)
+        status = r.status_code
         r.raise_for_status()
-        data = r.json()
-        if data.get("results"):
-            df = pd.DataFrame(data["results"])
-            df["search_input"] = search_val
-            return df
-    except Exception:
-        pass
+        results = r.json().get("results") or []
+    except Exception as e:
+        status = status if status is not None and status >= 400 else type(e).__name__
+    report.record_request(status, time.perf_counter() - started, len(results))
+    ok = isinstance(status, int) and status < 400
+
+    if results:
+        df = pd.DataFrame(results)
+        df["search_input"] = search_val
+        return df, ok
+    return pd.DataFrame({"search_input": [search_val]}), ok
+
+
+@report.stage("geocode")
+def geocode_addresses(addresses, max_workers=ONEMAP_WORKERS, failed=None):
+    # Addresses whose OneMap request failed are appended to `failed`.
+    # Spelling variants of blocks OneMap already resolved are answered
+    # locally (geocoder.py); only the rest goes over the network
+    local = LocalGeocoder.load()
+    found, addresses = local.geocode(addresses)
+    print(f"✔ Local geocoder: {found['search_input'].nunique():,} resolved, {len(addresses):,} sent to OneMap")
+    report.count(local_geocoder_resolved=found["search_input"].nunique(), sent_to_onemap=len(addresses))
+    results = [found]
+
+    if addresses:
+        token = get_onemap_token()
+        session = requests.Session()
+        fetched = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futures = [ex.submit(call_geocode, a, token, session) for a in addresses]
+            for f in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
+                df, ok = f.result()
+                fetched.append(df)
+                if not ok and failed is not None:
+                    failed.append(df["search_input"].iat[0])
+
+        fetched = pd.concat(fetched, ignore_index=True)
+        local.add(fetched)
+        local.save()
+        results.append(fetched)
 
-    return pd.DataFrame({"search_input": [search_val]})
+    return pd.concat(results, ignore_index=True)
 
 
-def geocode_addresses(addresses):
-    token = get_onemap_token()
-    session = requests.Session()
-    results = []
+def geocode_batch(stages, batch, number):
+    # A batch with failed requests (timeouts, 429s, 5xx) is used for this run
+    # but not checkpointed, so the next run asks again; the addresses that did
+    # resolve are answered by the local geocoder then
+    name = f"geocode/{number:05d}"
+    failed = []
+    result = stages.run(
+        name, lambda: geocode_addresses(batch, failed=failed), [combine_digests(batch)],
+        complete=lambda _: not failed,
+    )
+    if failed:
+        print(f"❌ {name}: {len(failed):,} OneMap requests failed; batch not checkpointed, retried next run")
+    return name, result
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=15) as ex:
-        futures = [ex.submit(call_geocode, a, token, session) for a in addresses]
-        for f in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
-            results.append(f.result())
 
-    return pd.concat(results, ignore_index=True)
+def geocode_in_batches(stages, addresses, batch_size=GEOCODE_BATCH_SIZE):
+    """geocode_addresses() one checkpointed batch at a time; returns the results and their digest."""
+    names, results = [], []
+    for start in range(0, len(addresses), batch_size):
+        name, result = geocode_batch(stages, addresses[start:start + batch_size], start // batch_size)
+        names.append(name)
+        results.append(result)
+    stages.prune("geocode/", keep=names)
+    return pd.concat(results, ignore_index=True), combine_digests(stages.digest(n) for n in names)
 
 
 # =====================================================
@@ -276,102 +372,225 @@ exclude_patterns = [
     r"HDB PUBLIC SHELTERS", r"MEDICAL INSTITUTION",
 ]
 
+@report.stage("filter")
 def filter_unwanted_buildings(df):
     df = df.copy()
     df["rownumbers"] = range(1, len(df) + 1)
 
     pattern = "|".join(exclude_patterns)
 
-    return df[
+    kept = df[
         ~df["BUILDING"].str.contains(pattern, flags=re.IGNORECASE, na=False)
     ]
+    report.count(filter_rows_in=len(df), filter_rows_dropped=len(df) - len(kept))
+    return kept
 
 
 # =====================================================
-# Step 5: Spatial enrichment (FIXED)
+# Step 5: Spatial enrichment
 # =====================================================
-def spatial_enrichment(df):
-    gdf = gpd.GeoDataFrame(
-        df,
-        geometry=gpd.points_from_xy(df["LONGITUDE"], df["LATITUDE"]),
-        crs="EPSG:4326"
-    )
+# (shapefile, columns to keep); None keeps every subzone attribute
+BOUNDARY_LAYERS = [
+    (SUBZONE_SHP, None),
+    (ELD_SHP, ["ED_DESC"]),
+    (TC_SHP, ["TOWN_COUNC"]),
+]
 
-    subzone = gpd.read_file(SUBZONE_SHP)
-    eld = gpd.read_file(ELD_SHP)
-    tc = gpd.read_file(TC_SHP)
 
-    # Reproject points to match polygon CRS
-    gdf = gdf.to_crs(subzone.crs)
+@report.stage("enrich")
+def spatial_enrichment(df):
+    # Block coordinates -> subzone / ED / town council, from the lookup table
+    # kept across runs; unseen blocks get one STRtree pass (boundaries.py)
+    matches = enrich_coordinates(df["LONGITUDE"], df["LATITUDE"], BOUNDARY_LAYERS)
 
-    # --- Subzone ---
-    gdf = gpd.sjoin(
-        gdf,
-        subzone,
-        how="left",
-        predicate="within"
-    )
-    gdf = gdf.drop(columns=["index_right"], errors="ignore")
-
-    # --- Electoral Division ---
-    gdf = gpd.sjoin(
-        gdf,
-        eld[["ED_DESC", "geometry"]],
-        how="left",
-        predicate="within"
-    )
-    gdf = gdf.drop(columns=["index_right"], errors="ignore")
-
-    # --- Town Council ---
-    gdf = gpd.sjoin(
-        gdf,
-        tc[["TOWN_COUNC", "geometry"]],
-        how="left",
-        predicate="within"
-    )
-    gdf = gdf.drop(columns=["index_right"], errors="ignore")
+    rows = df.iloc[matches.pop("_row").to_numpy()]
+    matches.index = rows.index
 
-    return pd.DataFrame(gdf.drop(columns="geometry"))
+    # Hit rate per layer: geocoded rows that landed inside one of its polygons
+    has_coords = rows["LATITUDE"].notna().to_numpy()
+    for layer in BOUNDARY_LAYERS:
+        first = layer_columns([layer])[0]
+        report.record_spatial(Path(layer[0]).stem, has_coords.sum(), (has_coords & matches[first].notna().to_numpy()).sum())
+    return pd.concat([rows, matches], axis=1)
 
 # =====================================================
-# Main
+# Step 6: Address dimension
 # =====================================================
-def main():
-    cache_data(DATASET_ID, RAW_CSV)
+# OneMap / URA columns that are not worth keeping
+DIMENSION_DROP = [
+    "x", "SEARCHVAL", "search_input", "rownumbers",
+    "SUBZONE_NO", "SUBZONE_C", "CA_IND", "PLN_AREA_C",
+    "REGION_C", "INC_CRC", "FMEL_UPD_D",
+]
 
-    batch_df, unique_df = prepare_addresses(RAW_CSV)
 
-    print("🔎 Geocoding unique addresses")
-    geocoded = geocode_addresses(unique_df["x"].tolist())
-    geocoded = filter_unwanted_buildings(geocoded)
+def best_matches(enriched, unique):
+    """One OneMap result per searched address, chosen the same way every run."""
+    df = enriched.merge(unique[["x", "Block"]], left_on="search_input", right_on="x", how="left")
+
+    # 1. A result for the block that was searched, 2. with coordinates,
+    # 3. then OneMap's own ranking (response order, kept in rownumbers)
+    blk_no = df["BLK_NO"] if "BLK_NO" in df else pd.Series(None, index=df.index, dtype=object)
+    latitude = df["LATITUDE"] if "LATITUDE" in df else pd.Series(None, index=df.index, dtype=object)
+    df["_block_match"] = blk_no.astype(str).str.upper() == df["Block"].astype(str).str.upper()
+    df["_has_coords"] = latitude.notna()
+    df = df.sort_values(
+        ["search_input", "_block_match", "_has_coords", "rownumbers"],
+        ascending=[True, False, False, True],
+        kind="stable",
+    )
+    return df.drop_duplicates("search_input").drop(columns=["x", "Block", "_block_match", "_has_coords"])
 
-    print("🗺 Spatial enrichment")
-    enriched = spatial_enrichment(geocoded)
 
-    final = batch_df.merge(
-        enriched,
-        left_on="x",
-        right_on="search_input",
-        how="left",
+@report.stage("merge")
+def build_address_dimension(unique, enriched):
+    best = best_matches(enriched, unique)
+    dim = unique[[ADDRESS_KEY, "Block", "Street", "x"]].merge(
+        best, left_on="x", right_on="search_input", how="left"
     )
+    return dim.drop(columns=DIMENSION_DROP, errors="ignore")
 
-    cols_to_drop = [
-    "x", "SEARCHVAL", "search_input", "rownumbers",
-    "SUBZONE_NO", "SUBZONE_C", "CA_IND", "PLN_AREA_C",
-    "REGION_C", "INC_CRC", "FMEL_UPD_D"
+
+def build_transaction_table(batch_df, unique):
+    # Transactions carry only the integer address key
+    facts = batch_df.copy()
+    facts[ADDRESS_KEY] = facts["x"].map(unique.set_index("x")[ADDRESS_KEY]).astype(int)
+    return facts.drop(columns=["x", "Block", "Street"])
+
+
+# =====================================================
+# Streaming mode (PIPELINE_STREAMING=1)
+# =====================================================
+def stream_addresses(stages, unique, dim_partial, batch_size=GEOCODE_BATCH_SIZE):
+    """
+    Geocode on a producer thread while this thread filters, enriches and
+    appends each finished batch to the address table. The bounded queue
+    pauses geocoding when enrichment falls behind.
+    """
+    batches = queue.Queue(maxsize=STREAM_QUEUE_DEPTH)
+    failed = threading.Event()
+    errors = []
+
+    def produce():
+        names = []
+        try:
+            for start in range(0, len(unique), batch_size):
+                if failed.is_set():
+                    return
+                part = unique.iloc[start:start + batch_size]
+                name, geocoded = geocode_batch(stages, part["x"].tolist(), start // batch_size)
+                names.append(name)
+                batches.put((part, geocoded))
+            stages.prune("geocode/", keep=names)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            batches.put(None)
+
+    producer = threading.Thread(target=produce, name="geocode-producer", daemon=True)
+    producer.start()
+
+    # Same columns as the one-shot address table, whatever a batch returned
+    columns = [ADDRESS_KEY, "Block", "Street"] + [
+        c for c in RESULT_COLUMNS + layer_columns(BOUNDARY_LAYERS) if c not in DIMENSION_DROP
     ]
+    written = 0
+    while (item := batches.get()) is not None:
+        part, geocoded = item
+        try:
+            enriched = spatial_enrichment(filter_unwanted_buildings(geocoded))
+            dim = build_address_dimension(part, enriched).reindex(columns=columns)
+            # Appending adds a gzip member per batch; readers see one CSV
+            with report.stage("write"):
+                dim.to_csv(dim_partial, mode="a", header=written == 0, index=False, compression="gzip")
+            written += len(dim)
+        except Exception:
+            # Stop the producer after its current batch; draining unblocks its put()
+            failed.set()
+            while batches.get() is not None:
+                pass
+            producer.join()
+            raise
+
+    producer.join()
+    if errors:
+        raise errors[0]
+    return written
+
+
+# =====================================================
+# Main
+# =====================================================
+def run_pipeline():
+    # Every stage is checkpointed (checkpoints.py); a re-run skips the stages
+    # whose inputs are unchanged and resumes geocoding at the first unfinished batch
+    stages = StageRunner()
+    report.meta.update(
+        onemap_workers=ONEMAP_WORKERS, geocode_batch_size=GEOCODE_BATCH_SIZE, streaming=PIPELINE_STREAMING,
+    )
+
+    with report.stage("download"):
+        cache_data(DATASET_ID, RAW_CSV)
+        raw = stages.track_file("download", RAW_CSV)
 
-    final = final.drop(columns=cols_to_drop, errors="ignore")
+    batch_df, unique_df = stages.run("prepare", lambda: prepare_addresses(RAW_CSV), [raw])
+    report.count(transactions=len(batch_df), unique_addresses=len(unique_df))
 
     run_date = datetime.now(UTC).strftime("%Y%m%d")
     out = f"HDB_Resale_Transactions_Merged_{run_date}.csv.gz"
-    final.to_csv(
-        out,
-        index=False,
-        compression="gzip"
-    )
+    dim_out = address_path_for(out)
+    partial, dim_partial = f"{out}.partial", f"{dim_out}.partial"
+
+    # Write then rename, so a running dashboard never picks up a half-written file;
+    # the address table goes first, and the bundle is built from the same bytes
+    # before the transactions CSV goes live
+    if PIPELINE_STREAMING:
+        print("🔎 Geocoding, filtering and enriching in streamed batches")
+        if os.path.exists(dim_partial):
+            os.remove(dim_partial)
+        n_addresses = stream_addresses(stages, unique_df, dim_partial)
+    else:
+        print("🔎 Geocoding unique addresses")
+        geocoded, geocoded_digest = geocode_in_batches(stages, unique_df["x"].tolist())
+        geocoded = stages.run("filter", lambda: filter_unwanted_buildings(geocoded), [geocoded_digest])
+
+        print("🗺 Spatial enrichment")
+        enriched = stages.run(
+            "enrich", lambda: spatial_enrichment(geocoded),
+            [stages.digest("filter"), boundary_version(BOUNDARY_LAYERS)],
+        )
+
+        addresses = stages.run(
+            "merge", lambda: build_address_dimension(unique_df, enriched),
+            [stages.digest("prepare"), stages.digest("enrich")],
+        )
+        with report.stage("write"):
+            addresses.to_csv(dim_partial, index=False, compression="gzip")
+        n_addresses = len(addresses)
+    os.replace(dim_partial, dim_out)
+
+    with report.stage("write"):
+        facts = build_transaction_table(batch_df, unique_df)
+        facts.to_csv(
+            partial,
+            index=False,
+            compression="gzip"
+        )
+    with report.stage("bundle"):
+        build_bundle(partial)
+    os.replace(partial, out)
+
+    print(f"✅ Completed — output saved to {out} ({len(facts):,} rows) and {dim_out} ({n_addresses:,} addresses)")
+
+def main():
+    completed = False
+    try:
+        run_pipeline()
+        completed = True
+    finally:
+        path = report.save("completed" if completed else "failed")
+        print(f"⏱ Run report saved to {path}")
 
-    print(f"✅ Completed — output saved to {out}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file